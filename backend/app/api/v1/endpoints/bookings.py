@@ -1,28 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional, Union
+from datetime import datetime, time, timedelta
 import uuid
+from app.core.config import settings
 from app.database.database import get_db
-from app.models.models import User, Booking
-from app.schemas.schemas import Booking as BookingSchema, BookingCreate
+from app.models.models import User, Booking, BookingHold
+from app.schemas.schemas import (
+    Booking as BookingSchema, BookingCreate, BookingHold as BookingHoldSchema, BookingHoldCreate, BookingHoldConfirm
+)
 from app.core.deps import get_current_active_user
 from app.api.v1.endpoints.logs import log_db_update_async
+from app.services.reservations import InventoryUnavailableError, reserve_seats, reserve_rooms
+from app.services.booking_holds import hold_scheduler, release_hold_inventory, HOLD_INVENTORY_COLUMNS
 
 router = APIRouter()
 
 
+def _guest_count(booking_data: Union[BookingCreate, BookingHoldCreate], key: str, default: int, minimum: int = 0) -> int:
+    """A whole-number count from the free-form guest_details, or 400."""
+    value = (booking_data.guest_details or {}).get(key)
+    if value is None or value == "":
+        return default
+    try:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError
+        count = int(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"guest_details.{key} must be a whole number")
+    if count < minimum:
+        raise HTTPException(status_code=400, detail=f"guest_details.{key} must be at least {minimum}")
+    return count
+
+
+def _party_size(booking_data: Union[BookingCreate, BookingHoldCreate]) -> int:
+    """Seats needed: adults + children from guest_details, else one per traveler."""
+    counted = _guest_count(booking_data, "adults", 0) + _guest_count(booking_data, "children", 0)
+    return counted or len(booking_data.traveler_info or []) or 1
+
+
+def _room_count(booking_data: Union[BookingCreate, BookingHoldCreate]) -> int:
+    return _guest_count(booking_data, "rooms", 1, minimum=1)
+
+
+async def _reserve_inventory(db: AsyncSession, booking_data: Union[BookingCreate, BookingHoldCreate]) -> dict:
+    """
+    Take the flight seats and hotel rooms for a booking in the current
+    transaction. Returns guest_details, with the room type booked filled in.
+    """
+    # Validate everything before taking any inventory
+    guest_details = dict(booking_data.guest_details or {})
+    party_size = _party_size(booking_data)
+    if booking_data.hotel_id is not None:
+        if not booking_data.check_in_date or not booking_data.check_out_date:
+            raise HTTPException(status_code=400, detail="check_in_date and check_out_date are required for hotel bookings")
+        check_in, check_out = booking_data.check_in_date.date(), booking_data.check_out_date.date()
+        if check_out <= check_in:
+            raise HTTPException(status_code=400, detail="check_out_date must be after check_in_date")
+        rooms = _room_count(booking_data)
+    
+    if booking_data.flight_id is not None:
+        await reserve_seats(db, booking_data.flight_id, party_size)
+    if booking_data.hotel_id is not None:
+        guest_details["room_type"] = await reserve_rooms(
+            db, booking_data.hotel_id, check_in, check_out, rooms, guest_details.get("room_type"), party_size
+        )
+    return guest_details
+
+
+async def _load_booking(db: AsyncSession, booking_id: int) -> Booking:
+    """Booking with its hotel/flight loaded; lazy loading isn't possible on an async session."""
+    result = await db.execute(
+        select(Booking)
+        .options(selectinload(Booking.hotel), selectinload(Booking.flight))
+        .where(Booking.id == booking_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
 @router.post("/", response_model=BookingSchema, status_code=status.HTTP_201_CREATED)
 async def create_booking(
     booking_data: BookingCreate,
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    x_session_id: Optional[str] = Header(None)
 ):
-    """Create a new booking."""
+    """
+    Create a new booking.
+
+    Flight seats and hotel rooms are taken with conditional updates in the
+    same transaction as the booking insert, so either both happen or
+    neither does. Returns 409 when the inventory has run out.
+    """
     # Generate unique booking reference
     booking_reference = f"TRV-{uuid.uuid4().hex[:8].upper()}"
     
+    try:
+        guest_details = await _reserve_inventory(db, booking_data)
+    except InventoryUnavailableError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
     # Create booking
     db_booking = Booking(
         booking_reference=booking_reference,
@@ -32,7 +113,7 @@ async def create_booking(
         booking_type=booking_data.booking_type,
         check_in_date=booking_data.check_in_date,
         check_out_date=booking_data.check_out_date,
-        guest_details=booking_data.guest_details,
+        guest_details=guest_details,
         traveler_info=booking_data.traveler_info,
         total_price=booking_data.total_price,
         currency=booking_data.currency,
@@ -41,7 +122,8 @@ async def create_booking(
     
     db.add(db_booking)
     await db.commit()
-    await db.refresh(db_booking)
+    
+    db_booking = await _load_booking(db, db_booking.id)
     
     # Log the database insert
     await log_db_update_async(
@@ -55,12 +137,166 @@ async def create_booking(
             "booking_type": booking_data.booking_type,
             "total_price": booking_data.total_price
         },
-        user_id=str(current_user.id)
+        user_id=str(current_user.id),
+        session_id=x_session_id
     )
     
     return db_booking
 
 
+@router.post("/holds", response_model=BookingHoldSchema, status_code=status.HTTP_201_CREATED)
+async def create_hold(
+    hold_data: BookingHoldCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Hold flight seats and/or hotel rooms while the user pays.
+
+    Inventory is taken exactly as in create_booking and given back
+    automatically after ``booking_hold_minutes`` unless the hold is
+    confirmed or released first. Returns 409 when the inventory has run out.
+    """
+    if hold_data.flight_id is None and hold_data.hotel_id is None:
+        raise HTTPException(status_code=400, detail="A hold needs a flight_id or a hotel_id")
+    
+    try:
+        guest_details = await _reserve_inventory(db, hold_data)
+    except InventoryUnavailableError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
+    hold = BookingHold(
+        hold_reference=f"HLD-{uuid.uuid4().hex[:8].upper()}",
+        user_id=current_user.id,
+        flight_id=hold_data.flight_id,
+        hotel_id=hold_data.hotel_id,
+        seats=_party_size(hold_data) if hold_data.flight_id is not None else 0,
+        expires_at=datetime.utcnow() + timedelta(minutes=settings.booking_hold_minutes)
+    )
+    if hold_data.hotel_id is not None:
+        hold.room_type = guest_details["room_type"]
+        hold.check_in = hold_data.check_in_date.date()
+        hold.check_out = hold_data.check_out_date.date()
+        hold.rooms = _room_count(hold_data)
+    db.add(hold)
+    await db.commit()
+    
+    hold_scheduler.schedule(hold.id, hold.expires_at)
+    return hold
+
+
+async def _inactive_hold_error(db: AsyncSession, hold_id: int, user_id: int) -> HTTPException:
+    """404 for someone else's or a missing hold, 409 when it is no longer active."""
+    result = await db.execute(
+        select(BookingHold.status).where(BookingHold.id == hold_id, BookingHold.user_id == user_id)
+    )
+    hold_status = result.scalar_one_or_none()
+    if hold_status is None:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hold not found")
+    if hold_status == "active":
+        hold_status = "expired"  # Past its deadline, the scheduler just hasn't run yet
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Hold is {hold_status}")
+
+
+@router.post("/holds/{hold_id}/confirm", response_model=BookingSchema, status_code=status.HTTP_201_CREATED)
+async def confirm_hold(
+    hold_id: int,
+    confirm_data: BookingHoldConfirm,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+    x_session_id: Optional[str] = Header(None)
+):
+    """
+    Turn an active hold into a confirmed booking using the inventory it holds.
+
+    Claiming the hold is a conditional update on its status and deadline, so
+    a hold is confirmed at most once and never after it has expired.
+    """
+    result = await db.execute(
+        update(BookingHold)
+        .where(
+            BookingHold.id == hold_id,
+            BookingHold.user_id == current_user.id,
+            BookingHold.status == "active",
+            BookingHold.expires_at > datetime.utcnow()
+        )
+        .values(status="confirmed")
+        .returning(*HOLD_INVENTORY_COLUMNS)
+    )
+    hold = result.one_or_none()
+    if hold is None:
+        raise await _inactive_hold_error(db, hold_id, current_user.id)
+    
+    booking_reference = f"TRV-{uuid.uuid4().hex[:8].upper()}"
+    guest_details = dict(confirm_data.guest_details or {})
+    if hold.hotel_id is not None:
+        guest_details.update(room_type=hold.room_type, rooms=hold.rooms)
+    db_booking = Booking(
+        booking_reference=booking_reference,
+        user_id=current_user.id,
+        hotel_id=hold.hotel_id,
+        flight_id=hold.flight_id,
+        booking_type=confirm_data.booking_type,
+        status="confirmed",
+        check_in_date=datetime.combine(hold.check_in, time.min) if hold.check_in else None,
+        check_out_date=datetime.combine(hold.check_out, time.min) if hold.check_out else None,
+        guest_details=guest_details,
+        traveler_info=confirm_data.traveler_info,
+        total_price=confirm_data.total_price,
+        currency=confirm_data.currency,
+        special_requests=confirm_data.special_requests
+    )
+    db.add(db_booking)
+    await db.flush()
+    await db.execute(update(BookingHold).where(BookingHold.id == hold_id).values(booking_id=db_booking.id))
+    await db.commit()
+    db_booking = await _load_booking(db, db_booking.id)
+    
+    await log_db_update_async(
+        db=db,
+        text=f"Confirmed hold {hold_id} as booking {booking_reference} for user {current_user.email}",
+        table_name="bookings",
+        update_type="insert",
+        values={
+            "booking_reference": booking_reference,
+            "user_id": current_user.id,
+            "booking_type": confirm_data.booking_type,
+            "total_price": confirm_data.total_price,
+            "hold_id": hold_id
+        },
+        user_id=str(current_user.id),
+        session_id=x_session_id
+    )
+    
+    return db_booking
+
+
+@router.post("/holds/{hold_id}/release", response_model=BookingHoldSchema)
+async def release_hold(
+    hold_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Give up an active hold now and return its seats and rooms."""
+    result = await db.execute(
+        update(BookingHold)
+        .where(BookingHold.id == hold_id, BookingHold.user_id == current_user.id, BookingHold.status == "active")
+        .values(status="released")
+        .returning(*HOLD_INVENTORY_COLUMNS)
+    )
+    hold = result.one_or_none()
+    if hold is None:
+        raise await _inactive_hold_error(db, hold_id, current_user.id)
+    await release_hold_inventory(db, hold)
+    await db.commit()
+    
+    result = await db.execute(
+        select(BookingHold).where(BookingHold.id == hold_id).execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
 @router.get("/", response_model=List[BookingSchema])
 async def get_user_bookings(
     current_user: User = Depends(get_current_active_user),
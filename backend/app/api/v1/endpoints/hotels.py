@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from typing import List
+from app.core.config import settings
 from app.database.database import get_db
 from app.models.models import Hotel
 from app.schemas.schemas import Hotel as HotelSchema
+from app.services.hotel_features import hotel_features
 
 router = APIRouter()
 
@@ -20,4 +23,37 @@ async def get_hotel(hotel_id: int, db: AsyncSession = Depends(get_db)):
             detail="Hotel not found"
         )
     
-    return hotel 
\ No newline at end of file
+    return hotel
+
+
+@router.get("/{hotel_id}/similar", response_model=List[HotelSchema])
+async def get_similar_hotels(
+    hotel_id: int,
+    limit: int = Query(6, ge=1, le=50, description="Number of similar hotels"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the hotels most similar to this one.
+
+    Scored in one batch against the in-memory feature matrix (amenities,
+    price, stars, geo cell); only the chosen hotels are loaded.
+    """
+    try:
+        ids, similarities = hotel_features.similar(
+            hotel_id, limit, settings.similar_hotel_weights, settings.similar_hotel_geo_cell_degrees
+        )
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Hotel not found"
+        )
+    
+    result = await db.execute(select(Hotel).where(Hotel.id.in_(ids.tolist()), Hotel.is_active == True))
+    by_id = {hotel.id: hotel for hotel in result.scalars()}
+    hotels = []
+    for similar_id, similarity in zip(ids.tolist(), similarities.tolist()):
+        if similar_id in by_id:
+            by_id[similar_id].similarity = round(similarity, 4)
+            hotels.append(by_id[similar_id])
+    
+    return hotels 
\ No newline at end of file
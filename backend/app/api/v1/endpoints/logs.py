@@ -1,12 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func, text, tuple_
 from sqlalchemy.orm import Session
-from typing import Any, Dict, List
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, datetime, timezone
+import asyncio
 import json
+import time
+from collections import OrderedDict
 
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor
 from app.database.database import get_db
-from app.models.models import EventLog
+from app.models.models import EventLog, EventRollup, UserSession
 from app.schemas.schemas import EventLogCreate, EventLogResponse
+from app.services.event_queue import event_log_queue, QueueFullError
+from app.services.event_fields import with_promoted_fields
+from app.services.event_archive import event_archive, ARCHIVED_COLUMNS
+from app.services.event_export import EXPORT_FORMATS, export_schema, stream_event_export
+from app.services.sessionization import session_summary
+from app.services.funnels import FUNNELS, funnel_report
+from app.services.sketches import analytics_sketches, default_range, TOP_K_DIMENSIONS, UNIQUE_METRICS
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -31,107 +46,558 @@ class FrontendEventRequest(BaseModel):
     custom_action: str = None
     data: Dict[str, Any] = None
 
-@router.post("/events")
-async def log_frontend_event(
-    event: FrontendEventRequest,
-    db: Session = Depends(get_db)
-):
+
+def _frontend_event_row(event: FrontendEventRequest) -> Dict[str, Any]:
+    """
+    Map a frontend event onto EventLog column values
+    """
+    return with_promoted_fields({
+        "event_type": event.type,
+        "description": event.text,
+        "user_id": event.user_id,
+        "session_id": event.session_id,
+        "timestamp": datetime.fromisoformat(event.timestamp.replace('Z', '+00:00')),
+        "event_metadata": event.dict(exclude={'type', 'text', 'timestamp', 'user_id', 'session_id'}),
+        "source": 'frontend'
+    })
+
+
+async def _enqueue_event(row: Dict[str, Any]):
+    """
+    Queue an event row and fold it into the streaming analytics sketches
+    """
+    await event_log_queue.put(row)
+    analytics_sketches.record(row)
+
+
+def _parse_event_batch(request: Request, body: bytes) -> List[Any]:
+    """
+    Split a batch body into raw items, either a JSON array or NDJSON lines
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        items = []
+        for line in body.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                # Keep the slot so per-item indexes still line up with the body
+                items.append(e)
+        return items
+
+    try:
+        payload = json.loads(body or b"null")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Batch body must be a JSON array or NDJSON")
+    if isinstance(payload, dict) and isinstance(payload.get("events"), list):
+        payload = payload["events"]
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Batch body must be a JSON array or NDJSON")
+    return payload
+
+
+@router.post("/events", status_code=status.HTTP_202_ACCEPTED)
+async def log_frontend_event(event: FrontendEventRequest):
     """
-    Log events sent from the frontend
+    Log events sent from the frontend.
+
+    The event is handed to the write-behind queue and persisted by its writer
+    task, so the response does not wait for a database commit.
     """
     try:
-        # Create event log entry
-        event_log = EventLog(
-            event_type=event.type,
-            description=event.text,
-            user_id=event.user_id,
-            session_id=event.session_id,
-            timestamp=datetime.fromisoformat(event.timestamp.replace('Z', '+00:00')),
-            event_metadata=event.dict(exclude={'type', 'text', 'timestamp', 'user_id', 'session_id'}),
-            source='frontend'
+        row = _frontend_event_row(event)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid event: {str(e)}")
+
+    try:
+        await _enqueue_event(row)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Event log queue is full, retry later"
         )
-        
-        db.add(event_log)
-        db.commit()
-        db.refresh(event_log)
-        
-        return {"status": "success", "event_id": event_log.id}
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to log event: {str(e)}")
+
+    return {"status": "queued"}
+
+@router.post("/events/batch", status_code=status.HTTP_202_ACCEPTED)
+async def log_frontend_events_batch(request: Request):
+    """
+    Log a batch of frontend events.
+
+    Accepts a JSON array (or ``{"events": [...]}``) or an NDJSON body sent
+    with ``Content-Type: application/x-ndjson``. Invalid items are rejected
+    individually; the rest are queued and written by the log writer in
+    multi-row inserts. Items past ``log_batch_max_events`` are rejected
+    individually too, so an oversized batch still gets its head through.
+    """
+    items = _parse_event_batch(request, await request.body())
+
+    accepted = 0
+    results = []
+    for index, item in enumerate(items):
+        try:
+            if index >= settings.log_batch_max_events:
+                raise ValueError(f"batch exceeds {settings.log_batch_max_events} events, resend in a later batch")
+            if isinstance(item, Exception):
+                raise item
+            if not isinstance(item, dict):
+                raise ValueError("event must be a JSON object")
+            await _enqueue_event(_frontend_event_row(FrontendEventRequest(**item)))
+            accepted += 1
+            results.append({"index": index, "status": "accepted"})
+        except QueueFullError:
+            results.append({"index": index, "status": "rejected", "error": "event log queue is full"})
+        except Exception as e:
+            results.append({"index": index, "status": "rejected", "error": str(e)})
+
+    return {
+        "status": "queued",
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results
+    }
+
+@router.get("/queue")
+async def get_queue_stats():
+    """
+    Report write-behind queue depth and drop/reject counters
+    """
+    return event_log_queue.stats()
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Event timestamps are stored as naive UTC; normalize aware query params to match
+    """
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _event_filters(
+    user_id: str,
+    session_id: str,
+    event_type: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+) -> List[Any]:
+    """
+    Build the WHERE clauses shared by the event listing and its counts
+    """
+    filters = []
+    if user_id:
+        filters.append(EventLog.user_id == user_id)
+    if session_id:
+        filters.append(EventLog.session_id == session_id)
+    if event_type:
+        filters.append(EventLog.event_type == event_type)
+    if start_time:
+        filters.append(EventLog.timestamp >= start_time)
+    if end_time:
+        filters.append(EventLog.timestamp < end_time)
+    return filters
+
+
+def _event_response(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": event["id"],
+        "event_type": event["event_type"],
+        "description": event["description"],
+        "user_id": event["user_id"],
+        "session_id": event["session_id"],
+        "timestamp": event["timestamp"].isoformat(),
+        "metadata": event["event_metadata"],
+        "source": event["source"]
+    }
+
+
+# Per-filter counters, LRU-bounded by event_count_cache_size:
+# filter key -> (exact count, hot-table rows, last id issued when counted, monotonic time)
+_count_cache: "OrderedDict[Tuple[Any, ...], Tuple[int, int, int, float]]" = OrderedDict()
+
+
+async def _count_events(db: AsyncSession, filters: List[Any], cache_key: Tuple[Any, ...], exact: bool) -> Tuple[int, bool]:
+    """
+    Count hot-table events matching the filters.
+
+    Exact counts run COUNT(*) and refresh the cached counter for this filter
+    set. Estimates extrapolate from the cached counter using rows added since
+    (the last id issued, one sqlite_sequence row), and only fall back to an
+    exact count when the counter is missing or older than
+    ``event_count_cache_ttl``.
+    """
+    # Not MAX(id): sealing or compaction may have deleted the newest ids
+    max_id = (await db.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'event_logs'"))).scalar() or 0
+    cached = _count_cache.get(cache_key)
+    fresh = cached is not None and time.monotonic() - cached[3] < settings.event_count_cache_ttl
+
+    if exact or not fresh:
+        count = (await db.execute(select(func.count()).select_from(EventLog).where(*filters))).scalar()
+        hot_rows = count if not filters else (await db.execute(select(func.count()).select_from(EventLog))).scalar()
+        _count_cache[cache_key] = (count, hot_rows, max_id, time.monotonic())
+        _count_cache.move_to_end(cache_key)
+        if len(_count_cache) > settings.event_count_cache_size:
+            _count_cache.popitem(last=False)
+        return count, False
+
+    _count_cache.move_to_end(cache_key)
+    count, hot_rows, counted_max_id, _ = cached
+    new_rows = max(max_id - counted_max_id, 0)
+    if not filters:
+        return count + new_rows, True
+    # Assume new rows match the filter at the same rate as the hot rows already counted;
+    # ids of sealed or compacted rows are gone from the table, so MAX(id) would skew it
+    ratio = count / hot_rows if hot_rows else 0
+    return count + round(new_rows * ratio), True
+
 
 @router.get("/events")
 async def get_events(
-    limit: int = 100,
-    offset: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
     user_id: str = None,
     session_id: str = None,
     event_type: str = None,
-    db: Session = Depends(get_db)
+    start_time: Optional[datetime] = Query(None, description="Only events at or after this time"),
+    end_time: Optional[datetime] = Query(None, description="Only events before this time"),
+    total: str = Query("none", description="Include a total: none, estimate, exact"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Retrieve logged events with optional filtering
+    Retrieve logged events with optional filtering, newest first.
+
+    Pages are keyed by ``(timestamp, id)`` rather than OFFSET, so every page
+    is an index range scan regardless of depth. Pass ``next_cursor`` back as
+    ``cursor`` to fetch the following page. Days that have been sealed into
+    the event archive are read from their segments once the hot table is
+    exhausted, so callers see one continuous timeline.
     """
+    if total not in ("none", "estimate", "exact"):
+        raise HTTPException(status_code=400, detail="total must be one of: none, estimate, exact")
+
+    start_time, end_time = _naive_utc(start_time), _naive_utc(end_time)
+    before = None
+    if cursor:
+        try:
+            cursor_timestamp, cursor_id = decode_cursor(cursor)
+            before = (datetime.fromisoformat(cursor_timestamp), int(cursor_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Rows older than the sealed boundary are served from the archive, even if
+    # the sealer has not finished deleting them from the hot table yet
+    sealed_through = await asyncio.to_thread(event_archive.sealed_through)
+    filters = _event_filters(user_id, session_id, event_type, start_time, end_time)
+    hot_filters = filters + ([EventLog.timestamp >= sealed_through] if sealed_through else [])
+
+    query = select(*[getattr(EventLog, column) for column in ARCHIVED_COLUMNS]).where(*hot_filters)
+    if before:
+        query = query.where(tuple_(EventLog.timestamp, EventLog.id) < tuple_(*before))
+
     try:
-        query = db.query(EventLog)
-        
-        if user_id:
-            query = query.filter(EventLog.user_id == user_id)
-        if session_id:
-            query = query.filter(EventLog.session_id == session_id)
-        if event_type:
-            query = query.filter(EventLog.event_type == event_type)
-            
-        events = query.order_by(EventLog.timestamp.desc()).offset(offset).limit(limit).all()
-        
-        return {
-            "events": [
-                {
-                    "id": event.id,
-                    "event_type": event.event_type,
-                    "description": event.description,
-                    "user_id": event.user_id,
-                    "session_id": event.session_id,
-                    "timestamp": event.timestamp.isoformat(),
-                    "metadata": event.event_metadata,
-                    "source": event.source
-                }
-                for event in events
-            ],
-            "total": query.count()
+        # Fetch one extra row to learn whether another page exists
+        result = await db.execute(
+            query.order_by(EventLog.timestamp.desc(), EventLog.id.desc()).limit(limit + 1)
+        )
+        events = [dict(row._mapping) for row in result]
+
+        archive_end = min(end_time, sealed_through) if end_time and sealed_through else sealed_through
+        if len(events) <= limit and sealed_through and (start_time is None or start_time < sealed_through):
+            events += await asyncio.to_thread(
+                event_archive.fetch,
+                limit + 1 - len(events),
+                start=start_time,
+                end=archive_end,
+                before=before,
+                user_id=user_id,
+                session_id=session_id,
+                event_type=event_type
+            )
+
+        has_more = len(events) > limit
+        events = events[:limit]
+
+        response = {
+            "events": [_event_response(event) for event in events],
+            "next_cursor": encode_cursor([events[-1]["timestamp"].isoformat(), events[-1]["id"]]) if has_more else None,
+            "has_more": has_more
         }
+
+        if total != "none":
+            hot_total, is_estimate = await _count_events(
+                db,
+                hot_filters,
+                (user_id, session_id, event_type, start_time, end_time, sealed_through),
+                exact=(total == "exact")
+            )
+            archived_total = 0
+            if sealed_through and (start_time is None or start_time < sealed_through):
+                # Sealed segments never change, so their counts are cached per filter
+                archived_total = await asyncio.to_thread(
+                    event_archive.count,
+                    start=start_time,
+                    end=archive_end,
+                    user_id=user_id,
+                    session_id=session_id,
+                    event_type=event_type
+                )
+            response["total"] = hot_total + archived_total
+            response["total_is_estimate"] = is_estimate
+
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve events: {str(e)}")
 
+@router.get("/export")
+async def export_events(
+    format: str = Query("arrow", description="Output format: arrow (IPC stream) or parquet"),
+    start_time: Optional[datetime] = Query(None, description="Only events at or after this time"),
+    end_time: Optional[datetime] = Query(None, description="Only events before this time"),
+    user_id: str = None,
+    session_id: str = None,
+    event_type: str = None
+):
+    """
+    Stream events as Arrow IPC or Parquet record batches, oldest first.
+
+    Rows are read in fixed-size chunks (archive blocks, then a hot-table
+    cursor) and encoded batch by batch, so memory stays constant regardless
+    of the time range. ``event_metadata`` is flattened into typed columns.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        export_schema()
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    extension = "arrows" if format == "arrow" else "parquet"
+    return StreamingResponse(
+        stream_event_export(
+            format,
+            start=_naive_utc(start_time),
+            end=_naive_utc(end_time),
+            user_id=user_id,
+            session_id=session_id,
+            event_type=event_type
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="event_logs.{extension}"'}
+    )
+
+@router.get("/rollups")
+async def get_event_rollups(
+    session_id: str = None,
+    page_url: str = None,
+    event_type: str = None,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Retrieve per-session, per-page aggregates of compacted high-frequency events
+    """
+    query = select(EventRollup)
+    if session_id:
+        query = query.where(EventRollup.session_id == session_id)
+    if page_url:
+        query = query.where(EventRollup.page_url == page_url)
+    if event_type:
+        query = query.where(EventRollup.event_type == event_type)
+    if start_day:
+        query = query.where(EventRollup.day >= start_day)
+    if end_day:
+        query = query.where(EventRollup.day <= end_day)
+
+    result = await db.execute(query.order_by(EventRollup.day.desc(), EventRollup.id.desc()).limit(limit))
+    return {
+        "rollups": [
+            {
+                "day": rollup.day.isoformat(),
+                "session_id": rollup.session_id or None,
+                "page_url": rollup.page_url or None,
+                "event_type": rollup.event_type,
+                "user_id": rollup.user_id,
+                "event_count": rollup.event_count,
+                "max_scroll_y": rollup.max_scroll_y,
+                "first_seen": rollup.first_seen.isoformat(),
+                "last_seen": rollup.last_seen.isoformat(),
+                "dwell_seconds": rollup.dwell_seconds
+            }
+            for rollup in result.scalars().all()
+        ]
+    }
+
+@router.get("/sessions")
+async def get_sessions(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    user_id: str = None,
+    has_search: Optional[bool] = None,
+    has_booking: Optional[bool] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List session summaries built by the sessionization pipeline, newest first
+    """
+    query = select(UserSession)
+    if user_id:
+        query = query.where(UserSession.user_id == user_id)
+    if has_search is not None:
+        query = query.where(UserSession.has_search == has_search)
+    if has_booking is not None:
+        query = query.where(UserSession.has_booking == has_booking)
+    if cursor:
+        try:
+            cursor_started_at, cursor_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(UserSession.started_at, UserSession.id)
+                < tuple_(datetime.fromisoformat(cursor_started_at), int(cursor_id))
+            )
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    result = await db.execute(
+        query.order_by(UserSession.started_at.desc(), UserSession.id.desc()).limit(limit + 1)
+    )
+    sessions = result.scalars().all()
+    has_more = len(sessions) > limit
+    sessions = sessions[:limit]
+
+    return {
+        "sessions": [session_summary(session) for session in sessions],
+        "next_cursor": encode_cursor([sessions[-1].started_at.isoformat(), sessions[-1].id]) if has_more else None,
+        "has_more": has_more
+    }
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str, db: AsyncSession = Depends(get_db)):
+    """
+    Summary of one session: timing, page path, event count and outcomes
+    """
+    result = await db.execute(select(UserSession).where(UserSession.session_id == session_id))
+    session = result.scalar_one_or_none()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session_summary(session)
+
+@router.get("/funnels")
+async def list_funnels():
+    """
+    List the defined conversion funnels and their steps
+    """
+    return {
+        "funnels": [
+            {
+                "name": funnel.name,
+                "steps": funnel.step_names,
+                "window_hours": funnel.window.total_seconds() / 3600
+            }
+            for funnel in FUNNELS.values()
+        ]
+    }
+
+@router.get("/funnels/{funnel_name}")
+async def get_funnel(
+    funnel_name: str,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Step counts and conversion rates for a funnel, served from the per-day rollups
+    """
+    funnel = FUNNELS.get(funnel_name)
+    if not funnel:
+        raise HTTPException(status_code=404, detail="Funnel not found")
+    return await funnel_report(db, funnel, start_day, end_day)
+
+@router.get("/analytics/top/{dimension}")
+async def get_top_values(
+    dimension: str,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Approximate most frequent destinations, pages or clicked elements.
+
+    Served from per-day Count-Min/top-K sketches (last 7 days by default);
+    counts may overestimate but never undercount.
+    """
+    if dimension not in TOP_K_DIMENSIONS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown dimension, expected one of: {', '.join(TOP_K_DIMENSIONS)}"
+        )
+    start_day, end_day = default_range(start_day, end_day)
+    sketch = await analytics_sketches.merged(db, dimension, start_day, end_day)
+    return {
+        "dimension": dimension,
+        "start_day": start_day.isoformat(),
+        "end_day": end_day.isoformat(),
+        "approximate": True,
+        "top": [{"value": value, "count": count} for value, count in sketch.top(limit)]
+    }
+
+@router.get("/analytics/unique/{metric}")
+async def get_unique_count(
+    metric: str,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Approximate distinct users or sessions, from per-day HyperLogLog sketches
+    """
+    if metric not in UNIQUE_METRICS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown metric, expected one of: {', '.join(UNIQUE_METRICS)}"
+        )
+    start_day, end_day = default_range(start_day, end_day)
+    sketch = await analytics_sketches.merged(db, metric, start_day, end_day)
+    return {
+        "metric": metric,
+        "start_day": start_day.isoformat(),
+        "end_day": end_day.isoformat(),
+        "approximate": True,
+        "estimate": sketch.estimate()
+    }
+
 async def log_db_update_async(
-    db,  # Can be sync or async session
+    db,  # Unused, kept for existing callers; the event log queue owns its session
     text: str,
     table_name: str,
     update_type: str,
     values: Dict[str, Any],
-    user_id: str = None
+    user_id: str = None,
+    session_id: str = None
 ):
     """
-    Helper function to log database updates (async version)
+    Helper function to log database updates (async version).
+
+    The event is queued for the write-behind writer instead of being committed
+    on the caller's session. Pass the frontend's session id (the X-Session-Id
+    header) so the update is attributed to the browsing session.
     """
     try:
-        event_log = EventLog(
-            event_type='DB_UPDATE',
-            description=text,
-            user_id=user_id,
-            timestamp=datetime.utcnow(),
-            event_metadata={
+        await _enqueue_event(with_promoted_fields({
+            "event_type": 'DB_UPDATE',
+            "description": text,
+            "user_id": user_id,
+            "session_id": session_id,
+            "timestamp": datetime.utcnow(),
+            "event_metadata": {
                 'table_name': table_name,
                 'update_type': update_type,
                 'values': values
             },
-            source='backend'
-        )
-        
-        db.add(event_log)
-        await db.commit()
+            "source": 'backend'
+        }))
         
     except Exception as e:
         print(f"Failed to log DB update: {e}")
@@ -143,24 +609,26 @@ def log_db_update(
     table_name: str,
     update_type: str,
     values: Dict[str, Any],
-    user_id: str = None
+    user_id: str = None,
+    session_id: str = None
 ):
     """
     Helper function to log database updates (sync version)
     """
     try:
-        event_log = EventLog(
-            event_type='DB_UPDATE',
-            description=text,
-            user_id=user_id,
-            timestamp=datetime.utcnow(),
-            event_metadata={
+        event_log = EventLog(**with_promoted_fields({
+            "event_type": 'DB_UPDATE',
+            "description": text,
+            "user_id": user_id,
+            "session_id": session_id,
+            "timestamp": datetime.utcnow(),
+            "event_metadata": {
                 'table_name': table_name,
                 'update_type': update_type,
                 'values': values
             },
-            source='backend'
-        )
+            "source": 'backend'
+        }))
         
         db.add(event_log)
         db.commit()
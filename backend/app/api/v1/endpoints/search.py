@@ -1,15 +1,258 @@
-from fastapi import APIRouter, Depends, Query
+import asyncio
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
-from typing import List, Optional
-from app.database.database import get_db
+from sqlalchemy import select, and_, or_, bindparam, func
+from datetime import date, datetime, time, timedelta
+from itertools import dropwhile, islice
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.pagination import (
+    KeysetOrder, encode_cursor, decode_cursor, keyset_after, keyset_order_by, cursor_value, parse_cursor_value
+)
+from app.database.database import get_db, AsyncSessionLocal
+from app.database import fts
 from app.models.models import Hotel, Flight, Destination, Deal
-from app.schemas.schemas import Hotel as HotelSchema, Flight as FlightSchema, Destination as DestinationSchema, Deal as DealSchema
+from app.schemas.schemas import Hotel as HotelSchema, Flight as FlightSchema, Destination as DestinationSchema, Deal as DealSchema, FareDay, Itinerary, TripPackage, Suggestion, SearchResponse
+from app.services.suggest import suggest_index, SUGGESTION_TYPES
+from app.services.amenity_index import amenity_index, bitset_contains_many, bitset_count, bitset_ids
+from app.services.hotel_facets import compute_hotel_facets
+from app.services.geo_index import geo_index
+from app.services.hotel_features import hotel_features
+from app.services.room_inventory import room_inventory
+from app.services.flight_graph import flight_graph, ITINERARY_SORTS
+from app.services.fare_calendar import fare_calendar
+from app.services.trip_packages import cheapest_combinations
 
 router = APIRouter()
 
 
-@router.get("/hotels", response_model=List[HotelSchema])
+@router.get("/suggest", response_model=List[Suggestion])
+async def suggest(
+    q: str = Query(..., min_length=1, description="Text typed so far"),
+    types: Optional[str] = Query(None, description="Comma-separated: destination, city, hotel, airport"),
+    limit: int = Query(10, ge=1, le=50, description="Number of suggestions"),
+):
+    """
+    Autocomplete destinations, cities, hotels and airports.
+
+    Served from the in-memory suggest index without touching the database:
+    prefix matches first, then typo-tolerant trigram matches.
+    """
+    wanted = None
+    if types:
+        wanted = {t.strip() for t in types.split(",") if t.strip()}
+        unknown = wanted - set(SUGGESTION_TYPES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown suggestion types: {', '.join(sorted(unknown))}")
+    return suggest_index.suggest(q, limit, wanted)
+
+
+HOTEL_SORTS = {
+    "price": [(Hotel.price_per_night, False), (Hotel.id, False)],
+    "rating": [(Hotel.star_rating, True), (Hotel.id, False)],
+    "name": [(Hotel.name, False), (Hotel.id, False)],
+}
+
+FLIGHT_SORTS = {
+    "price": [(Flight.price, False), (Flight.id, False)],
+    "duration": [(Flight.duration_minutes, False), (Flight.id, False)],
+    "departure_time": [(Flight.departure_time, False), (Flight.id, False)],
+}
+
+
+def _sort_order(sorts: Dict[str, KeysetOrder], sort_by: str) -> KeysetOrder:
+    order = sorts.get(sort_by)
+    if order is None:
+        raise HTTPException(status_code=400, detail=f"Invalid sort_by, expected one of: {', '.join(sorts)}")
+    return order
+
+
+async def _keyset_page(
+    db: AsyncSession,
+    query,
+    sort_by: str,
+    order: KeysetOrder,
+    cursor: Optional[str],
+    limit: int,
+    id_mask: Optional[np.ndarray] = None
+) -> Tuple[list, Optional[str], int]:
+    """
+    Fetch one page of ``query`` in ``order``, resuming after ``cursor``.
+
+    The cursor carries the sort name, page number and the last row's sort
+    key, so each page is an index range scan no matter how deep it is.
+    One extra row is fetched to tell whether there is a next page. With a
+    hotel ``id_mask`` bitset, only hotels set in it are kept (see
+    ``_masked_keyset_rows``). Returns (items, next_cursor, page).
+    """
+    page = 1
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(order) + 2 or values[0] != sort_by or not isinstance(values[1], int):
+            raise HTTPException(status_code=400, detail="Cursor does not match this search's sort order")
+        page = values[1] + 1
+        keys = [parse_cursor_value(column, value) for (column, _), value in zip(order, values[2:])]
+        query = query.where(keyset_after(order, keys))
+    
+    if id_mask is not None:
+        rows = await _masked_keyset_rows(db, query, order, id_mask, limit + 1)
+    else:
+        query = query.add_columns(*[column for column, _ in order])
+        result = await db.execute(query.order_by(*keyset_order_by(order)).limit(limit + 1))
+        rows = result.all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([sort_by, page, *[cursor_value(value) for value in rows[-1][1:]]])
+    return [row[0] for row in rows], next_cursor, page
+
+
+async def _masked_keyset_rows(
+    db: AsyncSession,
+    query,
+    order: KeysetOrder,
+    id_mask: np.ndarray,
+    wanted: int
+) -> List[tuple]:
+    """
+    First ``wanted`` (hotel, *sort key) rows of ``query`` whose id is set in
+    ``id_mask``.
+
+    Only ids and sort keys are scanned, in growing keyset batches, and
+    checked against the bitset in one vectorized step per batch; hotels are
+    loaded for the kept ids alone. Used when the mask is too large to send
+    to SQL as an id list, which also means it is dense enough that the scan
+    stops early.
+    """
+    scan = query.with_only_columns(Hotel.id, *[column for column, _ in order]).order_by(*keyset_order_by(order))
+    batch_size = max(wanted * 4, 50)
+    kept = []
+    after = None
+    while len(kept) < wanted:
+        page = scan.where(keyset_after(order, after)) if after is not None else scan
+        batch = (await db.execute(page.limit(batch_size))).all()
+        if not batch:
+            break
+        found = bitset_contains_many(id_mask, [row[0] for row in batch])
+        kept.extend(row for row, keep in zip(batch, found) if keep)
+        if len(batch) < batch_size:
+            break
+        after = list(batch[-1][1:])
+        batch_size = min(batch_size * 2, 5000)
+    kept = kept[:wanted]
+    
+    result = await db.execute(select(Hotel).where(_ids_in("masked_hotel_ids", [row[0] for row in kept])))
+    by_id = {hotel.id: hotel for hotel in result.scalars()}
+    return [(by_id[row[0]], *row[1:]) for row in kept if row[0] in by_id]
+
+
+def _ids_in(name: str, ids) -> Any:
+    """Hotel.id IN (...) with the ids inlined, so large sets don't hit SQLite's bound parameter limit."""
+    return Hotel.id.in_(bindparam(name, list(ids), expanding=True, literal_execute=True))
+
+
+def _stay(check_in: Optional[str], check_out: Optional[str]) -> Tuple[date, date]:
+    if not check_in or not check_out:
+        raise HTTPException(status_code=400, detail="check_in and check_out must be given together")
+    start, end = _parse_date(check_in, "check_in"), _parse_date(check_out, "check_out")
+    if not 0 < (end - start).days <= settings.max_stay_nights:
+        raise HTTPException(
+            status_code=400, detail=f"check_out must be 1 to {settings.max_stay_nights} nights after check_in"
+        )
+    return start, end
+
+
+async def _nearest_page(
+    db: AsyncSession,
+    query,
+    origin: Tuple[float, float],
+    radius_km: Optional[float],
+    cursor: Optional[str],
+    limit: int,
+    id_mask: Optional[np.ndarray] = None
+) -> Tuple[list, Optional[str], int]:
+    """
+    Page through ``query`` in order of distance from ``origin``.
+
+    Candidates come lazily from the geo index, nearest first, and are checked
+    against the remaining filters in small id batches until the page is
+    full, so only cells around the origin are ever visited. Candidates not
+    set in ``id_mask`` are dropped before they reach SQL.
+    """
+    page, after = 1, None
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 4 or values[0] != "distance" or not isinstance(values[1], int):
+            raise HTTPException(status_code=400, detail="Cursor does not match this search's sort order")
+        page, after = values[1] + 1, (float(values[2]), int(values[3]))
+    
+    nearest = geo_index.iter_nearest(*origin, radius_km)
+    if after:
+        nearest = dropwhile(lambda candidate: candidate <= after, nearest)
+    
+    hotels = []
+    while len(hotels) <= limit:
+        batch = list(islice(nearest, max(limit * 4, 50)))
+        if not batch:
+            break
+        if id_mask is not None:
+            found = bitset_contains_many(id_mask, [hotel_id for _, hotel_id in batch])
+            batch = [candidate for candidate, keep in zip(batch, found) if keep]
+            if not batch:
+                continue
+        result = await db.execute(query.where(_ids_in("nearest_hotel_ids", [hotel_id for _, hotel_id in batch])))
+        found = {hotel.id: hotel for hotel in result.scalars()}
+        for distance, hotel_id in batch:
+            if hotel_id in found:
+                hotels.append((distance, found[hotel_id]))
+    
+    next_cursor = None
+    if len(hotels) > limit:
+        hotels = hotels[:limit]
+        next_cursor = encode_cursor(["distance", page, hotels[-1][0], hotels[-1][1].id])
+    return [hotel for _, hotel in hotels], next_cursor, page
+
+
+async def _recommended_page(
+    db: AsyncSession,
+    query,
+    cursor: Optional[str],
+    limit: int,
+    id_mask: Optional[np.ndarray] = None
+) -> Tuple[list, Optional[str], int]:
+    """
+    Page through ``query`` by blended recommended score.
+
+    Only candidate ids come from SQL; ids not set in ``id_mask`` are dropped,
+    then features are read from the hotel feature store and scored
+    vectorized, with argpartition picking the page.
+    """
+    page, after = 1, None
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 4 or values[0] != "recommended" or not isinstance(values[1], int):
+            raise HTTPException(status_code=400, detail="Cursor does not match this search's sort order")
+        page, after = values[1] + 1, (float(values[2]), int(values[3]))
+    
+    candidate_ids = (await db.execute(query.with_only_columns(Hotel.id))).scalars().all()
+    if id_mask is not None:
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)[bitset_contains_many(id_mask, candidate_ids)].tolist()
+    ids, scores = hotel_features.top_recommended(candidate_ids, limit + 1, settings.recommended_weights, after)
+    
+    result = await db.execute(select(Hotel).where(_ids_in("recommended_hotel_ids", ids.tolist())))
+    by_id = {hotel.id: hotel for hotel in result.scalars()}
+    hotels = [by_id[hotel_id] for hotel_id in ids.tolist() if hotel_id in by_id]
+    
+    next_cursor = None
+    if len(hotels) > limit:
+        hotels = hotels[:limit]
+        next_cursor = encode_cursor(["recommended", page, float(scores[limit - 1]), hotels[-1].id])
+    return hotels, next_cursor, page
+
+
+@router.get("/hotels", response_model=SearchResponse)
 async def search_hotels(
     destination: Optional[str] = Query(None, description="Destination city or location"),
     check_in: Optional[str] = Query(None, description="Check-in date"),
@@ -19,22 +262,53 @@ async def search_hotels(
     min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
     max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
     star_rating: Optional[int] = Query(None, ge=1, le=5, description="Minimum star rating"),
-    sort_by: str = Query("price", description="Sort by: price, rating, name"),
+    amenities: Optional[List[str]] = Query(None, description="Required amenities (repeat or comma-separate)"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitude to search around"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitude to search around"),
+    near_destination_id: Optional[int] = Query(None, description="Search around this destination instead of lat/lon"),
+    radius_km: Optional[float] = Query(None, gt=0, le=20000, description="Only hotels within this distance"),
+    sort_by: str = Query("price", description="Sort by: price, rating, name, relevance, distance, recommended"),
     limit: int = Query(20, ge=1, le=100, description="Number of results"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    facets: bool = Query(False, description="Include star rating, price and amenity counts"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Search for hotels with filters."""
+    """
+    Search for hotels with filters.
+
+    ``destination`` is matched against the hotels_fts full-text index (name,
+    location, address), which also provides the BM25 score for
+    ``sort_by=relevance``. ``amenities`` is resolved against the in-memory
+    amenity bitset index before the query runs: small matches filter SQL by
+    id, large ones are checked against each page's candidates. With ``facets=true`` the
+    response also carries filter counts and the exact total, computed in one
+    pass over the destination's candidates. ``lat``/``lon`` (or
+    ``near_destination_id``) with ``radius_km`` and ``sort_by=distance`` are
+    served from the in-memory geo grid. With ``check_in``/``check_out``, hotels
+    without ``rooms`` free rooms for ``guests`` on every night are dropped
+    using the in-memory room inventory. ``sort_by=recommended`` blends price
+    against the location median, stars, popularity and amenity count using
+    the ``recommended_weights`` setting. Pages are keyset-paginated: pass
+    ``next_cursor`` back as ``cursor`` with the same filters and ``sort_by``.
+    """
     query = select(Hotel).where(Hotel.is_active == True)
+    candidates = select(Hotel.id, Hotel.star_rating, Hotel.price_per_night).where(Hotel.is_active == True)
+    matches = None
     
     # Apply filters
     if destination:
-        query = query.where(
-            or_(
+        matches = fts.hotel_matches(destination) if fts.hotel_fts_enabled else None
+        if matches is not None:
+            query = query.join(matches, matches.c.hotel_id == Hotel.id)
+            candidates = candidates.join(matches, matches.c.hotel_id == Hotel.id)
+        else:
+            destination_filter = or_(
                 Hotel.location.ilike(f"%{destination}%"),
                 Hotel.name.ilike(f"%{destination}%"),
                 Hotel.address.ilike(f"%{destination}%")
             )
-        )
+            query = query.where(destination_filter)
+            candidates = candidates.where(destination_filter)
     
     if min_price:
         query = query.where(Hotel.price_per_night >= min_price)
@@ -45,28 +319,119 @@ async def search_hotels(
     if star_rating:
         query = query.where(Hotel.star_rating >= star_rating)
     
+    amenity_mask = None
+    id_mask = None
+    if amenities:
+        names = [name.strip() for value in amenities for name in value.split(",") if name.strip()]
+        amenity_mask = amenity_index.hotels_with_all(names)
+        if amenity_mask is not None:
+            if bitset_count(amenity_mask) <= settings.amenity_sql_id_limit:
+                query = query.where(_ids_in("amenity_hotel_ids", bitset_ids(amenity_mask).tolist()))
+            else:
+                # Too many ids to inline; the page fetchers check candidates against the bitset
+                id_mask = amenity_mask
+    
+    if check_in or check_out:
+        unavailable = room_inventory.unavailable_hotels(*_stay(check_in, check_out), rooms, guests)
+        if unavailable:
+            query = query.where(~_ids_in("unavailable_hotel_ids", unavailable))
+            candidates = candidates.where(~_ids_in("unavailable_hotel_ids", unavailable))
+    
+    origin = None
+    if near_destination_id is not None:
+        near = await db.get(Destination, near_destination_id)
+        if not near:
+            raise HTTPException(status_code=404, detail="Destination not found")
+        if near.latitude is None or near.longitude is None:
+            raise HTTPException(status_code=400, detail="Destination has no coordinates")
+        origin = (near.latitude, near.longitude)
+    elif lat is not None and lon is not None:
+        origin = (lat, lon)
+    elif lat is not None or lon is not None:
+        raise HTTPException(status_code=400, detail="lat and lon must be given together")
+    if origin is None and (radius_km is not None or sort_by == "distance"):
+        raise HTTPException(status_code=400, detail="radius_km and sort_by=distance need lat/lon or near_destination_id")
+    
+    # Distance ordering walks the geo index itself and stops at radius_km
+    if origin and radius_km and (sort_by != "distance" or facets):
+        nearby = geo_index.within(*origin, radius_km)
+        candidates = candidates.where(_ids_in("nearby_hotel_ids", nearby))
+        if sort_by != "distance":
+            query = query.where(_ids_in("nearby_hotel_ids", nearby))
+    
     # Apply sorting
-    if sort_by == "price":
-        query = query.order_by(Hotel.price_per_night)
-    elif sort_by == "rating":
-        query = query.order_by(Hotel.star_rating.desc())
-    elif sort_by == "name":
-        query = query.order_by(Hotel.name)
+    if amenity_mask is not None and not amenity_mask.any():
+        # No hotel has every requested amenity
+        hotels, next_cursor, page = [], None, 1
+    elif sort_by == "distance":
+        hotels, next_cursor, page = await _nearest_page(db, query, origin, radius_km, cursor, limit, id_mask)
+    elif sort_by == "recommended":
+        hotels, next_cursor, page = await _recommended_page(db, query, cursor, limit, id_mask)
+    else:
+        if sort_by == "relevance":
+            order = [(matches.c.rank, False), (Hotel.id, False)] if matches is not None else HOTEL_SORTS["rating"]
+        else:
+            order = _sort_order(HOTEL_SORTS, sort_by)
+        hotels, next_cursor, page = await _keyset_page(db, query, sort_by, order, cursor, limit, id_mask)
     
-    query = query.limit(limit)
+    if origin:
+        for hotel in hotels:
+            distance = geo_index.distance_to(hotel.id, *origin)
+            hotel.distance_km = round(distance, 3) if distance is not None else None
     
-    result = await db.execute(query)
-    hotels = result.scalars().all()
+    total_count = None
+    facet_counts = None
+    if facets:
+        rows = (await db.execute(candidates)).all()
+        total_count, facet_counts = compute_hotel_facets(
+            rows, star_rating, min_price, max_price, amenity_mask,
+            settings.hotel_price_buckets, settings.hotel_facet_amenity_limit
+        )
     
-    return hotels
+    return SearchResponse(
+        hotels=hotels,
+        total_count=total_count,
+        page=page,
+        per_page=limit,
+        has_next=next_cursor is not None,
+        has_prev=cursor is not None,
+        next_cursor=next_cursor,
+        facets=facet_counts
+    )
+
+
+def _parse_date(value: str, name: str) -> date:
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}, expected YYYY-MM-DD")
+
+
+def _place_filter(city_column, airport_column, value: str):
+    """
+    Exact match on a normalized city name (served by the lower(city) route
+    index), or on the airport when the value looks like an IATA code.
+    """
+    normalized = " ".join(value.split()).lower()
+    condition = func.lower(city_column) == normalized
+    if len(normalized) == 3 and normalized.isalpha():
+        condition = or_(condition, airport_column == normalized.upper())
+    return condition
+
 
+def _departure_window(departure_date: str, flex_days: int) -> Tuple[datetime, datetime]:
+    day = _parse_date(departure_date, "departure_date")
+    start = datetime.combine(day - timedelta(days=flex_days), time.min)
+    return start, start + timedelta(days=2 * flex_days + 1)
 
-@router.get("/flights", response_model=List[FlightSchema])
+
+@router.get("/flights", response_model=SearchResponse)
 async def search_flights(
     departure_city: Optional[str] = Query(None, description="Departure city"),
     arrival_city: Optional[str] = Query(None, description="Arrival city"),
-    departure_date: Optional[str] = Query(None, description="Departure date"),
-    return_date: Optional[str] = Query(None, description="Return date"),
+    departure_date: Optional[str] = Query(None, description="Departure date (YYYY-MM-DD)"),
+    return_date: Optional[str] = Query(None, description="Return date (unused here; round trips are searched by /search/trips)"),
+    date_flex_days: int = Query(0, ge=0, le=7, description="Also include flights up to this many days either side"),
     passengers: int = Query(1, ge=1, description="Number of passengers"),
     cabin_class: Optional[str] = Query(None, description="Cabin class: economy, business, first"),
     max_stops: Optional[int] = Query(None, ge=0, description="Maximum number of stops"),
@@ -74,17 +439,29 @@ async def search_flights(
     max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
     sort_by: str = Query("price", description="Sort by: price, duration, departure_time"),
     limit: int = Query(20, ge=1, le=100, description="Number of results"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Search for flights with filters."""
-    query = select(Flight).where(Flight.is_active == True)
+    """
+    Search for flights with filters, keyset-paginated like search_hotels.
+
+    Cities match exactly after normalizing case and whitespace (or as IATA
+    airport codes), so a route plus departure window is a range scan on the
+    (departure city, arrival city, departure time) index. Only flights with
+    enough seats for ``passengers`` are returned.
+    """
+    query = select(Flight).where(Flight.is_active == True, Flight.seats_available >= passengers)
     
     # Apply filters
     if departure_city:
-        query = query.where(Flight.departure_city.ilike(f"%{departure_city}%"))
+        query = query.where(_place_filter(Flight.departure_city, Flight.departure_airport, departure_city))
     
     if arrival_city:
-        query = query.where(Flight.arrival_city.ilike(f"%{arrival_city}%"))
+        query = query.where(_place_filter(Flight.arrival_city, Flight.arrival_airport, arrival_city))
+    
+    if departure_date:
+        window_start, window_end = _departure_window(departure_date, date_flex_days)
+        query = query.where(Flight.departure_time >= window_start, Flight.departure_time < window_end)
     
     if cabin_class:
         query = query.where(Flight.cabin_class == cabin_class)
@@ -98,20 +475,241 @@ async def search_flights(
     if max_price:
         query = query.where(Flight.price <= max_price)
     
-    # Apply sorting
-    if sort_by == "price":
-        query = query.order_by(Flight.price)
-    elif sort_by == "duration":
-        query = query.order_by(Flight.duration_minutes)
-    elif sort_by == "departure_time":
-        query = query.order_by(Flight.departure_time)
+    order = _sort_order(FLIGHT_SORTS, sort_by)
+    flights, next_cursor, page = await _keyset_page(db, query, sort_by, order, cursor, limit)
     
-    query = query.limit(limit)
+    return SearchResponse(
+        flights=flights,
+        page=page,
+        per_page=limit,
+        has_next=next_cursor is not None,
+        has_prev=cursor is not None,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/flights/itineraries", response_model=List[Itinerary])
+async def search_itineraries(
+    departure_city: str = Query(..., description="Departure city or airport code"),
+    arrival_city: str = Query(..., description="Arrival city or airport code"),
+    departure_date: str = Query(..., description="Departure date (YYYY-MM-DD)"),
+    date_flex_days: int = Query(0, ge=0, le=7, description="Also start up to this many days either side"),
+    passengers: int = Query(1, ge=1, description="Number of passengers"),
+    cabin_class: Optional[str] = Query(None, description="Cabin class for every leg"),
+    max_connections: int = Query(2, ge=0, le=2, description="Maximum number of connections"),
+    min_connection_minutes: int = Query(settings.itinerary_min_connection_minutes, ge=0, description="Minimum connection time"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum total fare per passenger"),
+    max_duration_minutes: Optional[int] = Query(None, ge=1, description="Maximum door-to-door duration"),
+    sort_by: str = Query("price", description="Sort by: price, duration"),
+    limit: int = Query(10, ge=1, le=50, description="Number of itineraries"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Direct and connecting itineraries between two cities or airports.
+
+    Served from the in-memory flight graph, which finds up to two-connection
+    routes whose first flight leaves in the departure window; only the
+    chosen flights are then loaded from the database.
+    """
+    if sort_by not in ITINERARY_SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort_by, expected one of: {', '.join(ITINERARY_SORTS)}")
+    window_start, window_end = _departure_window(departure_date, date_flex_days)
     
-    result = await db.execute(query)
-    flights = result.scalars().all()
+    found = flight_graph.itineraries(
+        flight_graph.airports_for(departure_city),
+        flight_graph.airports_for(arrival_city),
+        window_start,
+        window_end,
+        passengers=passengers,
+        cabin_class=cabin_class,
+        max_connections=max_connections,
+        min_connection=timedelta(minutes=min_connection_minutes),
+        max_connection=timedelta(minutes=max(settings.itinerary_max_connection_minutes, min_connection_minutes)),
+        max_price=max_price,
+        max_duration=timedelta(minutes=max_duration_minutes) if max_duration_minutes else None,
+        sort_by=sort_by,
+        limit=limit,
+    )
+    if not found:
+        return []
+    
+    flight_ids = {flight_id for itinerary in found for flight_id in itinerary["flight_ids"]}
+    result = await db.execute(select(Flight).where(Flight.id.in_(flight_ids), Flight.is_active == True))
+    flights = {flight.id: flight for flight in result.scalars()}
+    
+    itineraries = []
+    for itinerary in found:
+        legs = [flights.get(flight_id) for flight_id in itinerary["flight_ids"]]
+        if not all(legs):
+            continue
+        itineraries.append({
+            "flights": legs,
+            "connections": len(legs) - 1,
+            "layover_minutes": [int(layover.total_seconds() // 60) for layover in itinerary["layovers"]],
+            "departure_time": legs[0].departure_time,
+            "arrival_time": legs[-1].arrival_time,
+            "duration_minutes": int(itinerary["duration"].total_seconds() // 60),
+            "total_price": itinerary["total_price"],
+        })
+    return itineraries
+
+
+@router.get("/flights/calendar", response_model=List[FareDay])
+async def fare_calendar_search(
+    departure_city: str = Query(..., description="Departure city or airport code"),
+    arrival_city: str = Query(..., description="Arrival city or airport code"),
+    cabin_class: str = Query("economy", description="Cabin class"),
+    month: Optional[str] = Query(None, description="Whole month (YYYY-MM)"),
+    departure_date: Optional[str] = Query(None, description="Center date (YYYY-MM-DD) for a +/- window"),
+    flex_days: int = Query(3, ge=0, le=31, description="Days either side of departure_date"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lowest available fare per departure day for a route.
+
+    Read from the precomputed fare calendar in one indexed range query,
+    either for a whole ``month`` or for ``departure_date`` +/- ``flex_days``.
+    Days without a bookable flight are omitted.
+    """
+    if month:
+        first = _parse_date(f"{month}-01", "month")
+        start_day = first
+        end_day = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    elif departure_date:
+        center = _parse_date(departure_date, "departure_date")
+        start_day, end_day = center - timedelta(days=flex_days), center + timedelta(days=flex_days)
+    else:
+        raise HTTPException(status_code=400, detail="Either month or departure_date is required")
+    
+    departure_airports = flight_graph.airports_for(departure_city)
+    arrival_airports = flight_graph.airports_for(arrival_city)
+    if not departure_airports or not arrival_airports:
+        return []
+    return await fare_calendar.lowest_fares(db, departure_airports, arrival_airports, cabin_class, start_day, end_day)
+
+
+async def _cheapest_flights(
+    departure_city: str,
+    arrival_city: str,
+    day: str,
+    passengers: int,
+    cabin_class: Optional[str],
+    limit: int
+) -> List[Flight]:
+    async with AsyncSessionLocal() as db:
+        window_start, window_end = _departure_window(day, 0)
+        query = select(Flight).where(
+            Flight.is_active == True,
+            Flight.seats_available >= passengers,
+            _place_filter(Flight.departure_city, Flight.departure_airport, departure_city),
+            _place_filter(Flight.arrival_city, Flight.arrival_airport, arrival_city),
+            Flight.departure_time >= window_start,
+            Flight.departure_time < window_end
+        )
+        if cabin_class:
+            query = query.where(Flight.cabin_class == cabin_class)
+        result = await db.execute(query.order_by(Flight.price, Flight.id).limit(limit))
+        return list(result.scalars())
+
+
+async def _cheapest_hotels(
+    destination: str,
+    stay: Tuple[date, date],
+    rooms: int,
+    guests: int,
+    star_rating: Optional[int],
+    limit: int
+) -> List[Hotel]:
+    async with AsyncSessionLocal() as db:
+        query = select(Hotel).where(Hotel.is_active == True)
+        unavailable = room_inventory.unavailable_hotels(*stay, rooms, guests)
+        if unavailable:
+            query = query.where(~_ids_in("unavailable_hotel_ids", unavailable))
+        matches = fts.hotel_matches(destination) if fts.hotel_fts_enabled else None
+        if matches is not None:
+            query = query.join(matches, matches.c.hotel_id == Hotel.id)
+        else:
+            query = query.where(Hotel.location.ilike(f"%{destination}%"))
+        if star_rating:
+            query = query.where(Hotel.star_rating >= star_rating)
+        result = await db.execute(query.order_by(Hotel.price_per_night, Hotel.id).limit(limit))
+        return list(result.scalars())
+
+
+async def _no_results() -> list:
+    return []
+
+
+@router.get("/trips", response_model=List[TripPackage])
+async def search_trips(
+    departure_city: str = Query(..., description="Departure city or airport code"),
+    arrival_city: str = Query(..., description="Arrival city or airport code"),
+    departure_date: str = Query(..., description="Outbound date (YYYY-MM-DD)"),
+    return_date: Optional[str] = Query(None, description="Return date (YYYY-MM-DD); omit for one way"),
+    passengers: int = Query(1, ge=1, description="Number of passengers"),
+    cabin_class: Optional[str] = Query(None, description="Cabin class"),
+    include_hotel: bool = Query(False, description="Add a hotel at the destination for the stay"),
+    destination: Optional[str] = Query(None, description="Hotel destination, defaults to arrival_city"),
+    rooms: int = Query(1, ge=1, description="Number of rooms"),
+    star_rating: Optional[int] = Query(None, ge=1, le=5, description="Minimum hotel star rating"),
+    max_total_price: Optional[float] = Query(None, gt=0, description="Budget for the whole trip"),
+    limit: int = Query(10, ge=1, le=50, description="Number of combinations"),
+):
+    """
+    Round-trip and flight+hotel package search.
+
+    The outbound, return and hotel queries run concurrently, each on its own
+    session, so latency is bounded by the slowest of them. Each returns its
+    ``trip_leg_candidates`` cheapest options, and the cheapest combinations
+    under ``max_total_price`` are then enumerated best-first. Prices are
+    totals: fares times passengers, nightly rates times nights and rooms.
+    Hotels need ``rooms`` rooms free on every night between the two flights.
+    """
+    outbound_day = _parse_date(departure_date, "departure_date")
+    nights = None
+    if return_date:
+        nights = (_parse_date(return_date, "return_date") - outbound_day).days
+        if nights < 0:
+            raise HTTPException(status_code=400, detail="return_date is before departure_date")
+    if include_hotel and not 0 < (nights or 0) <= settings.max_stay_nights:
+        raise HTTPException(
+            status_code=400, detail=f"Hotel packages need a return_date 1 to {settings.max_stay_nights} nights later"
+        )
+    
+    stay = (outbound_day, outbound_day + timedelta(days=nights)) if include_hotel else None
+    candidates = settings.trip_leg_candidates
+    outbound, returning, hotels = await asyncio.gather(
+        _cheapest_flights(departure_city, arrival_city, departure_date, passengers, cabin_class, candidates),
+        _cheapest_flights(arrival_city, departure_city, return_date, passengers, cabin_class, candidates)
+        if return_date else _no_results(),
+        _cheapest_hotels(destination or arrival_city, stay, rooms, passengers, star_rating, candidates)
+        if include_hotel else _no_results(),
+    )
+    
+    legs = [[(flight.price * passengers, flight) for flight in outbound]]
+    if return_date:
+        legs.append([(flight.price * passengers, flight) for flight in returning])
+    if include_hotel:
+        legs.append([(hotel.price_per_night * nights * rooms, hotel) for hotel in hotels])
+    
+    def valid(combination: list) -> bool:
+        # Same-day round trips: the return has to leave after the outbound lands
+        return not return_date or combination[1].departure_time > combination[0].arrival_time
     
-    return flights
+    packages = []
+    for total, combination in cheapest_combinations(legs, limit, max_total_price, valid):
+        hotel = combination[-1] if include_hotel else None
+        hotel_price = hotel.price_per_night * nights * rooms if hotel else None
+        packages.append({
+            "outbound": combination[0],
+            "return_flight": combination[1] if return_date else None,
+            "hotel": hotel,
+            "nights": nights,
+            "flight_price": round(total - (hotel_price or 0), 2),
+            "hotel_price": round(hotel_price, 2) if hotel else None,
+            "total_price": round(total, 2),
+        })
+    return packages
 
 
 @router.get("/destinations", response_model=List[DestinationSchema])
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -16,6 +16,66 @@ class Settings(BaseSettings):
     project_name: str = "Travel Booking API"
     version: str = "1.0.0"
     
+    # Event logging
+    log_batch_max_events: int = 1000
+    event_queue_max_size: int = 10000
+    event_queue_batch_size: int = 500
+    event_queue_flush_interval: float = 0.5  # seconds
+    event_queue_overflow_policy: str = "drop_oldest"  # block, drop_oldest, reject
+    event_count_cache_ttl: int = 300  # seconds before an estimated total is recounted
+    event_count_cache_size: int = 1024  # filter combinations whose counters are kept
+    
+    # Event log partitions: days older than event_hot_days are sealed into archive segments
+    event_hot_days: int = 7
+    event_archive_dir: str = "./event_archive"
+    event_segment_block_rows: int = 4096
+    event_seal_interval: int = 3600  # seconds, 0 disables the background sealer
+    event_seal_delete_chunk: int = 1000
+    
+    # Event log retention: raw events of these types older than N days are rolled up and deleted
+    event_retention_days: Dict[str, int] = {"SCROLL": 3, "HOVER": 3}
+    event_compaction_chunk: int = 1000
+    event_compaction_interval: int = 3600  # seconds, 0 disables the background compactor
+    event_export_batch_rows: int = 10000
+    
+    # Sessionization pipeline
+    sessionize_interval: int = 60  # seconds, 0 disables the background pipeline
+    sessionize_batch_size: int = 5000
+    session_page_path_max: int = 50
+    
+    # Funnel rollups
+    funnel_interval: int = 60  # seconds, 0 disables the background updater
+    funnel_batch_size: int = 5000
+    
+    # Streaming analytics sketches
+    sketch_cms_width: int = 2048
+    sketch_cms_depth: int = 4
+    sketch_top_k_capacity: int = 100
+    sketch_hll_precision: int = 14  # 2**14 registers, ~0.8% standard error
+    sketch_flush_interval: int = 30  # seconds, 0 disables the background flush
+    
+    # Hotel search facets
+    hotel_price_buckets: List[float] = [100, 200, 300, 500]  # bucket edges per night
+    hotel_facet_amenity_limit: int = 20
+    # Amenity matches up to this many go to SQL as an id list; larger sets are checked against candidates
+    amenity_sql_id_limit: int = 500
+    geo_cell_degrees: float = 0.1  # Geo grid cell size, ~11 km of latitude
+    # sort_by=recommended blend; see HotelFeatureStore.recommended_scores
+    recommended_weights: Dict[str, float] = {"price": 0.35, "stars": 0.25, "popularity": 0.25, "amenity_count": 0.15}
+    # /hotels/{id}/similar blend; see HotelFeatureStore.similar
+    similar_hotel_weights: Dict[str, float] = {"amenities": 0.35, "price": 0.25, "stars": 0.15, "geo": 0.25}
+    similar_hotel_geo_cell_degrees: float = 0.5
+    
+    # Hotel room inventory
+    default_rooms_per_type: int = 10  # For room_types entries without a "rooms" count
+    max_stay_nights: int = 30
+    booking_hold_minutes: int = 10  # How long checkout holds keep seats/rooms
+    
+    # Connecting-flight itineraries
+    itinerary_min_connection_minutes: int = 45
+    itinerary_max_connection_minutes: int = 720  # Longer layovers aren't offered as connections
+    trip_leg_candidates: int = 25  # Cheapest options per leg considered when pairing trips
+    
     # CORS
     allowed_origins: List[str] = [
         "http://localhost:3000",
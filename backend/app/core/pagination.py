@@ -0,0 +1,70 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, and_, or_
+
+# (column, descending) pairs, most significant first; the last must be unique
+KeysetOrder = List[Tuple[Any, bool]]
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode keyset values into an opaque, URL-safe cursor."""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        values = None
+    
+    if not isinstance(values, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+
+
+def keyset_order_by(order: KeysetOrder) -> List[Any]:
+    """ORDER BY clauses for a keyset ordering."""
+    return [column.desc() if descending else column.asc() for column, descending in order]
+
+
+def keyset_after(order: KeysetOrder, values: List[Any]):
+    """
+    WHERE clause for rows strictly after ``values`` in ``order``.
+
+    Unlike a row-value comparison this supports mixed directions, e.g.
+    ``star_rating DESC, id ASC``.
+    """
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        ties = [previous == value for (previous, _), value in zip(order[:i], values[:i])]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*ties, step))
+    return or_(*clauses)
+
+
+def cursor_value(value: Any) -> Any:
+    """JSON-safe form of a keyset value."""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def parse_cursor_value(column: Any, value: Any) -> Any:
+    """Inverse of cursor_value for the given column."""
+    if isinstance(getattr(column, "type", None), DateTime) and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    return value
@@ -0,0 +1,110 @@
+import re
+from typing import Optional
+
+from sqlalchemy import column, func, literal_column, select, table, text
+
+# External-content FTS5 index over the searchable hotel text. The index holds
+# only the tokens; triggers keep it in sync with every insert, update and
+# delete on ``hotels``.
+HOTEL_FTS_COLUMNS = ("name", "location", "address")
+# bm25() column weights, in HOTEL_FTS_COLUMNS order: a name hit beats a city hit beats a street hit
+HOTEL_FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+_HOTEL_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE hotels_fts USING fts5(
+        name, location, address,
+        content='hotels', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER hotels_fts_ai AFTER INSERT ON hotels BEGIN
+        INSERT INTO hotels_fts(rowid, name, location, address)
+        VALUES (new.id, new.name, new.location, new.address);
+    END
+    """,
+    """
+    CREATE TRIGGER hotels_fts_ad AFTER DELETE ON hotels BEGIN
+        INSERT INTO hotels_fts(hotels_fts, rowid, name, location, address)
+        VALUES ('delete', old.id, old.name, old.location, old.address);
+    END
+    """,
+    """
+    CREATE TRIGGER hotels_fts_au AFTER UPDATE OF name, location, address ON hotels BEGIN
+        INSERT INTO hotels_fts(hotels_fts, rowid, name, location, address)
+        VALUES ('delete', old.id, old.name, old.location, old.address);
+        INSERT INTO hotels_fts(rowid, name, location, address)
+        VALUES (new.id, new.name, new.location, new.address);
+    END
+    """,
+]
+
+hotels_fts = table("hotels_fts", column("rowid"))
+
+# Set by ensure_hotel_fts; searches fall back to ILIKE when FTS5 is unavailable
+hotel_fts_enabled = False
+
+
+def ensure_hotel_fts(connection) -> bool:
+    """
+    Create the ``hotels_fts`` index and its triggers if missing, and build it
+    from the existing rows. Run with ``conn.run_sync(ensure_hotel_fts)`` after
+    ``create_all``. Returns whether full-text search is available.
+    """
+    global hotel_fts_enabled
+
+    if connection.dialect.name != "sqlite":
+        hotel_fts_enabled = False
+        return False
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hotels_fts'")
+    ).first()
+    if not exists:
+        try:
+            for ddl in _HOTEL_FTS_DDL:
+                connection.execute(text(ddl))
+        except Exception as e:
+            # SQLite builds without FTS5 keep working on the ILIKE search
+            print(f"Hotel full-text index unavailable: {e}")
+            hotel_fts_enabled = False
+            return False
+        connection.execute(text("INSERT INTO hotels_fts(hotels_fts) VALUES ('rebuild')"))
+
+    hotel_fts_enabled = True
+    return True
+
+
+def hotel_match_expression(query: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match, the
+    last one as a prefix so partially typed input still finds results.
+    Returns None when the text has no searchable words.
+    """
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]]
+    terms.append(f'"{words[-1]}"*')
+    return " ".join(terms)
+
+
+def hotel_matches(query: str):
+    """
+    Subquery of (hotel_id, rank) for hotels matching ``query``, where a lower
+    rank is a better BM25 score. Returns None when nothing is searchable.
+    """
+    expression = hotel_match_expression(query)
+    if expression is None:
+        return None
+    fts = literal_column("hotels_fts")
+    return (
+        select(
+            hotels_fts.c.rowid.label("hotel_id"),
+            func.bm25(fts, *HOTEL_FTS_WEIGHTS).label("rank")
+        )
+        .select_from(hotels_fts)
+        .where(fts.op("MATCH")(expression))
+        .subquery("hotel_matches")
+    )
@@ -0,0 +1,71 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+
+def ensure_schema(connection, metadata):
+    """
+    Bring tables that already exist up to date with the models.
+
+    ``create_all`` only creates missing tables, so databases created before a
+    model gained a column or index never pick them up. This adds missing
+    (nullable) columns and creates missing indexes in place, drops indexes
+    the model no longer declares (e.g. single-column indexes superseded by
+    composites), and rebuilds tables that have since been declared
+    ``sqlite_autoincrement``. Run it with
+    ``conn.run_sync(ensure_schema, Base.metadata)`` after ``create_all``.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {col["name"] for col in inspector.get_columns(table.name)}
+        if table.dialect_options["sqlite"]["autoincrement"] and not _has_autoincrement(connection, table.name):
+            _rebuild_table(connection, table, existing_columns)
+            continue
+
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+        # PRAGMA index_list also reports expression indexes, which the inspector skips
+        index_list = connection.execute(text(f"PRAGMA index_list({table.name})")).fetchall()
+        existing_indexes = {row[1] for row in index_list}
+        declared_indexes = {index.name for index in table.indexes}
+        for row in index_list:
+            # Only CREATE INDEX ones; constraint-backed indexes belong to the table definition
+            if row[3] == "c" and row[1] not in declared_indexes:
+                connection.execute(text(f"DROP INDEX {row[1]}"))
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+
+
+def _has_autoincrement(connection, table_name):
+    sql = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table_name}
+    ).scalar()
+    return "AUTOINCREMENT" in (sql or "").upper()
+
+
+def _rebuild_table(connection, table, existing_columns):
+    """
+    Recreate ``table`` from the model and copy its rows across.
+
+    SQLite cannot add AUTOINCREMENT to an existing table. Its sequence starts
+    at the highest id copied, so ids already handed out are never reused.
+    """
+    old_name = f"{table.name}_old"
+    connection.execute(text(f"ALTER TABLE {table.name} RENAME TO {old_name}"))
+    # Index names are global, so the old table's indexes must go before the new ones are created
+    for row in connection.execute(text(f"PRAGMA index_list({old_name})")).fetchall():
+        if row[3] == "c":  # created by CREATE INDEX rather than a constraint
+            connection.execute(text(f"DROP INDEX {row[1]}"))
+    table.create(connection)
+    columns = ", ".join(column.name for column in table.columns if column.name in existing_columns)
+    connection.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old_name}"))
+    connection.execute(text(f"DROP TABLE {old_name}"))
@@ -2,8 +2,26 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.api import api_router
-from app.database.database import engine
+from app.database.database import engine, AsyncSessionLocal
+from app.database.migrations import ensure_schema
+from app.database.fts import ensure_hotel_fts
 from app.models.models import Base
+from app.services.event_queue import event_log_queue
+from app.services.event_archive import seal_closed_partitions
+from app.services.event_compaction import compact_event_logs
+from app.services.sessionization import sessionize_new_events
+from app.services.checkpoints import protect_checkpointed_ids
+from app.services.funnels import update_funnels
+from app.services.sketches import analytics_sketches
+from app.services.suggest import suggest_index
+from app.services.amenity_index import amenity_index
+from app.services.geo_index import geo_index
+from app.services.hotel_features import hotel_features
+from app.services.room_inventory import room_inventory
+from app.services.flight_graph import flight_graph
+from app.services.fare_calendar import fare_calendar
+from app.services.booking_holds import hold_scheduler
+from app.services.scheduler import PeriodicJob, start_jobs, stop_jobs
 
 # Create FastAPI app
 app = FastAPI(
@@ -26,6 +44,15 @@ app.add_middleware(
 # Include API router
 app.include_router(api_router, prefix=settings.api_v1_prefix)
 
+# Background maintenance jobs
+maintenance_jobs = [
+    PeriodicJob("flush_analytics_sketches", settings.sketch_flush_interval, analytics_sketches.flush),
+    PeriodicJob("sessionize_events", settings.sessionize_interval, sessionize_new_events),
+    PeriodicJob("update_funnels", settings.funnel_interval, update_funnels),
+    PeriodicJob("compact_event_logs", settings.event_compaction_interval, compact_event_logs),
+    PeriodicJob("seal_event_partitions", settings.event_seal_interval, seal_closed_partitions),
+]
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -33,6 +60,41 @@ async def startup_event():
     async with engine.begin() as conn:
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
+        # Add columns and indexes introduced since the tables were created
+        await conn.run_sync(ensure_schema, Base.metadata)
+        # Full-text index for hotel search
+        await conn.run_sync(ensure_hotel_fts)
+    
+    # Event ids must stay above what the incremental pipelines have consumed
+    async with AsyncSessionLocal() as db:
+        await protect_checkpointed_ids(db)
+    
+    # Build in-memory search indexes; committed changes keep them current
+    async with AsyncSessionLocal() as db:
+        await suggest_index.rebuild(db)
+        await amenity_index.rebuild(db)
+        await geo_index.rebuild(db)
+        await hotel_features.rebuild(db)
+        await room_inventory.rebuild(db)
+        await flight_graph.rebuild(db)
+        # Persisted, but rebuilt to pick up flight changes made outside the ORM
+        await fare_calendar.rebuild(db)
+    
+    # Start the write-behind event log writer
+    await event_log_queue.start()
+    # Reload active checkout holds and expire them on schedule
+    await hold_scheduler.start()
+    start_jobs(maintenance_jobs)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background jobs and flush queued event logs before exiting."""
+    await stop_jobs(maintenance_jobs)
+    await hold_scheduler.stop()
+    await event_log_queue.stop()
+    # Deltas from a flush cancelled by stop_jobs are back in pending
+    await analytics_sketches.flush()
 
 
 @app.get("/")
@@ -1,3 +1,3 @@
-from .models import User, Hotel, Flight, Booking, Destination, Deal
+from .models import User, Hotel, Flight, Booking, Destination, Deal, EventLog, EventRollup, UserSession, PipelineCheckpoint, FunnelProgress, FunnelStepCount, AnalyticsSketch, FareCalendar, RoomInventory, BookingHold
 
-__all__ = ["User", "Hotel", "Flight", "Booking", "Destination", "Deal"] 
\ No newline at end of file
+__all__ = ["User", "Hotel", "Flight", "Booking", "Destination", "Deal", "EventLog", "EventRollup", "UserSession", "PipelineCheckpoint", "FunnelProgress", "FunnelStepCount", "AnalyticsSketch", "FareCalendar", "RoomInventory", "BookingHold"] 
\ No newline at end of file
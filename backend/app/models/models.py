@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Date, Float, Boolean, Text, ForeignKey, JSON, Index, UniqueConstraint, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.database import Base
@@ -84,6 +84,15 @@ class Flight(Base):
     
     # Relationships
     bookings = relationship("Booking", back_populates="flight")
+    
+    __table_args__ = (
+        # Route searches match normalized city names or airport codes, then a departure window
+        Index(
+            "ix_flights_route_departure",
+            func.lower(departure_city), func.lower(arrival_city), departure_time
+        ),
+        Index("ix_flights_airports_departure", departure_airport, arrival_airport, departure_time),
+    )
 
 
 class Booking(Base):
@@ -181,14 +190,209 @@ class Deal(Base):
 class EventLog(Base):
     __tablename__ = "event_logs"
     
-    id = Column(Integer, primary_key=True, index=True)
-    event_type = Column(String, nullable=False, index=True)  # CLICK, SCROLL, HOVER, etc.
+    # No separate id index: the rowid already is one, and every index slows ingest
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String, nullable=False)  # CLICK, SCROLL, HOVER, etc.
     description = Column(Text, nullable=False)  # Natural language description
-    user_id = Column(String, nullable=True, index=True)  # Optional user ID
-    session_id = Column(String, nullable=True, index=True)  # Session identifier
-    timestamp = Column(DateTime(timezone=True), nullable=False, index=True)
+    user_id = Column(String, nullable=True)  # Optional user ID
+    session_id = Column(String, nullable=True)  # Session identifier
+    timestamp = Column(DateTime(timezone=True), nullable=False)
     event_metadata = Column(JSON, nullable=True)  # Event-specific data
     source = Column(String, nullable=False, default='frontend')  # 'frontend' or 'backend'
     
+    # Hot event_metadata keys, extracted at ingest so analytics can use indexes
+    page_url = Column(String, nullable=True)
+    custom_action = Column(String, nullable=True)
+    destination = Column(String, nullable=True)
+    
     # Indexing for common queries
-    created_at = Column(DateTime(timezone=True), server_default=func.now()) 
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Keyset pagination walks (timestamp, id) newest first, optionally within one filter
+    __table_args__ = (
+        Index("ix_event_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_event_logs_user_timestamp_id", "user_id", "timestamp", "id"),
+        Index("ix_event_logs_session_timestamp_id", "session_id", "timestamp", "id"),
+        Index("ix_event_logs_type_timestamp_id", "event_type", "timestamp", "id"),
+        # Per-page engagement counts and top searched destinations
+        Index("ix_event_logs_page_url_type", "page_url", "event_type"),
+        Index("ix_event_logs_action_destination", "custom_action", "destination"),
+        # Pipelines checkpoint on id, so ids freed by sealing or compaction must never be reused
+        {"sqlite_autoincrement": True},
+    ) 
+
+
+class EventRollup(Base):
+    __tablename__ = "event_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # Rollup key: one row per day, session, page and event type ('' when unknown)
+    day = Column(Date, nullable=False)
+    session_id = Column(String, nullable=False, default='')
+    page_url = Column(String, nullable=False, default='')
+    event_type = Column(String, nullable=False)  # SCROLL, HOVER, etc.
+    user_id = Column(String, nullable=True)
+    
+    # Aggregates of the raw events that were compacted away
+    event_count = Column(Integer, nullable=False, default=0)
+    max_scroll_y = Column(Integer, nullable=True)
+    first_seen = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+    dwell_seconds = Column(Float, nullable=False, default=0.0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("day", "session_id", "page_url", "event_type", name="uq_event_rollups_key"),
+        Index("ix_event_rollups_session_day", "session_id", "day"),
+        Index("ix_event_rollups_page_day", "page_url", "day"),
+    )
+
+
+class UserSession(Base):
+    __tablename__ = "sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String, unique=True, nullable=False, index=True)
+    user_id = Column(String, nullable=True)
+    
+    # Timing
+    started_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=False)
+    duration_seconds = Column(Float, nullable=False, default=0.0)
+    
+    # Journey
+    event_count = Column(Integer, nullable=False, default=0)
+    page_path = Column(JSON, nullable=True)  # ["http://.../", "http://.../search", ...]
+    entry_page = Column(String, nullable=True)
+    exit_page = Column(String, nullable=True)
+    has_search = Column(Boolean, default=False)
+    has_booking = Column(Boolean, default=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("ix_sessions_started_at_id", "started_at", "id"),
+        Index("ix_sessions_user_started_at_id", "user_id", "started_at", "id"),
+    )
+
+
+class PipelineCheckpoint(Base):
+    __tablename__ = "pipeline_checkpoints"
+    
+    # Incremental pipelines over event_logs remember the last event id they consumed
+    name = Column(String, primary_key=True)
+    last_event_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class FunnelProgress(Base):
+    __tablename__ = "funnel_progress"
+    
+    # Where each actor (user, or session when anonymous) is in an open funnel attempt
+    id = Column(Integer, primary_key=True, index=True)
+    funnel = Column(String, nullable=False)
+    actor = Column(String, nullable=False)  # "user:<id>" or "session:<id>"
+    started_at = Column(DateTime, nullable=False)  # When step 0 was reached
+    step_reached = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("funnel", "actor", name="uq_funnel_progress_actor"),
+        Index("ix_funnel_progress_started_at", "funnel", "started_at"),
+    )
+
+
+class FunnelStepCount(Base):
+    __tablename__ = "funnel_step_counts"
+    
+    # Attempts that reached each step, bucketed by the day the attempt started
+    id = Column(Integer, primary_key=True, index=True)
+    funnel = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    step = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("funnel", "day", "step", name="uq_funnel_step_counts_key"),
+    )
+
+
+class AnalyticsSketch(Base):
+    __tablename__ = "analytics_sketches"
+    
+    # Serialized per-day Count-Min/top-K or HyperLogLog sketch, merged on every flush
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)  # destinations, pages, elements, users, sessions
+    day = Column(Date, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("name", "day", name="uq_analytics_sketches_key"),
+    )
+
+
+class FareCalendar(Base):
+    __tablename__ = "fare_calendar"
+    
+    # Cheapest bookable fare per route, departure day and cabin, kept current by app.services.fare_calendar
+    id = Column(Integer, primary_key=True, index=True)
+    departure_airport = Column(String, nullable=False)
+    arrival_airport = Column(String, nullable=False)
+    cabin_class = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    min_price = Column(Float, nullable=False)
+    flight_count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("departure_airport", "arrival_airport", "cabin_class", "day", name="uq_fare_calendar_key"),
+    )
+
+
+class RoomInventory(Base):
+    __tablename__ = "room_inventory"
+    
+    # Rooms of one type for one night. Rows only exist for nights something has
+    # been booked or held; other nights have the full count from Hotel.room_types
+    id = Column(Integer, primary_key=True, index=True)
+    hotel_id = Column(Integer, ForeignKey("hotels.id"), nullable=False)
+    room_type = Column(String, nullable=False)
+    night = Column(Date, nullable=False, index=True)
+    total_rooms = Column(Integer, nullable=False)
+    booked_rooms = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("hotel_id", "room_type", "night", name="uq_room_inventory_key"),
+    )
+
+
+class BookingHold(Base):
+    __tablename__ = "booking_holds"
+    
+    # Seats/rooms taken for a few minutes during checkout; released on expiry
+    id = Column(Integer, primary_key=True, index=True)
+    hold_reference = Column(String, unique=True, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    flight_id = Column(Integer, ForeignKey("flights.id"), nullable=True)
+    hotel_id = Column(Integer, ForeignKey("hotels.id"), nullable=True)
+    room_type = Column(String, nullable=True)
+    check_in = Column(Date, nullable=True)
+    check_out = Column(Date, nullable=True)
+    seats = Column(Integer, nullable=False, default=0)
+    rooms = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="active")  # active, confirmed, released, expired
+    expires_at = Column(DateTime, nullable=False)
+    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # Startup reloads the active holds into the expiry scheduler
+        Index("ix_booking_holds_status_expires", "status", "expires_at"),
+    )
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
 
@@ -17,6 +17,13 @@ class PaymentStatus(str, Enum):
     refunded = "refunded"
 
 
+class HoldStatus(str, Enum):
+    active = "active"
+    confirmed = "confirmed"
+    released = "released"
+    expired = "expired"
+
+
 class CabinClass(str, Enum):
     economy = "economy"
     business = "business"
@@ -99,6 +106,8 @@ class Hotel(HotelBase):
     is_active: bool
     created_at: datetime
     updated_at: datetime
+    distance_km: Optional[float] = None  # Set by geo searches
+    similarity: Optional[float] = None  # Set by the similar hotels endpoint
     
     class Config:
         from_attributes = True
@@ -161,6 +170,44 @@ class BookingCreate(BookingBase):
     currency: str = "USD"
 
 
+class BookingHoldCreate(BaseModel):
+    hotel_id: Optional[int] = None
+    flight_id: Optional[int] = None
+    check_in_date: Optional[datetime] = None
+    check_out_date: Optional[datetime] = None
+    guest_details: Optional[Dict[str, Any]] = {}
+    traveler_info: Optional[List[Dict[str, Any]]] = []
+
+
+class BookingHoldConfirm(BaseModel):
+    booking_type: str
+    total_price: float = Field(..., gt=0)
+    currency: str = "USD"
+    guest_details: Optional[Dict[str, Any]] = {}
+    traveler_info: Optional[List[Dict[str, Any]]] = []
+    special_requests: Optional[str] = None
+
+
+class BookingHold(BaseModel):
+    id: int
+    hold_reference: str
+    user_id: int
+    flight_id: Optional[int] = None
+    hotel_id: Optional[int] = None
+    room_type: Optional[str] = None
+    check_in: Optional[date] = None
+    check_out: Optional[date] = None
+    seats: int
+    rooms: int
+    status: HoldStatus
+    expires_at: datetime
+    booking_id: Optional[int] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 class BookingUpdate(BaseModel):
     status: Optional[BookingStatus] = None
     payment_status: Optional[PaymentStatus] = None
@@ -271,14 +318,63 @@ class FlightSearchParams(BaseModel):
 
 
 # Response schemas
+class FacetCount(BaseModel):
+    value: str
+    count: int
+    min: Optional[float] = None  # Price buckets only, [min, max)
+    max: Optional[float] = None
+
+
+class HotelFacets(BaseModel):
+    star_rating: List[FacetCount] = []
+    price: List[FacetCount] = []
+    amenities: List[FacetCount] = []
+
+
 class SearchResponse(BaseModel):
     hotels: Optional[List[Hotel]] = []
     flights: Optional[List[Flight]] = []
-    total_count: int
+    total_count: Optional[int] = None  # Only computed when requested (e.g. facets=true)
     page: int
     per_page: int
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None  # Pass back as ``cursor`` for the next page
+    facets: Optional[HotelFacets] = None
+
+
+class Itinerary(BaseModel):
+    flights: List[Flight]
+    connections: int
+    layover_minutes: List[int] = []
+    departure_time: datetime
+    arrival_time: datetime
+    duration_minutes: int
+    total_price: float  # Sum of the leg fares, per passenger
+
+
+class TripPackage(BaseModel):
+    outbound: Flight
+    return_flight: Optional[Flight] = None
+    hotel: Optional[Hotel] = None
+    nights: Optional[int] = None
+    flight_price: float  # All legs, all passengers
+    hotel_price: Optional[float] = None  # All nights, all rooms
+    total_price: float
+
+
+class FareDay(BaseModel):
+    day: date
+    min_price: float
+    flight_count: int
+
+
+class Suggestion(BaseModel):
+    type: str  # destination, city, hotel, airport
+    label: str
+    value: str
+    id: Optional[int] = None
+    fuzzy: bool = False
 
 
 # Event Log schemas
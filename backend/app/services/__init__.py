@@ -0,0 +1 @@
+# Background services and in-process indexes 
\ No newline at end of file
@@ -0,0 +1,167 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models.models import Hotel
+from app.services import change_tracking
+
+# Spellings that mean the same amenity, by normalized key
+_ALIASES = {
+    "freewifi": "wifi",
+    "wirelessinternet": "wifi",
+    "swimmingpool": "pool",
+}
+
+
+def amenity_key(name: str) -> str:
+    """Normalized vocabulary key: "Free Wi-Fi" and "free wifi" both become "wifi"."""
+    key = re.sub(r"[^a-z0-9]+", "", name.lower())
+    return _ALIASES.get(key, key)
+
+
+def iter_bits(mask: int) -> Iterable[int]:
+    """Positions of the set bits in ``mask``, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# Hotel bitsets are arrays of little-endian 64-bit words; bit i is hotel id i
+_WORD_BITS = 64
+
+
+def bitset_contains(bitset: np.ndarray, hotel_id: int) -> bool:
+    word = hotel_id // _WORD_BITS
+    return word < len(bitset) and bool(int(bitset[word]) >> (hotel_id % _WORD_BITS) & 1)
+
+
+def bitset_contains_many(bitset: np.ndarray, hotel_ids: Sequence[int]) -> np.ndarray:
+    """Boolean mask of which ``hotel_ids`` are set in ``bitset``."""
+    ids = np.asarray(hotel_ids, dtype=np.int64)
+    words = ids // _WORD_BITS
+    inside = (ids >= 0) & (words < len(bitset))
+    found = np.zeros(len(ids), dtype=bool)
+    found[inside] = (bitset[words[inside]] >> (ids[inside] % _WORD_BITS).astype(np.uint64)) & np.uint64(1) == 1
+    return found
+
+
+def _unpack(bitsets: np.ndarray) -> np.ndarray:
+    return np.unpackbits(bitsets.astype("<u8").view(np.uint8), axis=-1, bitorder="little")
+
+
+def bitset_ids(bitset: np.ndarray) -> np.ndarray:
+    """Hotel ids set in ``bitset``, ascending."""
+    return np.flatnonzero(_unpack(bitset))
+
+
+def _grown(size: int, needed: int) -> int:
+    return size if needed <= size else max(needed, size * 2)
+
+
+def bitset_count(bitset: np.ndarray) -> int:
+    return int(_unpack(bitset).sum())
+
+
+class AmenityIndex:
+    """
+    Interned amenity vocabulary with bitset postings for active hotels.
+
+    Each amenity gets a small integer id; each hotel stores the set of its
+    amenity ids as one int bitmask, and each amenity stores the set of hotel
+    ids that have it as one row of a fixed-width uint64 matrix. Updates flip
+    single bits in place, and "Pool AND Spa AND WiFi" is one vectorized AND
+    over three rows, without decoding any JSON. Both dimensions grow by
+    doubling, so a rebuild stays linear in the catalog size.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self._ids: Dict[str, int] = {}
+        self._labels: List[str] = []
+        self._postings = np.zeros((16, 16), dtype=np.uint64)
+        self._hotel_bits: Dict[int, int] = {}
+
+    async def rebuild(self, db):
+        """Reload the whole index from the database."""
+        self._clear()
+        result = await db.execute(select(Hotel.id, Hotel.amenities).where(Hotel.is_active == True))
+        for hotel_id, amenities in result:
+            self.upsert(hotel_id, amenities)
+
+    def apply_change(self, model: type, op: str, row: Dict[str, Any]):
+        """change_tracking callback."""
+        if op == "delete" or row.get("is_active") is False:
+            self.remove(row["id"])
+        elif "amenities" in row:
+            self.upsert(row["id"], row["amenities"])
+
+    def intern(self, name: str) -> int:
+        key = amenity_key(name)
+        amenity_id = self._ids.get(key)
+        if amenity_id is None:
+            amenity_id = self._ids[key] = len(self._labels)
+            self._labels.append(name)
+            self._reserve(amenity_id + 1, 0)
+        return amenity_id
+
+    def _reserve(self, amenities: int, hotel_id: int):
+        """Grow the postings matrix to hold ``amenities`` rows and bit ``hotel_id``."""
+        rows, words = self._postings.shape
+        shape = (_grown(rows, amenities), _grown(words, hotel_id // _WORD_BITS + 1))
+        if shape != (rows, words):
+            postings = np.zeros(shape, dtype=np.uint64)
+            postings[:rows, :words] = self._postings
+            self._postings = postings
+
+    def upsert(self, hotel_id: int, amenities: Optional[List[str]]):
+        self.remove(hotel_id)
+        self._reserve(0, hotel_id)
+        word, bit = hotel_id // _WORD_BITS, np.uint64(1 << (hotel_id % _WORD_BITS))
+        bits = 0
+        for name in amenities or []:
+            if isinstance(name, str) and amenity_key(name):
+                amenity_id = self.intern(name)
+                bits |= 1 << amenity_id
+                self._postings[amenity_id, word] |= bit
+        self._hotel_bits[hotel_id] = bits
+
+    def remove(self, hotel_id: int):
+        bits = self._hotel_bits.pop(hotel_id, 0)
+        word, bit = hotel_id // _WORD_BITS, np.uint64(1 << (hotel_id % _WORD_BITS))
+        for amenity_id in iter_bits(bits):
+            self._postings[amenity_id, word] &= ~bit
+
+    def hotels_with_all(self, names: Iterable[str]) -> Optional[np.ndarray]:
+        """
+        Bitset of hotel ids having every amenity in ``names``, or None when no
+        amenity was given. An amenity outside the vocabulary matches nothing.
+        """
+        amenity_ids = []
+        for name in names:
+            amenity_id = self._ids.get(amenity_key(name))
+            if amenity_id is None:
+                return np.zeros(self._postings.shape[1], dtype=np.uint64)
+            amenity_ids.append(amenity_id)
+        if not amenity_ids:
+            return None
+        return np.bitwise_and.reduce(self._postings[amenity_ids], axis=0)
+
+    def amenity_bits(self, hotel_id: int) -> int:
+        return self._hotel_bits.get(hotel_id, 0)
+
+    def label(self, amenity_id: int) -> str:
+        return self._labels[amenity_id]
+
+    def vocabulary(self) -> Dict[str, int]:
+        """Amenity label -> number of active hotels offering it."""
+        counts = _unpack(self._postings[:len(self._labels)]).sum(axis=1)
+        return {self._labels[amenity_id]: int(count) for amenity_id, count in enumerate(counts) if count}
+
+
+amenity_index = AmenityIndex()
+change_tracking.subscribe([Hotel], amenity_index.apply_change)
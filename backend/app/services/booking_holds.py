@@ -0,0 +1,126 @@
+import asyncio
+import heapq
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, update
+
+from app.database.database import AsyncSessionLocal
+from app.models.models import BookingHold
+from app.services.reservations import release_rooms, release_seats
+
+# Columns needed to give a hold's inventory back
+HOLD_INVENTORY_COLUMNS = (
+    BookingHold.id, BookingHold.flight_id, BookingHold.seats, BookingHold.hotel_id,
+    BookingHold.room_type, BookingHold.check_in, BookingHold.check_out, BookingHold.rooms,
+)
+
+
+async def release_hold_inventory(db, hold):
+    """Give back the seats and rooms a hold took, in the caller's transaction."""
+    if hold.flight_id is not None and hold.seats:
+        await release_seats(db, hold.flight_id, hold.seats)
+    if hold.hotel_id is not None and hold.rooms:
+        await release_rooms(db, hold.hotel_id, hold.room_type, hold.check_in, hold.check_out, hold.rooms)
+
+
+class HoldExpiryScheduler:
+    """
+    Expires booking holds at their deadline and releases their inventory.
+
+    Deadlines sit in a min-heap of (expires_at, hold id), so scheduling a
+    hold is one heappush and a single task sleeps until the earliest
+    deadline instead of scanning the table. Holds confirmed or released
+    early stay in the heap and are skipped when they come due: expiring is a
+    conditional update on status = "active", which also makes it safe to
+    race with a confirm. The heap is rebuilt from the active holds on start,
+    so holds outlive restarts.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, retry_delay: float = 5.0):
+        self._session_factory = session_factory
+        self.retry_delay = retry_delay
+        self._heap: List[Tuple[datetime, int]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.expired = 0
+
+    async def start(self):
+        """Load active holds and start the expiry task on the current event loop."""
+        if self._task is not None:
+            return
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(BookingHold.expires_at, BookingHold.id).where(BookingHold.status == "active")
+            )
+            self._heap = [(expires_at, hold_id) for expires_at, hold_id in result]
+        heapq.heapify(self._heap)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+    def schedule(self, hold_id: int, expires_at: datetime):
+        heapq.heappush(self._heap, (expires_at, hold_id))
+        # Only a new earliest deadline changes how long the task should sleep
+        if self._wakeup is not None and self._heap[0] == (expires_at, hold_id):
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        """Heap entries, including holds already confirmed or released."""
+        return len(self._heap)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                now = datetime.utcnow()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                if due:
+                    try:
+                        self.expired += await self.expire([hold_id for _, hold_id in due])
+                    except Exception as e:
+                        print(f"Expiring booking holds failed: {e}")
+                        for entry in due:
+                            heapq.heappush(self._heap, entry)
+                        await asyncio.sleep(self.retry_delay)
+                    continue
+                timeout = (self._heap[0][0] - now).total_seconds()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def expire(self, hold_ids: List[int]) -> int:
+        """Expire the given holds that are still active and past their deadline. Returns holds expired."""
+        async with self._session_factory() as db:
+            result = await db.execute(
+                update(BookingHold)
+                .where(
+                    BookingHold.id.in_(hold_ids),
+                    BookingHold.status == "active",
+                    BookingHold.expires_at <= datetime.utcnow()
+                )
+                .values(status="expired")
+                .returning(*HOLD_INVENTORY_COLUMNS)
+            )
+            holds = result.all()
+            for hold in holds:
+                await release_hold_inventory(db, hold)
+            await db.commit()
+        return len(holds)
+
+
+hold_scheduler = HoldExpiryScheduler()
@@ -0,0 +1,72 @@
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# callback(model, op, row) where op is "upsert" or "delete" and row holds the
+# instance's loaded column values at flush time
+ChangeCallback = Callable[[type, str, Dict[str, Any]], None]
+
+_PENDING_KEY = "pending_changes"
+_subscribers: Dict[type, List[ChangeCallback]] = {}
+
+
+def _snapshot(mapper, target) -> Dict[str, Any]:
+    # Only what is already loaded: flush-time events must not emit SQL
+    loaded = inspect(target).dict
+    return {attr.key: loaded[attr.key] for attr in mapper.column_attrs if attr.key in loaded}
+
+
+def _recorder(op: str):
+    def record(mapper, connection, target):
+        session = Session.object_session(target)
+        if session is None:
+            return
+        session.info.setdefault(_PENDING_KEY, []).append((mapper.class_, op, _snapshot(mapper, target)))
+    return record
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch(session):
+    changes: List[Tuple[type, str, Dict[str, Any]]] = session.info.pop(_PENDING_KEY, [])
+    for model, op, row in changes:
+        for callback in _subscribers.get(model, []):
+            try:
+                callback(model, op, row)
+            except Exception as e:
+                # An index falling behind must not fail the committed write
+                print(f"Change listener failed for {model.__name__}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def subscribe(models: Iterable[type], callback: ChangeCallback):
+    """
+    Call ``callback`` for every committed ORM insert, update or delete of
+    ``models``.
+
+    Changes are collected at flush time and delivered after the transaction
+    commits, so in-memory indexes never see rolled-back writes. Bulk Core
+    statements (``update()``/``delete()`` without the ORM) bypass mapper
+    events: report those with ``record``. Indexes relying on this should
+    also be rebuildable from the database.
+    """
+    for model in models:
+        if model not in _subscribers:
+            _subscribers[model] = []
+            event.listen(model, "after_insert", _recorder("upsert"))
+            event.listen(model, "after_update", _recorder("upsert"))
+            event.listen(model, "after_delete", _recorder("delete"))
+        _subscribers[model].append(callback)
+
+
+def record(session, model: type, op: str, row: Dict[str, Any]):
+    """
+    Queue a change made with a Core statement so subscribers receive it when
+    ``session`` (a Session or AsyncSession) commits, exactly like an ORM
+    change. ``row`` may be partial: the changed columns plus the key.
+    """
+    session.info.setdefault(_PENDING_KEY, []).append((model, op, row))
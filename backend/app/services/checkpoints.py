@@ -0,0 +1,49 @@
+from typing import Any, List
+
+from sqlalchemy import select, func, text
+
+from app.models.models import EventLog, PipelineCheckpoint
+
+
+async def load_checkpoint(db, name: str) -> PipelineCheckpoint:
+    """Fetch a pipeline's checkpoint, creating it at event id 0 the first time."""
+    checkpoint = await db.get(PipelineCheckpoint, name)
+    if checkpoint is None:
+        checkpoint = PipelineCheckpoint(name=name, last_event_id=0)
+        db.add(checkpoint)
+        await db.flush()
+    return checkpoint
+
+
+async def fetch_new_events(db, checkpoint: PipelineCheckpoint, columns: List[Any], batch_size: int):
+    """
+    Next batch of events after the checkpoint, in id (arrival) order.
+
+    The caller advances ``checkpoint.last_event_id`` and commits together with
+    its derived rows, so each event is applied exactly once.
+    """
+    result = await db.execute(
+        select(EventLog.id, *columns)
+        .where(EventLog.id > checkpoint.last_event_id)
+        .order_by(EventLog.id)
+        .limit(batch_size)
+    )
+    return result.all()
+
+
+async def protect_checkpointed_ids(db):
+    """
+    Keep new event ids above every pipeline checkpoint.
+
+    ``event_logs`` ids come from its AUTOINCREMENT sequence. That sequence
+    can sit below a checkpoint when the table was rebuilt after sealing or
+    compaction had emptied it, and new events would then be skipped, so it
+    is raised to the highest checkpoint. Commits.
+    """
+    floor = (await db.execute(select(func.max(PipelineCheckpoint.last_event_id)))).scalar() or 0
+    seq = (await db.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'event_logs'"))).scalar()
+    if seq is None:
+        await db.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('event_logs', :seq)"), {"seq": floor})
+    elif seq < floor:
+        await db.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'event_logs'"), {"seq": floor})
+    await db.commit()
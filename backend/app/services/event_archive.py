@@ -0,0 +1,471 @@
+import asyncio
+import heapq
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, delete, func
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.models import EventLog
+
+# Segment layout:
+#   MAGIC | zlib block | zlib block | ... | footer JSON | footer length (<Q) | MAGIC
+# Each block holds up to event_segment_block_rows JSON-lines rows sorted by
+# (timestamp, id). The footer lists every block's offset, length and
+# timestamp/id bounds so readers only inflate blocks that overlap a query.
+MAGIC = b"EVSEG01\n"
+_FOOTER_TAIL = struct.calcsize("<Q") + len(MAGIC)
+
+# Columns carried into the archive, in EventLog attribute names
+ARCHIVED_COLUMNS = (
+    "id", "event_type", "description", "user_id", "session_id", "timestamp",
+    "event_metadata", "source", "page_url", "custom_action", "destination", "created_at",
+)
+
+EventKey = Tuple[datetime, int]
+
+# Filtered partial-day counts kept per archive
+_COUNT_CACHE_SIZE = 1024
+
+
+def _to_archive_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    archived = dict(row)
+    for column in ("timestamp", "created_at"):
+        if isinstance(archived.get(column), datetime):
+            archived[column] = archived[column].isoformat()
+    return archived
+
+
+def _from_archive_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    for column in ("timestamp", "created_at"):
+        if row.get(column):
+            row[column] = datetime.fromisoformat(row[column])
+    return row
+
+
+def _row_key(row: Dict[str, Any]) -> EventKey:
+    return row["timestamp"], row["id"]
+
+
+def _version(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def matches_filters(row: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """Apply equality filters (user_id, session_id, event_type, ...) to an archived row."""
+    return all(row.get(column) == value for column, value in filters.items() if value is not None)
+
+
+class Segment:
+    """A sealed, read-only day of events, memory-mapped from disk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buf = self._mmap
+        if buf[:len(MAGIC)] != MAGIC or buf[-len(MAGIC):] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"Not an event segment: {path}")
+        (footer_len,) = struct.unpack("<Q", buf[-_FOOTER_TAIL:-len(MAGIC)])
+        footer = json.loads(buf[-_FOOTER_TAIL - footer_len:-_FOOTER_TAIL])
+
+        self.day = date.fromisoformat(footer["day"])
+        self.count = footer["count"]
+        self.event_type_counts = footer["event_type_counts"]
+        self.blocks = footer["blocks"]
+        for block in self.blocks:
+            block["min_key"] = (datetime.fromisoformat(block["min_ts"]), block["min_id"])
+            block["max_key"] = (datetime.fromisoformat(block["max_ts"]), block["max_id"])
+
+    def close(self):
+        self._mmap.close()
+
+    def _read_block(self, block: Dict[str, Any]) -> List[Dict[str, Any]]:
+        raw = zlib.decompress(self._mmap[block["offset"]:block["offset"] + block["length"]])
+        return [_from_archive_row(json.loads(line)) for line in raw.splitlines()]
+
+    def iter_rows(
+        self,
+        newest_first: bool = False,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[EventKey] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield rows in (timestamp, id) order within [start, end) and, when
+        given, strictly before the ``before`` keyset position.
+        """
+        blocks = reversed(self.blocks) if newest_first else self.blocks
+        for block in blocks:
+            if start is not None and block["max_key"][0] < start:
+                continue
+            if end is not None and block["min_key"][0] >= end:
+                continue
+            if before is not None and block["min_key"] >= before:
+                continue
+
+            rows = self._read_block(block)
+            if newest_first:
+                rows.reverse()
+            for row in rows:
+                if start is not None and row["timestamp"] < start:
+                    continue
+                if end is not None and row["timestamp"] >= end:
+                    continue
+                if before is not None and _row_key(row) >= before:
+                    continue
+                yield row
+
+
+def merge_unique(*sorted_rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Merge row streams sorted by (timestamp, id), keeping the first copy of
+    each event. A seal interrupted after writing its segment but before
+    deleting every hot row leaves those rows to be sealed again.
+    """
+    last = None
+    for row in heapq.merge(*sorted_rows, key=_row_key):
+        key = _row_key(row)
+        if key != last:
+            last = key
+            yield row
+
+
+class _SegmentMerge:
+    """
+    Lazily merge an existing segment into sorted batches of newly sealed
+    rows. Each batch pulls in the segment rows that sort at or before its
+    last key, so neither side is ever held in memory as a whole.
+    """
+
+    def __init__(self, existing: Iterable[Dict[str, Any]]):
+        self._existing = iter(existing)
+        self._head: Optional[Dict[str, Any]] = None
+
+    def _until(self, limit: Optional[EventKey]) -> Iterator[Dict[str, Any]]:
+        while True:
+            if self._head is None:
+                self._head = next(self._existing, None)
+                if self._head is None:
+                    return
+            if limit is not None and _row_key(self._head) > limit:
+                return
+            yield self._head
+            self._head = None
+
+    def take(self, batch: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        return merge_unique(self._until(_row_key(batch[-1])), batch)
+
+    def rest(self) -> Iterator[Dict[str, Any]]:
+        return self._until(None)
+
+
+class SegmentWriter:
+    """
+    Incremental segment writer: rows (sorted by timestamp, id) are added in
+    batches and compressed a block at a time, so only the current block is
+    buffered.
+
+    The file is written next to its final name and renamed into place by
+    close(), so readers never observe a partial segment.
+    """
+
+    def __init__(self, path: str, day: date, block_rows: int):
+        self.path = path
+        self.day = day
+        self.block_rows = block_rows
+        self.count = 0
+        self._tmp_path = f"{path}.tmp"
+        self._blocks: List[Dict[str, Any]] = []
+        self._event_type_counts: Dict[str, int] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(MAGIC)
+
+    def _flush(self):
+        pending = self._pending
+        data = zlib.compress(
+            b"\n".join(json.dumps(_to_archive_row(r), separators=(",", ":")).encode("utf-8") for r in pending)
+        )
+        self._blocks.append({
+            "offset": self._file.tell(),
+            "length": len(data),
+            "count": len(pending),
+            "min_ts": pending[0]["timestamp"].isoformat(),
+            "min_id": pending[0]["id"],
+            "max_ts": pending[-1]["timestamp"].isoformat(),
+            "max_id": pending[-1]["id"],
+        })
+        self._file.write(data)
+        pending.clear()
+
+    def add(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            self._pending.append(row)
+            self.count += 1
+            self._event_type_counts[row["event_type"]] = self._event_type_counts.get(row["event_type"], 0) + 1
+            if len(self._pending) >= self.block_rows:
+                self._flush()
+
+    def close(self) -> int:
+        """Write the footer and rename the segment into place. Returns the number of rows."""
+        if self._pending:
+            self._flush()
+        footer = json.dumps({
+            "day": self.day.isoformat(),
+            "count": self.count,
+            "event_type_counts": self._event_type_counts,
+            "blocks": self._blocks,
+        }).encode("utf-8")
+        self._file.write(footer)
+        self._file.write(struct.pack("<Q", len(footer)))
+        self._file.write(MAGIC)
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return self.count
+
+    def abort(self):
+        """Discard the partial file, leaving any existing segment untouched."""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def write_segment(path: str, day: date, rows: Iterable[Dict[str, Any]], block_rows: int) -> int:
+    """
+    Write rows (already sorted by timestamp, id) as a sealed segment.
+    Returns the number of rows.
+    """
+    writer = SegmentWriter(path, day, block_rows)
+    try:
+        writer.add(rows)
+        return writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+
+class EventArchive:
+    """
+    Directory of sealed day segments (``events-YYYYMMDD.seg``).
+
+    Segments are immutable once written, so open segments and per-filter
+    counts are cached and only invalidated when a day is re-sealed. Counts
+    live in a bounded LRU keyed by segment and the part of the query range
+    that falls inside its day.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._segments: Dict[str, Tuple[Tuple[int, int], Segment]] = {}
+        self._counts: "OrderedDict[Tuple[str, Tuple[int, int], Tuple[Any, ...]], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, day: date) -> str:
+        return os.path.join(self.directory, f"events-{day:%Y%m%d}.seg")
+
+    def segments(self) -> List[Segment]:
+        """Open segments, oldest day first."""
+        if not os.path.isdir(self.directory):
+            return []
+        with self._lock:
+            return self._refresh_segments()
+
+    def _refresh_segments(self) -> List[Segment]:
+        current = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith("events-") and name.endswith(".seg")):
+                continue
+            path = os.path.join(self.directory, name)
+            version = _version(path)
+            cached = self._segments.get(path)
+            if cached and cached[0] == version:
+                current[path] = cached
+            else:
+                if cached:
+                    cached[1].close()
+                    self._drop_counts(path)
+                current[path] = (version, Segment(path))
+
+        for path, (_, segment) in self._segments.items():
+            if path not in current:
+                segment.close()
+                self._drop_counts(path)
+        self._segments = current
+        return [segment for _, segment in current.values()]
+
+    def _drop_counts(self, path: str):
+        for key in [key for key in self._counts if key[0] == path]:
+            del self._counts[key]
+
+    def invalidate(self, day: date):
+        """Forget cached counts for a day that has just been (re-)sealed."""
+        with self._lock:
+            self._drop_counts(self.path_for(day))
+
+    def sealed_through(self) -> Optional[datetime]:
+        """Start of the first day not covered by a segment, or None if empty."""
+        segments = self.segments()
+        if not segments:
+            return None
+        return datetime.combine(segments[-1].day + timedelta(days=1), time.min)
+
+    def iter_events(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[EventKey] = None,
+        newest_first: bool = True,
+        **filters
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield archived rows matching the filters, newest first by default."""
+        segments = self.segments()
+        if newest_first:
+            segments = list(reversed(segments))
+        for segment in segments:
+            day_start = datetime.combine(segment.day, time.min)
+            if end is not None and day_start >= end:
+                continue
+            if start is not None and day_start + timedelta(days=1) <= start:
+                continue
+            for row in segment.iter_rows(newest_first, start, end, before):
+                if matches_filters(row, filters):
+                    yield row
+
+    def fetch(self, limit: int, **kwargs) -> List[Dict[str, Any]]:
+        """Collect up to ``limit`` rows from iter_events (run off the event loop)."""
+        rows = []
+        for row in self.iter_events(**kwargs):
+            rows.append(row)
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def count(self, start: Optional[datetime] = None, end: Optional[datetime] = None, **filters) -> int:
+        """
+        Count archived rows. Whole-day counts with no filter other than
+        event_type come straight from segment footers; anything else scans the
+        overlapping blocks once and is cached for the life of the segment.
+        """
+        total = 0
+        filter_key = tuple(sorted((k, v) for k, v in filters.items() if v is not None))
+        for segment in self.segments():
+            day_start = datetime.combine(segment.day, time.min)
+            day_end = day_start + timedelta(days=1)
+            if (end is not None and day_start >= end) or (start is not None and day_end <= start):
+                continue
+
+            whole_day = (start is None or start <= day_start) and (end is None or end >= day_end)
+            if whole_day and all(k == "event_type" for k, _ in filter_key):
+                event_type = filters.get("event_type")
+                total += segment.event_type_counts.get(event_type, 0) if event_type else segment.count
+                continue
+
+            # Clip the range to the day so every query covering it shares an entry
+            day_range = (
+                start if start is not None and start > day_start else None,
+                end if end is not None and end < day_end else None,
+            )
+            cache_key = (segment.path, _version(segment.path), filter_key + (("range",) + day_range,))
+            with self._lock:
+                count = self._counts.get(cache_key)
+                if count is not None:
+                    self._counts.move_to_end(cache_key)
+            if count is None:
+                count = sum(
+                    1 for row in segment.iter_rows(start=day_range[0], end=day_range[1])
+                    if matches_filters(row, filters)
+                )
+                with self._lock:
+                    self._counts[cache_key] = count
+                    if len(self._counts) > _COUNT_CACHE_SIZE:
+                        self._counts.popitem(last=False)
+            total += count
+        return total
+
+
+async def seal_closed_partitions(archive: "EventArchive" = None, hot_days: int = None) -> int:
+    """
+    Move closed day partitions out of ``event_logs`` into sealed segments.
+
+    Every day older than ``hot_days`` is streamed out in (timestamp, id)
+    order, merged with any segment already sealed for that day (late events,
+    or rows left behind by an interrupted run, which are not duplicated),
+    written as a new segment and then deleted from the hot table in chunks.
+    Returns the number of rows sealed.
+    """
+    archive = archive or event_archive
+    hot_days = settings.event_hot_days if hot_days is None else hot_days
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=hot_days), time.min)
+    os.makedirs(archive.directory, exist_ok=True)
+    sealed = 0
+
+    async with AsyncSessionLocal() as session:
+        while True:
+            oldest = (await session.execute(
+                select(func.min(EventLog.timestamp)).where(EventLog.timestamp < cutoff)
+            )).scalar()
+            if oldest is None:
+                break
+
+            day = oldest.date()
+            day_start = datetime.combine(day, time.min)
+            day_end = day_start + timedelta(days=1)
+            columns = [getattr(EventLog, column) for column in ARCHIVED_COLUMNS]
+            in_day = (EventLog.timestamp >= day_start, EventLog.timestamp < day_end)
+
+            # Rows are fetched a block at a time on the event loop; merging,
+            # compression and file I/O run in a worker thread per block.
+            path = archive.path_for(day)
+            existing = Segment(path) if os.path.exists(path) else None
+            merge = _SegmentMerge(existing.iter_rows() if existing else ())
+            writer = SegmentWriter(path, day, settings.event_segment_block_rows)
+            last_id = 0
+            try:
+                result = await session.stream(
+                    select(*columns).where(*in_day).order_by(EventLog.timestamp, EventLog.id)
+                )
+                async for partition in result.partitions(settings.event_segment_block_rows):
+                    rows = [dict(row._mapping) for row in partition]
+                    last_id = max(last_id, max(row["id"] for row in rows))
+                    await asyncio.to_thread(writer.add, merge.take(rows))
+                await asyncio.to_thread(writer.add, merge.rest())
+                await asyncio.to_thread(writer.close)
+            except BaseException:
+                writer.abort()
+                raise
+            finally:
+                if existing:
+                    existing.close()
+            archive.invalidate(day)
+
+            # Ids are issued in commit order, so every row of the day up to the
+            # last streamed id is in the segment; later inserts stay hot.
+            while True:
+                ids = (await session.execute(
+                    select(EventLog.id)
+                    .where(*in_day, EventLog.id <= last_id)
+                    .limit(settings.event_seal_delete_chunk)
+                )).scalars().all()
+                if not ids:
+                    break
+                await session.execute(delete(EventLog).where(EventLog.id.in_(ids)))
+                await session.commit()
+                sealed += len(ids)
+            await session.commit()
+
+    return sealed
+
+
+event_archive = EventArchive(settings.event_archive_dir)
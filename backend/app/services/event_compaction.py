@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.sqlite import insert
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.models import EventLog, EventRollup
+
+RollupKey = Tuple[Any, str, str, str]
+
+
+def _scroll_y(metadata: Optional[Dict[str, Any]]) -> Optional[int]:
+    value = (metadata or {}).get("scroll_y")
+    return value if isinstance(value, int) else None
+
+
+def _aggregate(rows) -> Dict[RollupKey, Dict[str, Any]]:
+    """Fold raw events into per-(day, session, page, type) aggregates."""
+    rollups: Dict[RollupKey, Dict[str, Any]] = {}
+    for row in rows:
+        key = (row.timestamp.date(), row.session_id or '', row.page_url or '', row.event_type)
+        scroll_y = _scroll_y(row.event_metadata)
+        agg = rollups.get(key)
+        if agg is None:
+            rollups[key] = {
+                "day": key[0],
+                "session_id": key[1],
+                "page_url": key[2],
+                "event_type": key[3],
+                "user_id": row.user_id,
+                "event_count": 1,
+                "max_scroll_y": scroll_y,
+                "first_seen": row.timestamp,
+                "last_seen": row.timestamp,
+            }
+            continue
+        agg["event_count"] += 1
+        agg["user_id"] = agg["user_id"] or row.user_id
+        if scroll_y is not None and (agg["max_scroll_y"] is None or scroll_y > agg["max_scroll_y"]):
+            agg["max_scroll_y"] = scroll_y
+        agg["first_seen"] = min(agg["first_seen"], row.timestamp)
+        agg["last_seen"] = max(agg["last_seen"], row.timestamp)
+
+    for agg in rollups.values():
+        agg["dwell_seconds"] = (agg["last_seen"] - agg["first_seen"]).total_seconds()
+    return rollups
+
+
+def _upsert_rollups():
+    """
+    INSERT ... ON CONFLICT that merges a chunk's aggregates into existing rollups.
+    """
+    stmt = insert(EventRollup)
+    table = EventRollup.__table__
+    excluded = stmt.excluded
+    first_seen = func.min(table.c.first_seen, excluded.first_seen)
+    last_seen = func.max(table.c.last_seen, excluded.last_seen)
+    return stmt.on_conflict_do_update(
+        index_elements=["day", "session_id", "page_url", "event_type"],
+        set_={
+            "event_count": table.c.event_count + excluded.event_count,
+            "user_id": func.coalesce(table.c.user_id, excluded.user_id),
+            "max_scroll_y": func.max(
+                func.coalesce(table.c.max_scroll_y, excluded.max_scroll_y),
+                func.coalesce(excluded.max_scroll_y, table.c.max_scroll_y)
+            ),
+            "first_seen": first_seen,
+            "last_seen": last_seen,
+            "dwell_seconds": func.round((func.julianday(last_seen) - func.julianday(first_seen)) * 86400.0, 3),
+            "updated_at": func.now(),
+        }
+    )
+
+
+async def compact_event_type(session, event_type: str, retention_days: int, chunk_size: int) -> int:
+    """
+    Roll up and delete raw events of one type older than its retention window.
+
+    Each chunk's rollup upsert and raw-row delete share one short transaction,
+    so the SQLite write lock is released between chunks and a crash never
+    double-counts or loses events. Returns the number of raw rows removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    removed = 0
+    while True:
+        result = await session.execute(
+            select(
+                EventLog.id, EventLog.event_type, EventLog.session_id, EventLog.user_id,
+                EventLog.page_url, EventLog.timestamp, EventLog.event_metadata
+            )
+            .where(EventLog.event_type == event_type, EventLog.timestamp < cutoff)
+            .order_by(EventLog.timestamp, EventLog.id)
+            .limit(chunk_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+
+        await session.execute(_upsert_rollups(), list(_aggregate(rows).values()))
+        await session.execute(delete(EventLog).where(EventLog.id.in_([row.id for row in rows])))
+        await session.commit()
+        removed += len(rows)
+
+    return removed
+
+
+async def compact_event_logs(retention: Dict[str, int] = None, chunk_size: int = None) -> Dict[str, int]:
+    """
+    Apply the per-event-type retention windows (``event_retention_days``).
+    Returns the number of raw rows compacted per event type.
+    """
+    retention = settings.event_retention_days if retention is None else retention
+    chunk_size = chunk_size or settings.event_compaction_chunk
+    removed = {}
+    async with AsyncSessionLocal() as session:
+        for event_type, days in retention.items():
+            removed[event_type] = await compact_event_type(session, event_type, days, chunk_size)
+    return removed
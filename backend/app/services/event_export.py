@@ -0,0 +1,216 @@
+import asyncio
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.models import EventLog
+from app.services.event_archive import event_archive, ARCHIVED_COLUMNS
+
+EXPORT_FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# event_metadata keys flattened into typed columns; anything else lands in extra_metadata
+_METADATA_COLUMNS = {
+    "element_identifier": "string",
+    "scroll_x": "int64",
+    "scroll_y": "int64",
+    "key": "string",
+    "target_url": "string",
+    "storage_type": "string",
+    "value": "string",
+    "table_name": "string",
+    "update_type": "string",
+}
+_METADATA_JSON_COLUMNS = ("data", "values")
+# Already promoted to EventLog columns at ingest
+_PROMOTED_KEYS = ("page_url", "custom_action", "destination")
+
+
+def _require_pyarrow():
+    """Import pyarrow lazily so the API runs without the export extra installed."""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Event export requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def export_schema():
+    pa = _require_pyarrow()
+    fields = [
+        pa.field("id", pa.int64(), nullable=False),
+        pa.field("event_type", pa.string(), nullable=False),
+        pa.field("description", pa.string()),
+        pa.field("user_id", pa.string()),
+        pa.field("session_id", pa.string()),
+        pa.field("timestamp", pa.timestamp("us"), nullable=False),
+        pa.field("source", pa.string()),
+        pa.field("page_url", pa.string()),
+        pa.field("custom_action", pa.string()),
+        pa.field("destination", pa.string()),
+        pa.field("coord_x", pa.int64()),
+        pa.field("coord_y", pa.int64()),
+    ]
+    fields += [pa.field(name, getattr(pa, kind)()) for name, kind in _METADATA_COLUMNS.items()]
+    fields += [pa.field(name, pa.string()) for name in _METADATA_JSON_COLUMNS]
+    fields.append(pa.field("extra_metadata", pa.string()))
+    return pa.schema(fields)
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _str_or_none(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _to_record_batch(rows: List[Dict[str, Any]], schema):
+    """Flatten event rows (hot or archived) into one columnar record batch."""
+    pa = _require_pyarrow()
+    columns: Dict[str, List[Any]] = {name: [] for name in schema.names}
+
+    for row in rows:
+        metadata = dict(row.get("event_metadata") or {})
+        for key in _PROMOTED_KEYS:
+            metadata.pop(key, None)
+        coordinates = metadata.pop("coordinates", None) or {}
+
+        columns["id"].append(row["id"])
+        columns["event_type"].append(row["event_type"])
+        columns["description"].append(row["description"])
+        columns["user_id"].append(row["user_id"])
+        columns["session_id"].append(row["session_id"])
+        columns["timestamp"].append(row["timestamp"])
+        columns["source"].append(row["source"])
+        columns["page_url"].append(row["page_url"])
+        columns["custom_action"].append(row["custom_action"])
+        columns["destination"].append(row["destination"])
+        columns["coord_x"].append(_int_or_none(coordinates.get("x")))
+        columns["coord_y"].append(_int_or_none(coordinates.get("y")))
+
+        for name, kind in _METADATA_COLUMNS.items():
+            value = metadata.pop(name, None)
+            columns[name].append(_int_or_none(value) if kind == "int64" else _str_or_none(value))
+        for name in _METADATA_JSON_COLUMNS:
+            value = metadata.pop(name, None)
+            columns[name].append(None if value is None else json.dumps(value))
+
+        extra = {k: v for k, v in metadata.items() if v is not None}
+        columns["extra_metadata"].append(json.dumps(extra) if extra else None)
+
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+async def iter_event_rows(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = None,
+    **filters
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield lists of event rows in (timestamp, id) order, oldest first.
+
+    Sealed archive days are read block by block first, then the hot table is
+    streamed through a cursor with ``yield_per`` so only one batch of rows is
+    ever held in memory.
+    """
+    batch_size = batch_size or settings.event_export_batch_rows
+    sealed_through = await asyncio.to_thread(event_archive.sealed_through)
+
+    if sealed_through and (start is None or start < sealed_through):
+        archive_end = min(end, sealed_through) if end else sealed_through
+        archived = event_archive.iter_events(start=start, end=archive_end, newest_first=False, **filters)
+        while True:
+            rows = await asyncio.to_thread(lambda: list(islice(archived, batch_size)))
+            if not rows:
+                break
+            yield rows
+
+    query = select(*[getattr(EventLog, column) for column in ARCHIVED_COLUMNS])
+    if sealed_through:
+        query = query.where(EventLog.timestamp >= sealed_through)
+    if start:
+        query = query.where(EventLog.timestamp >= start)
+    if end:
+        query = query.where(EventLog.timestamp < end)
+    for column, value in filters.items():
+        if value is not None:
+            query = query.where(getattr(EventLog, column) == value)
+
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(
+            query.order_by(EventLog.timestamp, EventLog.id).execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions(batch_size):
+            yield [dict(row._mapping) for row in partition]
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back in chunks."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_event_export(format: str, **kwargs) -> AsyncIterator[bytes]:
+    """
+    Encode events as an Arrow IPC stream or a Parquet file, yielding bytes as
+    each record batch (Parquet row group) is written.
+    """
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+
+    schema = export_schema()
+    sink = _ChunkSink()
+    output = pa.PythonFile(sink, mode="w")
+    if format == "arrow":
+        writer = pa.ipc.new_stream(output, schema)
+    else:
+        writer = pq.ParquetWriter(output, schema, compression="zstd")
+
+    try:
+        async for rows in iter_event_rows(**kwargs):
+            batch = _to_record_batch(rows, schema)
+            if format == "arrow":
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch]))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
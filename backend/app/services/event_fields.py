@@ -0,0 +1,73 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update
+
+from app.models.models import EventLog
+
+# event_metadata keys copied into their own indexed EventLog columns
+PROMOTED_FIELDS = ("page_url", "custom_action", "destination")
+
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def extract_promoted_fields(metadata: Optional[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """
+    Pull the hot analytics keys out of an event's metadata.
+
+    ``destination`` lives under ``data`` for CUSTOM search events
+    (``{"custom_action": "hotel_search", "data": {"destination": "Paris"}}``)
+    but is also accepted at the top level.
+    """
+    metadata = metadata or {}
+    data = metadata.get("data") if isinstance(metadata.get("data"), dict) else {}
+    return {
+        "page_url": _clean(metadata.get("page_url")),
+        "custom_action": _clean(metadata.get("custom_action")),
+        "destination": _clean(metadata.get("destination") or data.get("destination")),
+    }
+
+
+def with_promoted_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Return an EventLog row dict with the promoted columns filled in."""
+    row.update(extract_promoted_fields(row.get("event_metadata")))
+    return row
+
+
+async def backfill_promoted_fields(session, chunk_size: int = 5000) -> int:
+    """
+    Populate the promoted columns for rows written before they existed.
+
+    Walks ``event_logs`` in primary-key order and commits once per chunk so
+    the write lock is never held for long. Returns the number of rows updated.
+    """
+    last_id = 0
+    updated = 0
+    while True:
+        result = await session.execute(
+            select(EventLog.id, EventLog.event_metadata)
+            .where(EventLog.id > last_id)
+            .order_by(EventLog.id)
+            .limit(chunk_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        params = []
+        for row in rows:
+            fields = extract_promoted_fields(row.event_metadata)
+            if any(fields.values()):
+                params.append({"id": row.id, **fields})
+
+        if params:
+            await session.execute(update(EventLog), params)
+            await session.commit()
+            updated += len(params)
+
+    return updated
@@ -0,0 +1,164 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.models import EventLog
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "reject")
+
+# Marks the end of the stream for the writer task
+_STOP = object()
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is full and the overflow policy is ``reject``."""
+
+
+class EventLogQueue:
+    """
+    Write-behind queue for ``event_logs`` rows.
+
+    Request handlers enqueue plain row dicts and return immediately; a single
+    writer task drains the queue in size- or time-bounded batches and commits
+    each batch with one multi-row insert on its own session. Having exactly one
+    writer keeps logging from competing with requests for SQLite's write lock.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        batch_size: int,
+        flush_interval: float,
+        overflow_policy: str = "drop_oldest",
+        session_factory=AsyncSessionLocal
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Counters
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._stopping
+
+    async def start(self):
+        """Start the writer task on the current event loop."""
+        if self._writer is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._stopping = False
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued and stop the writer task."""
+        if self._writer is None:
+            return
+        self._stopping = True
+        await self._queue.put(_STOP)
+        await self._writer
+        self._writer = None
+        self._queue = None
+
+    async def put(self, row: Dict[str, Any]):
+        """
+        Enqueue one EventLog row, applying the overflow policy when full.
+
+        When the writer is not running (scripts, shutdown) the row is written
+        straight away so events are never silently lost.
+        """
+        if not self.running:
+            await self._write([row])
+            return
+
+        if self._queue.full():
+            if self.overflow_policy == "reject":
+                self.rejected += 1
+                raise QueueFullError("Event log queue is full")
+            if self.overflow_policy == "drop_oldest":
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except asyncio.QueueEmpty:
+                    pass
+
+        # With the "block" policy this waits for the writer to make room
+        await self._queue.put(row)
+        self.enqueued += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue depth and lifetime counters."""
+        return {
+            "running": self.running,
+            "overflow_policy": self.overflow_policy,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await self._queue.get()
+            if row is _STOP:
+                return
+            batch = [row]
+            stop = False
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stop = True
+                    break
+                batch.append(row)
+
+            await self._write(batch)
+            if stop:
+                return
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            async with self._session_factory() as session:
+                await session.execute(insert(EventLog), batch)
+                await session.commit()
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Failed to write {len(batch)} log events: {e}")
+
+
+event_log_queue = EventLogQueue(
+    max_size=settings.event_queue_max_size,
+    batch_size=settings.event_queue_batch_size,
+    flush_interval=settings.event_queue_flush_interval,
+    overflow_policy=settings.event_queue_overflow_policy,
+)
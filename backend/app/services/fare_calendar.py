@@ -0,0 +1,170 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.database.database import AsyncSessionLocal
+from app.models.models import Flight, FareCalendar
+from app.services import change_tracking
+
+# (departure airport, arrival airport, cabin class, departure day)
+FareKey = Tuple[str, str, str, date]
+
+_KEY_COLUMNS = ("departure_airport", "arrival_airport", "cabin_class", "departure_time")
+
+
+def _bookable():
+    return (Flight.is_active == True, Flight.seats_available > 0)
+
+
+class FareCalendarService:
+    """
+    Maintains ``fare_calendar``: the cheapest bookable fare for each route,
+    departure day and cabin class.
+
+    The table is rebuilt with one grouped insert at startup. After that,
+    committed flight changes mark the calendar keys they touch (both the
+    flight's old and new key, in case it moved) and a background refresh
+    recomputes just those keys from the route/departure index, so a month
+    of fares is always a single indexed read.
+    """
+
+    def __init__(self):
+        self._keys: Dict[int, FareKey] = {}
+        self._dirty: Set[FareKey] = set()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def rebuild(self, db):
+        """Recompute the whole table from ``flights``."""
+        self._dirty.clear()
+        day = func.date(Flight.departure_time)
+        await db.execute(delete(FareCalendar))
+        await db.execute(insert(FareCalendar).from_select(
+            ["departure_airport", "arrival_airport", "cabin_class", "day", "min_price", "flight_count"],
+            select(
+                Flight.departure_airport, Flight.arrival_airport, Flight.cabin_class, day,
+                func.min(Flight.price), func.count()
+            ).where(*_bookable()).group_by(Flight.departure_airport, Flight.arrival_airport, Flight.cabin_class, day)
+        ))
+        await db.commit()
+
+        result = await db.execute(select(Flight.id, *[getattr(Flight, column) for column in _KEY_COLUMNS]))
+        self._keys = {row[0]: self._key(dict(zip(_KEY_COLUMNS, row[1:]))) for row in result}
+
+    @staticmethod
+    def _key(row: Dict[str, Any]) -> Optional[FareKey]:
+        if any(row.get(column) is None for column in _KEY_COLUMNS):
+            return None
+        return row["departure_airport"], row["arrival_airport"], row["cabin_class"], row["departure_time"].date()
+
+    def apply_change(self, model: type, op: str, row: Dict[str, Any]):
+        """change_tracking callback."""
+        old_key = self._keys.pop(row["id"], None)
+        new_key = None
+        if op != "delete":
+            # Keep the previous key if the snapshot lacked the key columns
+            new_key = self._key(row) or old_key
+            if new_key:
+                self._keys[row["id"]] = new_key
+        self._dirty.update(key for key in (old_key, new_key) if key)
+        self._schedule()
+
+    def _schedule(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_in_background())
+        except RuntimeError:
+            pass  # No loop (scripts): the next read refreshes
+
+    async def _refresh_in_background(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            print(f"Fare calendar refresh failed: {e}")
+
+    async def refresh(self) -> int:
+        """Recompute every key marked dirty. Returns keys written."""
+        async with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            if not dirty:
+                return 0
+            try:
+                async with AsyncSessionLocal() as db:
+                    for key in dirty:
+                        await self._recompute(db, key)
+                    await db.commit()
+            except Exception:
+                self._dirty |= dirty
+                raise
+            return len(dirty)
+
+    async def _recompute(self, db, key: FareKey):
+        departure_airport, arrival_airport, cabin_class, day = key
+        start = datetime.combine(day, time.min)
+        result = await db.execute(
+            select(func.min(Flight.price), func.count()).where(
+                Flight.departure_airport == departure_airport,
+                Flight.arrival_airport == arrival_airport,
+                Flight.departure_time >= start,
+                Flight.departure_time < start + timedelta(days=1),
+                Flight.cabin_class == cabin_class,
+                *_bookable()
+            )
+        )
+        min_price, count = result.one()
+        match = (
+            FareCalendar.departure_airport == departure_airport,
+            FareCalendar.arrival_airport == arrival_airport,
+            FareCalendar.cabin_class == cabin_class,
+            FareCalendar.day == day,
+        )
+        if not count:
+            await db.execute(delete(FareCalendar).where(*match))
+            return
+        stmt = insert(FareCalendar).values(
+            departure_airport=departure_airport, arrival_airport=arrival_airport,
+            cabin_class=cabin_class, day=day, min_price=min_price, flight_count=count
+        )
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["departure_airport", "arrival_airport", "cabin_class", "day"],
+            set_={"min_price": stmt.excluded.min_price, "flight_count": stmt.excluded.flight_count, "updated_at": func.now()}
+        ))
+
+    async def lowest_fares(
+        self,
+        db,
+        departure_airports: Iterable[str],
+        arrival_airports: Iterable[str],
+        cabin_class: str,
+        start_day: date,
+        end_day: date
+    ) -> List[Dict[str, Any]]:
+        """Cheapest fare per day in [start_day, end_day] across all the airport pairs."""
+        # Also waits for a background refresh that is already running
+        await self.refresh()
+        result = await db.execute(
+            select(FareCalendar.day, FareCalendar.min_price, FareCalendar.flight_count).where(
+                FareCalendar.departure_airport.in_(list(departure_airports)),
+                FareCalendar.arrival_airport.in_(list(arrival_airports)),
+                FareCalendar.cabin_class == cabin_class,
+                FareCalendar.day >= start_day,
+                FareCalendar.day <= end_day
+            )
+        )
+        days: Dict[date, Dict[str, Any]] = {}
+        for day, min_price, count in result:
+            current = days.get(day)
+            if current is None:
+                days[day] = {"day": day, "min_price": min_price, "flight_count": count}
+            else:
+                current["min_price"] = min(current["min_price"], min_price)
+                current["flight_count"] += count
+        return [days[day] for day in sorted(days)]
+
+
+fare_calendar = FareCalendarService()
+change_tracking.subscribe([Flight], fare_calendar.apply_change)
@@ -0,0 +1,256 @@
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.models.models import Flight
+from app.services import change_tracking
+
+# Columns a leg needs; partial change snapshots are merged over the last known values
+_COLUMNS = (
+    "id", "departure_airport", "arrival_airport", "departure_city", "arrival_city",
+    "departure_time", "arrival_time", "price", "seats_available", "cabin_class", "is_active",
+)
+
+ITINERARY_SORTS = ("price", "duration")
+
+Departures = List[Tuple[datetime, int]]  # (departure time, flight id), sorted
+
+
+def normalize_place(value: str) -> str:
+    return " ".join(value.split()).lower()
+
+
+class _Leg:
+    __slots__ = ("id", "origin", "destination", "departure", "arrival", "price", "seats", "cabin_class")
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = row["id"]
+        self.origin = row["departure_airport"].upper()
+        self.destination = row["arrival_airport"].upper()
+        self.departure = row["departure_time"]
+        self.arrival = row["arrival_time"]
+        self.price = row["price"]
+        self.seats = row["seats_available"]
+        self.cabin_class = row["cabin_class"]
+
+
+class FlightGraph:
+    """
+    Time-expanded flight network for connecting itineraries.
+
+    Each airport keeps its outgoing flights sorted by departure time, and
+    each (origin, destination) pair keeps its own sorted list, so extending
+    a partial itinerary is a bisect into the connection window rather than a
+    scan. Search is a depth-first branch and bound: a path is abandoned as
+    soon as its price or elapsed time exceeds the caller's limits or the
+    worst of the best ``limit`` itineraries found so far.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._legs: Dict[int, _Leg] = {}
+        self._departures: Dict[str, Departures] = {}
+        self._routes: Dict[Tuple[str, str], Departures] = {}
+        self._city_airports: Dict[str, Dict[str, int]] = {}
+        self._bulk = False
+
+    async def rebuild(self, db):
+        """Reload the whole graph from the database."""
+        self._clear()
+        # Append departures unsorted and sort once at the end instead of insort per flight
+        self._bulk = True
+        try:
+            result = await db.execute(
+                select(*[getattr(Flight, column) for column in _COLUMNS]).where(Flight.is_active == True)
+            )
+            for row in result:
+                self.upsert(dict(row._mapping))
+        finally:
+            self._bulk = False
+            for departures in (*self._departures.values(), *self._routes.values()):
+                departures.sort()
+
+    def apply_change(self, model: type, op: str, row: Dict[str, Any]):
+        """change_tracking callback."""
+        if op == "delete":
+            self.remove(row["id"])
+        else:
+            self.upsert(row)
+
+    def upsert(self, row: Dict[str, Any]):
+        merged = dict(self._rows.get(row["id"], {}))
+        merged.update({k: v for k, v in row.items() if k in _COLUMNS})
+        self.remove(row["id"])
+        if merged.get("is_active") is False or any(merged.get(column) is None for column in _COLUMNS[:-1]):
+            return
+        self._rows[row["id"]] = merged
+        leg = self._legs[row["id"]] = _Leg(merged)
+        entry = (leg.departure, leg.id)
+        for departures in (
+            self._departures.setdefault(leg.origin, []),
+            self._routes.setdefault((leg.origin, leg.destination), []),
+        ):
+            if self._bulk:
+                departures.append(entry)
+            else:
+                insort(departures, entry)
+        for city, airport in ((merged["departure_city"], leg.origin), (merged["arrival_city"], leg.destination)):
+            airports = self._city_airports.setdefault(normalize_place(city), {})
+            airports[airport] = airports.get(airport, 0) + 1
+
+    def remove(self, flight_id: int):
+        row = self._rows.pop(flight_id, None)
+        leg = self._legs.pop(flight_id, None)
+        if leg is None:
+            return
+        entry = (leg.departure, leg.id)
+        for key, index in ((leg.origin, self._departures), ((leg.origin, leg.destination), self._routes)):
+            departures = index.get(key, [])
+            i = bisect_left(departures, entry)
+            if i < len(departures) and departures[i] == entry:
+                del departures[i]
+            if not departures:
+                index.pop(key, None)
+        for city, airport in ((row["departure_city"], leg.origin), (row["arrival_city"], leg.destination)):
+            airports = self._city_airports.get(normalize_place(city), {})
+            airports[airport] -= 1
+            if not airports[airport]:
+                del airports[airport]
+                if not airports:
+                    del self._city_airports[normalize_place(city)]
+
+    def airports_for(self, place: str) -> Set[str]:
+        """Airports serving a city name, or the airport itself for an IATA code."""
+        normalized = normalize_place(place)
+        airports = set(self._city_airports.get(normalized, ()))
+        if len(normalized) == 3 and normalized.isalpha():
+            airports.add(normalized.upper())
+        return airports
+
+    def _window(self, departures: Departures, start: datetime, end: datetime) -> Iterator[_Leg]:
+        """Legs departing in [start, end), earliest first."""
+        for i in range(bisect_left(departures, (start,)), len(departures)):
+            departure, flight_id = departures[i]
+            if departure >= end:
+                break
+            yield self._legs[flight_id]
+
+    def itineraries(
+        self,
+        origins: Iterable[str],
+        destinations: Iterable[str],
+        start: datetime,
+        end: datetime,
+        passengers: int = 1,
+        cabin_class: Optional[str] = None,
+        max_connections: int = 2,
+        min_connection: timedelta = timedelta(minutes=45),
+        max_connection: timedelta = timedelta(hours=12),
+        max_price: Optional[float] = None,
+        max_duration: Optional[timedelta] = None,
+        sort_by: str = "price",
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """
+        Best itineraries from any of ``origins`` to any of ``destinations``
+        whose first flight departs in [start, end).
+
+        Every leg needs ``passengers`` free seats (and ``cabin_class`` when
+        given), each connection allows between ``min_connection`` and
+        ``max_connection`` on the ground, and no airport is visited twice.
+        Results are ranked by total fare (then duration) or by duration
+        (then fare).
+        """
+        destinations = set(destinations)
+        by_price = sort_by == "price"
+        price_limit = float("inf") if max_price is None else max_price
+        duration_limit = timedelta.max if max_duration is None else max_duration
+        # Max-heap (negated keys) of the best ``limit`` itineraries so far
+        best: List[Tuple[Any, ...]] = []
+        found: Dict[Tuple[int, ...], Tuple[float, timedelta]] = {}
+
+        def bounds() -> Tuple[float, timedelta]:
+            # Paths only get more expensive and longer as they grow, so anything
+            # already worse on the ranking key than the current k-th best is dead
+            if len(best) < limit:
+                return price_limit, duration_limit
+            if by_price:
+                return min(price_limit, -best[0][0]), duration_limit
+            return price_limit, min(duration_limit, -best[0][0])
+
+        def offer(path: List[_Leg], price: float):
+            duration = path[-1].arrival - path[0].departure
+            key = (-price, -duration) if by_price else (-duration, -price)
+            ids = tuple(leg.id for leg in path)
+            if len(best) < limit:
+                heapq.heappush(best, (*key, ids))
+            elif key > best[0][:2]:
+                _, _, dropped = heapq.heapreplace(best, (*key, ids))
+                del found[dropped]
+            else:
+                return
+            found[ids] = (price, duration)
+
+        def usable(leg: _Leg, path: List[_Leg], price: float) -> bool:
+            if leg.seats < passengers or (cabin_class and leg.cabin_class != cabin_class):
+                return False
+            if any(leg.destination == step.origin for step in path):
+                return False
+            price_bound, duration_bound = bounds()
+            departure = path[0].departure if path else leg.departure
+            return price + leg.price <= price_bound and leg.arrival - departure <= duration_bound
+
+        def extend(path: List[_Leg], price: float):
+            leg = path[-1]
+            if leg.destination in destinations:
+                offer(path, price)
+                return
+            if len(path) > max_connections:
+                return
+            earliest, latest = leg.arrival + min_connection, leg.arrival + max_connection
+            if len(path) == max_connections:
+                # Last hop: only flights straight into a destination
+                sources = [self._routes.get((leg.destination, airport), []) for airport in destinations]
+            else:
+                sources = [self._departures.get(leg.destination, [])]
+            for departures in sources:
+                for next_leg in self._window(departures, earliest, latest):
+                    if next_leg.departure - path[0].departure > bounds()[1]:
+                        break
+                    if usable(next_leg, path, price):
+                        path.append(next_leg)
+                        extend(path, price + next_leg.price)
+                        path.pop()
+
+        for origin in set(origins) - destinations:
+            if max_connections == 0:
+                sources = [self._routes.get((origin, airport), []) for airport in destinations]
+            else:
+                sources = [self._departures.get(origin, [])]
+            for departures in sources:
+                for leg in self._window(departures, start, end):
+                    if usable(leg, [], 0.0):
+                        extend([leg], leg.price)
+
+        ranked = sorted(found.items(), key=lambda item: (item[1] if by_price else item[1][::-1], item[0]))
+        return [
+            {
+                "flight_ids": list(ids),
+                "total_price": round(price, 2),
+                "duration": duration,
+                "layovers": [
+                    self._legs[b].departure - self._legs[a].arrival for a, b in zip(ids, ids[1:])
+                ],
+            }
+            for ids, (price, duration) in ranked
+        ]
+
+
+flight_graph = FlightGraph()
+change_tracking.subscribe([Flight], flight_graph.apply_change)
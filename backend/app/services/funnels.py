@@ -0,0 +1,226 @@
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.sqlite import insert
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.models import EventLog, FunnelProgress, FunnelStepCount
+from app.services.checkpoints import load_checkpoint, fetch_new_events
+
+CHECKPOINT_NAME = "funnels"
+
+_EVENT_COLUMNS = [
+    EventLog.user_id, EventLog.session_id, EventLog.timestamp, EventLog.event_type,
+    EventLog.page_url, EventLog.custom_action, EventLog.event_metadata,
+]
+
+
+class EventPredicate:
+    """
+    Matches an event on its type, custom action, a regex over the visited URL
+    and/or exact event_metadata values.
+    """
+
+    def __init__(
+        self,
+        event_type: Optional[str] = None,
+        custom_action: Optional[str] = None,
+        url_pattern: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.event_type = event_type
+        self.custom_action = custom_action
+        self.url_pattern = re.compile(url_pattern) if url_pattern else None
+        self.metadata = metadata or {}
+
+    def __call__(self, event) -> bool:
+        if self.event_type and event.event_type != self.event_type:
+            return False
+        if self.custom_action and event.custom_action != self.custom_action:
+            return False
+        metadata = event.event_metadata or {}
+        if self.url_pattern:
+            url = metadata.get("target_url") or event.page_url or ""
+            if not self.url_pattern.search(url):
+                return False
+        return all(metadata.get(key) == value for key, value in self.metadata.items())
+
+
+class Funnel:
+    """Ordered steps an actor must reach within ``window`` of the first one."""
+
+    def __init__(self, name: str, steps: List[Tuple[str, EventPredicate]], window: timedelta):
+        self.name = name
+        self.steps = steps
+        self.window = window
+
+    @property
+    def step_names(self) -> List[str]:
+        return [name for name, _ in self.steps]
+
+
+FUNNELS: Dict[str, Funnel] = {
+    "search_to_booking": Funnel(
+        "search_to_booking",
+        [
+            ("hotel_search", EventPredicate(event_type="CUSTOM", custom_action="hotel_search")),
+            ("hotel_view", EventPredicate(event_type="GO_TO_URL", url_pattern=r"/hotels/\d+")),
+            ("booking", EventPredicate(
+                event_type="DB_UPDATE", metadata={"table_name": "bookings", "update_type": "insert"}
+            )),
+        ],
+        window=timedelta(hours=24),
+    ),
+}
+
+
+def _actor(event) -> Optional[str]:
+    # Backend DB_UPDATE events carry the session from the X-Session-Id header,
+    # so a session's anonymous steps and its booking share one actor
+    if event.session_id:
+        return f"session:{event.session_id}"
+    if event.user_id:
+        return f"user:{event.user_id}"
+    return None
+
+
+def _advance(funnel: Funnel, progress: Optional[FunnelProgress], event, counts) -> Optional[FunnelProgress]:
+    """
+    Apply one event to an actor's attempt and bump the step counters it reaches.
+    Returns the (possibly new) progress row.
+    """
+    last_step = len(funnel.steps) - 1
+    open_attempt = (
+        progress is not None
+        and progress.step_reached < last_step
+        and event.timestamp - progress.started_at <= funnel.window
+    )
+
+    if open_attempt:
+        _, next_step = funnel.steps[progress.step_reached + 1]
+        if next_step(event):
+            progress.step_reached += 1
+            counts[(progress.started_at.date(), progress.step_reached)] += 1
+            return progress
+
+    if not open_attempt and funnel.steps[0][1](event):
+        if progress is None:
+            progress = FunnelProgress(funnel=funnel.name)
+        progress.started_at = event.timestamp
+        progress.step_reached = 0
+        counts[(event.timestamp.date(), 0)] += 1
+
+    return progress
+
+
+async def _load_progress(db, funnel: Funnel, actors) -> Dict[str, FunnelProgress]:
+    if not actors:
+        return {}
+    result = await db.execute(
+        select(FunnelProgress).where(FunnelProgress.funnel == funnel.name, FunnelProgress.actor.in_(actors))
+    )
+    return {progress.actor: progress for progress in result.scalars()}
+
+
+async def _add_counts(db, funnel: Funnel, counts: Dict[Tuple[date, int], int]):
+    if not counts:
+        return
+    stmt = insert(FunnelStepCount)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["funnel", "day", "step"],
+        set_={"count": FunnelStepCount.__table__.c.count + stmt.excluded.count}
+    )
+    await db.execute(stmt, [
+        {"funnel": funnel.name, "day": day, "step": step, "count": count}
+        for (day, step), count in counts.items()
+    ])
+
+
+async def update_funnels(batch_size: int = None) -> int:
+    """
+    Apply events logged since the checkpoint to every funnel's step counts.
+
+    Per-actor progress and per-day step counters are updated and the
+    checkpoint advanced in one transaction per batch. Attempts whose
+    conversion window has closed are pruned afterwards. Returns the number
+    of events consumed.
+    """
+    batch_size = batch_size or settings.funnel_batch_size
+    consumed = 0
+    async with AsyncSessionLocal() as db:
+        checkpoint = await load_checkpoint(db, CHECKPOINT_NAME)
+        while True:
+            events = await fetch_new_events(db, checkpoint, _EVENT_COLUMNS, batch_size)
+            if not events:
+                break
+
+            actors = {_actor(event) for event in events} - {None}
+            for funnel in FUNNELS.values():
+                progress_by_actor = await _load_progress(db, funnel, actors)
+                counts: Dict[Tuple[date, int], int] = defaultdict(int)
+                for event in events:
+                    actor = _actor(event)
+                    if actor is None:
+                        continue
+                    progress = _advance(funnel, progress_by_actor.get(actor), event, counts)
+                    if progress is not None and actor not in progress_by_actor:
+                        progress.actor = actor
+                        db.add(progress)
+                        progress_by_actor[actor] = progress
+                await _add_counts(db, funnel, counts)
+
+            checkpoint.last_event_id = events[-1].id
+            await db.commit()
+            consumed += len(events)
+
+        # Attempts past their window can never convert further
+        for funnel in FUNNELS.values():
+            await db.execute(
+                delete(FunnelProgress).where(
+                    FunnelProgress.funnel == funnel.name,
+                    FunnelProgress.started_at < datetime.utcnow() - funnel.window
+                )
+            )
+        await db.commit()
+
+    return consumed
+
+
+async def funnel_report(db, funnel: Funnel, start_day: Optional[date], end_day: Optional[date]) -> Dict[str, Any]:
+    """Step counts and conversion rates for attempts started in [start_day, end_day]."""
+    query = (
+        select(FunnelStepCount.step, func.sum(FunnelStepCount.count))
+        .where(FunnelStepCount.funnel == funnel.name)
+        .group_by(FunnelStepCount.step)
+    )
+    if start_day:
+        query = query.where(FunnelStepCount.day >= start_day)
+    if end_day:
+        query = query.where(FunnelStepCount.day <= end_day)
+    totals = dict((await db.execute(query)).all())
+
+    steps = []
+    first = totals.get(0, 0)
+    previous = None
+    for index, name in enumerate(funnel.step_names):
+        count = totals.get(index, 0)
+        steps.append({
+            "step": index,
+            "name": name,
+            "count": count,
+            "conversion_from_previous": round(count / previous, 4) if previous else None,
+            "conversion_from_start": round(count / first, 4) if first else None,
+        })
+        previous = count
+
+    return {
+        "funnel": funnel.name,
+        "window_hours": funnel.window.total_seconds() / 3600,
+        "start_day": start_day.isoformat() if start_day else None,
+        "end_day": end_day.isoformat() if end_day else None,
+        "steps": steps,
+    }
@@ -0,0 +1,150 @@
+import heapq
+import math
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.models import Hotel
+from app.services import change_tracking
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+Cell = Tuple[int, int]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """
+    Uniform lat/lon grid over active hotels with coordinates.
+
+    Radius and nearest-N queries only compute haversine distances for hotels
+    in cells around the query point, visiting rings of cells outwards and
+    stopping once no unvisited cell can hold anything closer. Longitude
+    columns wrap around the antimeridian, so rings (and the distance bound
+    they give) reach across ±180° instead of stopping at the grid's edge.
+    """
+
+    def __init__(self, cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        # Whole columns around the globe; lon_degrees is cell_degrees rounded to fit
+        self.columns = max(1, round(360 / cell_degrees))
+        self.lon_degrees = 360 / self.columns
+        self._cells: Dict[Cell, Set[int]] = {}
+        self._points: Dict[int, Tuple[float, float]] = {}
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.lon_degrees) % self.columns
+
+    async def rebuild(self, db):
+        """Reload the whole index from the database."""
+        self._cells, self._points = {}, {}
+        result = await db.execute(
+            select(Hotel.id, Hotel.latitude, Hotel.longitude).where(
+                Hotel.is_active == True, Hotel.latitude.isnot(None), Hotel.longitude.isnot(None)
+            )
+        )
+        for hotel_id, lat, lon in result:
+            self.upsert(hotel_id, lat, lon)
+
+    def apply_change(self, model: type, op: str, row: Dict[str, Any]):
+        """change_tracking callback."""
+        if op == "delete" or row.get("is_active") is False:
+            self.remove(row["id"])
+        elif "latitude" in row and "longitude" in row:
+            self.upsert(row["id"], row["latitude"], row["longitude"])
+
+    def upsert(self, hotel_id: int, lat: Optional[float], lon: Optional[float]):
+        self.remove(hotel_id)
+        if lat is None or lon is None:
+            return
+        self._points[hotel_id] = (lat, lon)
+        self._cells.setdefault(self._cell(lat, lon), set()).add(hotel_id)
+
+    def remove(self, hotel_id: int):
+        point = self._points.pop(hotel_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(hotel_id)
+            if not members:
+                del self._cells[cell]
+
+    def _ring(self, center: Cell, radius: int) -> Iterator[Cell]:
+        cy, cx = center
+        if radius == 0:
+            yield center
+            return
+        for dx in range(-radius, radius + 1):
+            yield cy - radius, (cx + dx) % self.columns
+            yield cy + radius, (cx + dx) % self.columns
+        for dy in range(-radius + 1, radius):
+            yield cy + dy, (cx - radius) % self.columns
+            yield cy + dy, (cx + radius) % self.columns
+
+    def _ring_clearance_km(self, lat: float, radius: int) -> float:
+        """
+        Lower bound on the distance from the query point to anything beyond
+        ring ``radius``. Rings wrap, so anything unvisited is more than
+        ``radius`` columns away going either way around.
+        """
+        # Longitude cells are narrowest at the highest latitude the ring reaches
+        edge_lat = min(90.0, abs(lat) + (radius + 1) * self.cell_degrees)
+        width = self.lon_degrees * KM_PER_DEGREE_LAT * max(math.cos(math.radians(edge_lat)), 0.01)
+        return radius * min(width, self.cell_degrees * KM_PER_DEGREE_LAT)
+
+    def iter_nearest(self, lat: float, lon: float, max_km: Optional[float] = None) -> Iterator[Tuple[float, int]]:
+        """Yield (distance_km, hotel_id) in increasing distance, lazily."""
+        center = self._cell(lat, lon)
+        heap: List[Tuple[float, int]] = []
+        visited: Set[Cell] = set()
+
+        def visit(cell: Cell):
+            # Wrapped rings overlap once they are wider than the globe
+            if cell in visited:
+                return
+            visited.add(cell)
+            for hotel_id in self._cells.get(cell, ()):
+                distance = haversine_km(lat, lon, *self._points[hotel_id])
+                if max_km is None or distance <= max_km:
+                    heapq.heappush(heap, (distance, hotel_id))
+
+        radius = 0
+        while True:
+            if 8 * radius > len(self._cells):
+                # The ring has more cells than the grid has occupied ones: sweep the rest
+                for cell in list(self._cells):
+                    visit(cell)
+                break
+            for cell in self._ring(center, radius):
+                visit(cell)
+            clearance = self._ring_clearance_km(lat, radius)
+            while heap and heap[0][0] <= clearance:
+                yield heapq.heappop(heap)
+            if max_km is not None and clearance > max_km:
+                break
+            radius += 1
+        while heap:
+            yield heapq.heappop(heap)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> Dict[int, float]:
+        """Hotel id -> distance for every hotel within ``radius_km``."""
+        return {hotel_id: distance for distance, hotel_id in self.iter_nearest(lat, lon, radius_km)}
+
+    def distance_to(self, hotel_id: int, lat: float, lon: float) -> Optional[float]:
+        point = self._points.get(hotel_id)
+        return haversine_km(lat, lon, *point) if point else None
+
+
+geo_index = GeoIndex(settings.geo_cell_degrees)
+change_tracking.subscribe([Hotel], geo_index.apply_change)
@@ -0,0 +1,67 @@
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.amenity_index import amenity_index, bitset_contains, iter_bits
+
+# (hotel id, star rating, price per night)
+CandidateRow = Tuple[int, int, float]
+
+
+def _price_label(low: float, high: Optional[float]) -> str:
+    return f"{low:g}+" if high is None else f"{low:g}-{high:g}"
+
+
+def compute_hotel_facets(
+    rows: Iterable[CandidateRow],
+    star_rating: Optional[int],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    amenity_mask: Optional[np.ndarray],
+    price_edges: List[float],
+    amenity_limit: int
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Count star ratings, price buckets and amenities in one pass.
+
+    ``rows`` are the hotels matching every filter except stars, price and
+    amenities. Each facet counts the rows passing the *other* facet filters,
+    so selecting "4+ stars" still shows how many 3-star hotels there are.
+    Amenities are conjunctive, so their counts use every filter: "Pool (87)"
+    is what adding Pool would leave. Returns (total matching all filters, facets).
+    """
+    stars: Dict[int, int] = {}
+    prices = [0] * (len(price_edges) + 1)
+    amenity_counts: Dict[int, int] = {}
+    total = 0
+
+    for hotel_id, stars_value, price in rows:
+        star_ok = not star_rating or stars_value >= star_rating
+        price_ok = (not min_price or price >= min_price) and (not max_price or price <= max_price)
+        amenity_ok = amenity_mask is None or bitset_contains(amenity_mask, hotel_id)
+
+        if price_ok and amenity_ok:
+            stars[stars_value] = stars.get(stars_value, 0) + 1
+        if star_ok and amenity_ok:
+            prices[bisect_right(price_edges, price)] += 1
+        if star_ok and price_ok and amenity_ok:
+            total += 1
+            for amenity_id in iter_bits(amenity_index.amenity_bits(hotel_id)):
+                amenity_counts[amenity_id] = amenity_counts.get(amenity_id, 0) + 1
+
+    # Buckets are [low, high); the last one is open-ended
+    price_buckets = [
+        {"value": _price_label(low, high), "min": low, "max": high, "count": prices[i]}
+        for i, (low, high) in enumerate(zip([0.0, *price_edges], [*price_edges, None]))
+    ]
+
+    top_amenities = sorted(amenity_counts.items(), key=lambda item: (-item[1], amenity_index.label(item[0])))
+    return total, {
+        "star_rating": [{"value": str(value), "count": stars[value]} for value in sorted(stars, reverse=True)],
+        "price": price_buckets,
+        "amenities": [
+            {"value": amenity_index.label(amenity_id), "count": count}
+            for amenity_id, count in top_amenities[:amenity_limit]
+        ],
+    }
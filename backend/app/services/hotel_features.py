@@ -0,0 +1,328 @@
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models.models import Hotel, Booking
+from app.services import change_tracking
+from app.services.amenity_index import amenity_index, amenity_key
+
+# Hotel columns the store keeps, by ORM attribute
+_HOTEL_COLUMNS = (
+    "id", "price_per_night", "star_rating", "location", "latitude", "longitude", "amenities", "is_active",
+)
+
+
+def _top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The ``k`` highest scores, sorted descending with ties by id.
+
+    argpartition finds them in linear time so only k rows get sorted. Ties
+    at the cut are resolved by id, so keyset cursors never skip a row.
+    """
+    if len(ids) > k:
+        threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)
+        tied = tied[np.argsort(ids[tied])][:k - len(above)]
+        top = np.concatenate([above, tied])
+        ids, scores = ids[top], scores[top]
+    order = np.lexsort((ids, -scores))
+    return ids[order], scores[order]
+
+
+class HotelFeatureStore:
+    """
+    Column store of per-hotel ranking and similarity features as NumPy arrays.
+
+    One row per active hotel, addressed through a hotel id -> row map.
+    Rows are updated in place from committed ORM changes. Deleted hotels are
+    only masked out, and their rows are reused. Derived columns (per-location
+    median price, id lookup order) are recomputed lazily after a change, so
+    a search request only pays for vectorized scoring.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self, capacity: int = 1024):
+        self._rows: Dict[int, int] = {}
+        self._free = []
+        self._size = 0
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.price = np.zeros(capacity)
+        self.stars = np.zeros(capacity)
+        self.location = np.zeros(capacity, dtype=np.int32)
+        self.bookings = np.zeros(capacity)
+        self.amenity_count = np.zeros(capacity)
+        self.lat = np.full(capacity, np.nan)
+        self.lon = np.full(capacity, np.nan)
+        # Multi-hot amenity rows; columns are amenity_index vocabulary ids and grow with it
+        self.amenities = np.zeros((capacity, 32), dtype=np.float32)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self._locations: Dict[str, int] = {}
+        self._booking_hotels: Dict[int, int] = {}
+        self._booking_counts: Dict[int, int] = {}
+        self._dirty = True
+        self._median_price = np.zeros(0)
+        self._sorted_ids = np.zeros(0, dtype=np.int64)
+        self._sorted_rows = np.zeros(0, dtype=np.int64)
+
+    def _grow(self):
+        capacity = len(self.ids) * 2
+        fill = {"ids": -1, "lat": np.nan, "lon": np.nan}
+        for name in ("ids", "price", "stars", "location", "bookings", "amenity_count", "lat", "lon", "valid"):
+            old = getattr(self, name)
+            new = np.full(capacity, fill.get(name, 0), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        amenities = np.zeros((capacity, self.amenities.shape[1]), dtype=np.float32)
+        amenities[:len(self.amenities)] = self.amenities
+        self.amenities = amenities
+
+    def _set_amenities(self, index: int, names):
+        amenity_ids = {amenity_index.intern(name) for name in names if amenity_key(name)}
+        if amenity_ids and max(amenity_ids) >= self.amenities.shape[1]:
+            columns = max(self.amenities.shape[1] * 2, max(amenity_ids) + 1)
+            amenities = np.zeros((len(self.amenities), columns), dtype=np.float32)
+            amenities[:, :self.amenities.shape[1]] = self.amenities
+            self.amenities = amenities
+        self.amenities[index] = 0
+        self.amenities[index, list(amenity_ids)] = 1
+        self.amenity_count[index] = len(amenity_ids)
+
+    async def rebuild(self, db):
+        """Reload every column from the database."""
+        self._clear()
+        result = await db.execute(
+            select(*[getattr(Hotel, column) for column in _HOTEL_COLUMNS]).where(Hotel.is_active == True)
+        )
+        for row in result:
+            self.upsert_hotel(dict(row._mapping))
+        result = await db.execute(
+            select(Booking.id, Booking.hotel_id, Booking.status).where(Booking.hotel_id.isnot(None))
+        )
+        for booking_id, hotel_id, status in result:
+            self.upsert_booking({"id": booking_id, "hotel_id": hotel_id, "status": status})
+
+    def apply_change(self, model: type, op: str, row: Dict[str, Any]):
+        """change_tracking callback."""
+        if model is Booking:
+            if op == "delete":
+                self.remove_booking(row["id"])
+            else:
+                self.upsert_booking(row)
+        elif op == "delete" or row.get("is_active") is False:
+            self.remove_hotel(row["id"])
+        else:
+            self.upsert_hotel(row)
+
+    def _location_id(self, location: str) -> int:
+        key = (location or "").strip().lower()
+        if key not in self._locations:
+            self._locations[key] = len(self._locations)
+        return self._locations[key]
+
+    def upsert_hotel(self, row: Dict[str, Any]):
+        hotel_id = row["id"]
+        index = self._rows.get(hotel_id)
+        if index is None:
+            # A new row needs every column; partial snapshots only update existing rows
+            if any(row.get(column) is None for column in ("price_per_night", "star_rating")):
+                return
+            if self._free:
+                index = self._free.pop()
+            else:
+                if self._size == len(self.ids):
+                    self._grow()
+                index = self._size
+                self._size += 1
+            self._rows[hotel_id] = index
+            self.ids[index] = hotel_id
+            self.valid[index] = True
+            self.bookings[index] = self._booking_counts.get(hotel_id, 0)
+            # Reused rows must not keep the previous hotel's optional columns
+            self.location[index] = self._location_id(None)
+            self.amenities[index] = 0
+            self.amenity_count[index] = 0
+            self.lat[index] = self.lon[index] = np.nan
+        if row.get("price_per_night") is not None:
+            self.price[index] = row["price_per_night"]
+        if row.get("star_rating") is not None:
+            self.stars[index] = row["star_rating"]
+        if "location" in row:
+            self.location[index] = self._location_id(row["location"])
+        if "amenities" in row:
+            self._set_amenities(index, [name for name in row["amenities"] or [] if isinstance(name, str)])
+        if "latitude" in row and "longitude" in row:
+            self.lat[index] = np.nan if row["latitude"] is None else row["latitude"]
+            self.lon[index] = np.nan if row["longitude"] is None else row["longitude"]
+        self._dirty = True
+
+    def remove_hotel(self, hotel_id: int):
+        index = self._rows.pop(hotel_id, None)
+        if index is None:
+            return
+        self.valid[index] = False
+        self.ids[index] = -1
+        self._free.append(index)
+        self._dirty = True
+
+    def _add_booking(self, hotel_id: int, delta: int):
+        self._booking_counts[hotel_id] = self._booking_counts.get(hotel_id, 0) + delta
+        index = self._rows.get(hotel_id)
+        if index is not None:
+            self.bookings[index] = self._booking_counts[hotel_id]
+
+    def upsert_booking(self, row: Dict[str, Any]):
+        # Cancelled bookings don't count towards popularity
+        self.remove_booking(row["id"])
+        if row.get("hotel_id") and row.get("status") != "cancelled":
+            self._booking_hotels[row["id"]] = row["hotel_id"]
+            self._add_booking(row["hotel_id"], 1)
+
+    def remove_booking(self, booking_id: int):
+        hotel_id = self._booking_hotels.pop(booking_id, None)
+        if hotel_id is not None:
+            self._add_booking(hotel_id, -1)
+
+    def _refresh(self):
+        """Recompute derived columns after changes."""
+        if not self._dirty:
+            return
+        live = np.flatnonzero(self.valid[:self._size])
+        order = np.argsort(self.ids[live])
+        self._sorted_ids = self.ids[live][order]
+        self._sorted_rows = live[order]
+
+        median = np.zeros(max(len(self._locations), 1))
+        if len(live):
+            groups = self.location[live]
+            by_group = np.lexsort((self.price[live], groups))
+            sorted_groups = groups[by_group]
+            sorted_prices = self.price[live][by_group]
+            starts = np.searchsorted(sorted_groups, np.arange(len(median)), side="left")
+            ends = np.searchsorted(sorted_groups, np.arange(len(median)), side="right")
+            present = ends > starts
+            lower = sorted_prices[np.minimum((starts + ends - 1) // 2, len(sorted_prices) - 1)]
+            upper = sorted_prices[np.minimum((starts + ends) // 2, len(sorted_prices) - 1)]
+            median = np.where(present, (lower + upper) / 2, 0.0)
+        self._median_price = median
+        self._dirty = False
+
+    def rows_for(self, hotel_ids: Sequence[int]) -> np.ndarray:
+        """Row index per hotel id (only ids present in the store)."""
+        self._refresh()
+        ids = np.asarray(hotel_ids, dtype=np.int64)
+        if not len(self._sorted_ids):
+            return np.zeros(0, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        hit = self._sorted_ids[positions] == ids
+        return self._sorted_rows[positions[hit]]
+
+    def recommended_scores(self, rows: np.ndarray, weights: Dict[str, float]) -> np.ndarray:
+        """
+        Blend per-feature scores in [0, 1] (price in [-1, 1]) with ``weights``:
+
+        - price: how far below the median price of the hotel's location it is
+        - stars: star rating
+        - popularity: log-scaled count of non-cancelled bookings
+        - amenity_count: number of amenities, relative to the best-equipped
+          candidate. Requested amenities are already a hard filter, so every
+          candidate matches all of them and an overlap score would be flat;
+          this ranks how well equipped a hotel is beyond the request instead.
+        """
+        self._refresh()
+        price = self.price[rows]
+        median = self._median_price[self.location[rows]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_score = np.where(median > 0, np.clip((median - price) / median, -1.0, 1.0), 0.0)
+        stars_score = (self.stars[rows] - 1.0) / 4.0
+        popularity = np.log1p(self.bookings[rows])
+        top = popularity.max() if len(rows) else 0.0
+        popularity_score = popularity / top if top > 0 else np.zeros(len(rows))
+        amenity_counts = self.amenity_count[rows]
+        most = amenity_counts.max() if len(rows) else 0.0
+        amenity_score = amenity_counts / most if most > 0 else np.zeros(len(rows))
+
+        return (
+            weights.get("price", 0.0) * price_score
+            + weights.get("stars", 0.0) * stars_score
+            + weights.get("popularity", 0.0) * popularity_score
+            + weights.get("amenity_count", 0.0) * amenity_score
+        )
+
+    def top_recommended(
+        self,
+        hotel_ids: Iterable[int],
+        k: int,
+        weights: Dict[str, float],
+        after: Optional[Tuple[float, int]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top ``k`` of ``hotel_ids`` by recommended score (ties by id), starting
+        strictly after the ``after`` (score, id) position. Returns (ids, scores).
+        """
+        rows = self.rows_for(list(hotel_ids))
+        scores = self.recommended_scores(rows, weights)
+        ids = self.ids[rows]
+        if after is not None:
+            last_score, last_id = after
+            keep = (scores < last_score) | ((scores == last_score) & (ids > last_id))
+            ids, scores = ids[keep], scores[keep]
+        return _top_k(ids, scores, k)
+
+    def similar(self, hotel_id: int, k: int, weights: Dict[str, float], geo_cell_degrees: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The ``k`` hotels most similar to ``hotel_id``. Returns (ids, similarities).
+
+        Similarity is computed against every live row in one batch, as a
+        weighted blend of:
+
+        - amenities: cosine similarity of the amenity multi-hot rows
+        - price: exp(-|log price ratio|), so 1 for equal prices
+        - stars: 1 - |star difference| / 4
+        - geo: 1 when both are in the same geo cell (or, lacking
+          coordinates, the same location)
+
+        Raises KeyError when the hotel is not in the store.
+        """
+        self._refresh()
+        row = self._rows[hotel_id]
+        live = self._sorted_rows
+
+        amenities = self.amenities[live]
+        norms = np.linalg.norm(amenities, axis=1)
+        target = self.amenities[row]
+        target_norm = np.linalg.norm(target)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            amenity_sim = np.where(
+                (norms > 0) & (target_norm > 0), (amenities @ target) / (norms * target_norm), 0.0
+            )
+            price_sim = np.exp(-np.abs(np.log(self.price[live] / self.price[row])))
+        price_sim = np.nan_to_num(price_sim)
+        stars_sim = 1.0 - np.abs(self.stars[live] - self.stars[row]) / 4.0
+
+        lat, lon = self.lat[live], self.lon[live]
+        if np.isnan(self.lat[row]) or np.isnan(self.lon[row]):
+            geo_sim = (self.location[live] == self.location[row]).astype(np.float64)
+        else:
+            same_cell = (
+                (np.floor(lat / geo_cell_degrees) == np.floor(self.lat[row] / geo_cell_degrees))
+                & (np.floor(lon / geo_cell_degrees) == np.floor(self.lon[row] / geo_cell_degrees))
+            )
+            no_coords = np.isnan(lat) | np.isnan(lon)
+            geo_sim = np.where(no_coords, self.location[live] == self.location[row], same_cell).astype(np.float64)
+
+        similarity = (
+            weights.get("amenities", 0.0) * amenity_sim
+            + weights.get("price", 0.0) * price_sim
+            + weights.get("stars", 0.0) * stars_sim
+            + weights.get("geo", 0.0) * geo_sim
+        )
+        others = live != row
+        return _top_k(self.ids[live][others], similarity[others], k)
+
+
+hotel_features = HotelFeatureStore()
+change_tracking.subscribe([Hotel, Booking], hotel_features.apply_change)
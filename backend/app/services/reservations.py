@@ -0,0 +1,149 @@
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from app.models.models import Flight, Hotel, RoomInventory
+from app.services import change_tracking
+from app.services.room_inventory import RoomInventoryIndex, room_inventory, room_types_of, stay_nights
+
+
+class InventoryUnavailableError(Exception):
+    """Raised when there are not enough seats or rooms left to reserve."""
+
+
+async def reserve_seats(db, flight_id: int, seats: int):
+    """
+    Take ``seats`` seats on a flight in the caller's transaction.
+
+    A single conditional UPDATE checks and decrements in one step, so
+    concurrent bookings can never oversell and never wait on each other for
+    longer than the statement itself. Raises InventoryUnavailableError
+    (leaving nothing changed) when the flight is inactive or too full.
+    """
+    result = await db.execute(
+        update(Flight)
+        .where(Flight.id == flight_id, Flight.is_active == True, Flight.seats_available >= seats)
+        .values(seats_available=Flight.seats_available - seats)
+        .returning(Flight.seats_available)
+    )
+    remaining = result.scalar_one_or_none()
+    if remaining is None:
+        raise InventoryUnavailableError("Not enough seats available on this flight")
+    change_tracking.record(db, Flight, "upsert", {"id": flight_id, "seats_available": remaining})
+
+
+async def release_seats(db, flight_id: int, seats: int):
+    """Give back seats taken by ``reserve_seats``."""
+    result = await db.execute(
+        update(Flight)
+        .where(Flight.id == flight_id)
+        .values(seats_available=Flight.seats_available + seats)
+        .returning(Flight.seats_available)
+    )
+    remaining = result.scalar_one_or_none()
+    if remaining is not None:
+        change_tracking.record(db, Flight, "upsert", {"id": flight_id, "seats_available": remaining})
+
+
+async def _room_type_specs(db, hotel_id: int):
+    specs = room_inventory.room_types(hotel_id)
+    if not specs:
+        result = await db.execute(select(Hotel.room_types).where(Hotel.id == hotel_id, Hotel.is_active == True))
+        row = result.one_or_none()
+        if row is None:
+            raise InventoryUnavailableError("Hotel not found")
+        specs = room_types_of(row[0])
+    return specs
+
+
+async def reserve_rooms(
+    db,
+    hotel_id: int,
+    check_in: date,
+    check_out: date,
+    rooms: int,
+    room_type: Optional[str] = None,
+    guests: int = 1
+) -> str:
+    """
+    Take ``rooms`` rooms for every night of [check_in, check_out) in the
+    caller's transaction. Returns the room type booked.
+
+    Only room types where ``rooms`` rooms sleep ``guests`` are considered,
+    as in hotel search. Without ``room_type`` the first such type listed
+    with enough rooms free is used. Missing nights are first materialized at full capacity, then one
+    conditional UPDATE books every night that still has room; if that is
+    not all of them InventoryUnavailableError is raised and the caller must
+    roll back, which also undoes the partial update.
+    """
+    specs = await _room_type_specs(db, hotel_id)
+    if room_type is not None and room_type not in specs:
+        raise InventoryUnavailableError(f"Unknown room type: {room_type}")
+    fitting = [
+        name for name, spec in specs.items()
+        if (room_type is None or name == room_type) and RoomInventoryIndex.fits(spec, rooms, guests)
+    ]
+    if not fitting:
+        raise InventoryUnavailableError(
+            f"{room_type} rooms can't sleep {guests} guests in {rooms} room(s)" if room_type
+            else f"No room type sleeps {guests} guests in {rooms} room(s)"
+        )
+    room_type = next(
+        (name for name in fitting if room_inventory.free_rooms(hotel_id, name, check_in, check_out) >= rooms),
+        fitting[0]
+    )
+    nights: List[date] = stay_nights(check_in, check_out)
+
+    await db.execute(
+        insert(RoomInventory)
+        .values([
+            {"hotel_id": hotel_id, "room_type": room_type, "night": night,
+             "total_rooms": specs[room_type][0], "booked_rooms": 0}
+            for night in nights
+        ])
+        .on_conflict_do_nothing(index_elements=["hotel_id", "room_type", "night"])
+    )
+    result = await db.execute(
+        update(RoomInventory)
+        .where(
+            RoomInventory.hotel_id == hotel_id,
+            RoomInventory.room_type == room_type,
+            RoomInventory.night >= check_in,
+            RoomInventory.night < check_out,
+            RoomInventory.total_rooms - RoomInventory.booked_rooms >= rooms
+        )
+        .values(booked_rooms=RoomInventory.booked_rooms + rooms)
+        .returning(RoomInventory.night, RoomInventory.total_rooms, RoomInventory.booked_rooms)
+    )
+    booked = result.all()
+    if len(booked) != len(nights):
+        raise InventoryUnavailableError(f"Not enough {room_type} rooms available for these dates")
+    for night, total_rooms, booked_rooms in booked:
+        change_tracking.record(db, RoomInventory, "upsert", {
+            "hotel_id": hotel_id, "room_type": room_type, "night": night,
+            "total_rooms": total_rooms, "booked_rooms": booked_rooms,
+        })
+    return room_type
+
+
+async def release_rooms(db, hotel_id: int, room_type: str, check_in: date, check_out: date, rooms: int):
+    """Give back rooms taken by ``reserve_rooms``."""
+    result = await db.execute(
+        update(RoomInventory)
+        .where(
+            RoomInventory.hotel_id == hotel_id,
+            RoomInventory.room_type == room_type,
+            RoomInventory.night >= check_in,
+            RoomInventory.night < check_out,
+            RoomInventory.booked_rooms >= rooms
+        )
+        .values(booked_rooms=RoomInventory.booked_rooms - rooms)
+        .returning(RoomInventory.night, RoomInventory.total_rooms, RoomInventory.booked_rooms)
+    )
+    for night, total_rooms, booked_rooms in result.all():
+        change_tracking.record(db, RoomInventory, "upsert", {
+            "hotel_id": hotel_id, "room_type": room_type, "night": night,
+            "total_rooms": total_rooms, "booked_rooms": booked_rooms,
+        })
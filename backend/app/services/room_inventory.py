@@ -0,0 +1,177 @@
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.models import Hotel, RoomInventory
+from app.services import change_tracking
+
+# Hotels that list no room types are sold as this one
+DEFAULT_ROOM_TYPE = "Standard"
+
+RoomKey = Tuple[int, str]  # (hotel id, room type)
+RoomSpec = Tuple[int, Optional[int]]  # (rooms of this type, max guests per room)
+
+_STATIC_CACHE_SIZE = 32
+
+
+def room_types_of(room_types: Optional[List[Dict[str, Any]]]) -> Dict[str, RoomSpec]:
+    """
+    Room type name -> (rooms, max guests per room) from a Hotel.room_types blob.
+
+    Entries without a "rooms" count get ``default_rooms_per_type``.
+    """
+    specs = {}
+    for entry in room_types or []:
+        if not isinstance(entry, dict):
+            continue
+        name = entry.get("type") or entry.get("name")
+        if not name:
+            continue
+        rooms = entry.get("rooms", entry.get("count"))
+        specs[name] = (
+            int(rooms) if rooms is not None else settings.default_rooms_per_type,
+            entry.get("max_guests"),
+        )
+    return specs or {DEFAULT_ROOM_TYPE: (settings.default_rooms_per_type, None)}
+
+
+def stay_nights(check_in: date, check_out: date) -> List[date]:
+    return [check_in + timedelta(days=i) for i in range((check_out - check_in).days)]
+
+
+class RoomInventoryIndex:
+    """
+    Free rooms per hotel, room type and night, for date-aware hotel search.
+
+    Capacity per room type comes from ``Hotel.room_types``; ``room_inventory``
+    rows only exist for nights with bookings, so any night without a row is
+    fully free. Those rows are also held here in one list sorted by night:
+    a stay is a bisect to its first night, and only rooms actually booked
+    during the stay are looked at. The per-room-type minimum over that slice
+    answers "N rooms free on every night" without reading any calendar.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self._room_types: Dict[int, Dict[str, RoomSpec]] = {}
+        self._nights: List[Tuple[date, int, str]] = []  # sorted (night, hotel id, room type)
+        self._free: Dict[Tuple[date, int, str], int] = {}
+        self._static_blocked: Dict[Tuple[int, int], Set[int]] = {}
+
+    async def rebuild(self, db):
+        """Reload room types and upcoming booked nights from the database."""
+        self._clear()
+        result = await db.execute(select(Hotel.id, Hotel.room_types).where(Hotel.is_active == True))
+        for hotel_id, room_types in result:
+            self._room_types[hotel_id] = room_types_of(room_types)
+        result = await db.execute(
+            select(RoomInventory.night, RoomInventory.hotel_id, RoomInventory.room_type,
+                   RoomInventory.total_rooms - RoomInventory.booked_rooms)
+            .where(RoomInventory.night >= date.today())
+        )
+        for night, hotel_id, room_type, free in result:
+            self._free[(night, hotel_id, room_type)] = free
+        self._nights = sorted(self._free)
+
+    def apply_change(self, model: type, op: str, row: Dict[str, Any]):
+        """change_tracking callback for Hotel and RoomInventory."""
+        if model is Hotel:
+            self._static_blocked.clear()
+            if op == "delete" or row.get("is_active") is False:
+                self._room_types.pop(row["id"], None)
+            elif "room_types" in row:
+                self._room_types[row["id"]] = room_types_of(row["room_types"])
+        elif op == "delete":
+            self.set_free(row["hotel_id"], row["room_type"], row["night"], None)
+        elif "total_rooms" in row and "booked_rooms" in row:
+            self.set_free(row["hotel_id"], row["room_type"], row["night"], row["total_rooms"] - row["booked_rooms"])
+
+    def set_free(self, hotel_id: int, room_type: str, night: date, free: Optional[int]):
+        """Record the free rooms for one night, or forget the night when ``free`` is None."""
+        key = (night, hotel_id, room_type)
+        if free is None:
+            if self._free.pop(key, None) is not None:
+                i = bisect_left(self._nights, key)
+                if i < len(self._nights) and self._nights[i] == key:
+                    del self._nights[i]
+            return
+        if key not in self._free:
+            insort(self._nights, key)
+        self._free[key] = free
+
+    def room_types(self, hotel_id: int) -> Dict[str, RoomSpec]:
+        return self._room_types.get(hotel_id, {})
+
+    @staticmethod
+    def fits(spec: RoomSpec, rooms: int, guests: int) -> bool:
+        """Whether ``rooms`` rooms of this type exist and together sleep ``guests``."""
+        capacity, max_guests = spec
+        return capacity >= rooms and (max_guests is None or max_guests * rooms >= guests)
+
+    def _booked_minimums(self, check_in: date, check_out: date) -> Dict[RoomKey, Tuple[int, int]]:
+        """(hotel, room type) -> (fewest free rooms, nights with a row) over booked nights of the stay."""
+        minimums: Dict[RoomKey, Tuple[int, int]] = {}
+        i = bisect_left(self._nights, (check_in,))
+        while i < len(self._nights) and self._nights[i][0] < check_out:
+            night, hotel_id, room_type = self._nights[i]
+            free = self._free[self._nights[i]]
+            current = minimums.get((hotel_id, room_type))
+            minimums[(hotel_id, room_type)] = (min(free, current[0]), current[1] + 1) if current else (free, 1)
+            i += 1
+        return minimums
+
+    def free_rooms(self, hotel_id: int, room_type: str, check_in: date, check_out: date) -> int:
+        """Rooms of ``room_type`` free on every night of [check_in, check_out)."""
+        spec = self.room_types(hotel_id).get(room_type)
+        if spec is None:
+            return 0
+        free = spec[0]
+        for night in stay_nights(check_in, check_out):
+            free = min(free, self._free.get((night, hotel_id, room_type), spec[0]))
+        return free
+
+    def unavailable_hotels(self, check_in: date, check_out: date, rooms: int = 1, guests: int = 1) -> Set[int]:
+        """
+        Active hotels without a room type that has ``rooms`` rooms free on
+        every night of [check_in, check_out) and sleeps ``guests``.
+        """
+        static_key = (rooms, guests)
+        blocked = self._static_blocked.get(static_key)
+        if blocked is None:
+            # Hotels too small for the party no matter the dates
+            if len(self._static_blocked) >= _STATIC_CACHE_SIZE:
+                self._static_blocked.clear()
+            blocked = self._static_blocked[static_key] = {
+                hotel_id for hotel_id, specs in self._room_types.items()
+                if not any(self.fits(spec, rooms, guests) for spec in specs.values())
+            }
+        blocked = set(blocked)
+
+        nights = (check_out - check_in).days
+        minimums = self._booked_minimums(check_in, check_out)
+        for hotel_id in {hotel_id for hotel_id, _ in minimums} - blocked:
+            specs = self._room_types.get(hotel_id)
+            if specs is None:
+                continue
+            available = False
+            for room_type, spec in specs.items():
+                if not self.fits(spec, rooms, guests):
+                    continue
+                free, booked_nights = minimums.get((hotel_id, room_type), (spec[0], 0))
+                if booked_nights < nights:
+                    free = min(free, spec[0])
+                if free >= rooms:
+                    available = True
+                    break
+            if not available:
+                blocked.add(hotel_id)
+        return blocked
+
+
+room_inventory = RoomInventoryIndex()
+change_tracking.subscribe([Hotel, RoomInventory], room_inventory.apply_change)
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+
+class PeriodicJob:
+    """
+    Run an async maintenance function every ``interval`` seconds in the
+    background. Failures are reported and the job keeps its schedule.
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable[object]]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.runs = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self):
+        try:
+            await self.func()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Periodic job {self.name} failed: {e}")
+        self.runs += 1
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+def start_jobs(jobs: List[PeriodicJob]):
+    for job in jobs:
+        job.start()
+
+
+async def stop_jobs(jobs: List[PeriodicJob]):
+    for job in jobs:
+        await job.stop()
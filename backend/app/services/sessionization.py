@@ -0,0 +1,120 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.models import EventLog, UserSession
+from app.services.checkpoints import load_checkpoint, fetch_new_events
+
+CHECKPOINT_NAME = "sessions"
+
+_EVENT_COLUMNS = [
+    EventLog.session_id, EventLog.user_id, EventLog.timestamp, EventLog.event_type,
+    EventLog.page_url, EventLog.custom_action, EventLog.event_metadata,
+]
+
+
+def is_search_event(event) -> bool:
+    return bool(event.custom_action and "search" in event.custom_action.lower())
+
+
+def is_booking_event(event) -> bool:
+    """A booking insert, or landing on the booking confirmation page."""
+    metadata = event.event_metadata or {}
+    if event.event_type == "DB_UPDATE":
+        return metadata.get("table_name") == "bookings" and metadata.get("update_type") == "insert"
+    target = metadata.get("target_url") or event.page_url or ""
+    return "/booking-confirmed" in target
+
+
+def _visited_page(event) -> Optional[str]:
+    if event.event_type == "GO_TO_URL":
+        return (event.event_metadata or {}).get("target_url") or event.page_url
+    return event.page_url
+
+
+def _apply_event(session: UserSession, event):
+    if event.timestamp < session.started_at:
+        session.started_at = event.timestamp
+    if event.timestamp > session.ended_at:
+        session.ended_at = event.timestamp
+    session.duration_seconds = (session.ended_at - session.started_at).total_seconds()
+    session.event_count += 1
+    session.user_id = session.user_id or event.user_id
+    session.has_search = session.has_search or is_search_event(event)
+    session.has_booking = session.has_booking or is_booking_event(event)
+
+    page = _visited_page(event)
+    if page:
+        path = list(session.page_path or [])
+        if not path or path[-1] != page:
+            # Assign a new list so the JSON column is marked dirty
+            if len(path) < settings.session_page_path_max:
+                path.append(page)
+            session.page_path = path
+            session.exit_page = page
+        session.entry_page = session.entry_page or page
+
+
+async def sessionize_new_events(batch_size: int = None) -> int:
+    """
+    Fold events logged since the checkpoint into per-session summaries.
+
+    Each batch updates the touched ``sessions`` rows and advances the
+    checkpoint in one transaction. Returns the number of events consumed.
+    """
+    batch_size = batch_size or settings.sessionize_batch_size
+    consumed = 0
+    async with AsyncSessionLocal() as db:
+        checkpoint = await load_checkpoint(db, CHECKPOINT_NAME)
+        while True:
+            events = await fetch_new_events(db, checkpoint, _EVENT_COLUMNS, batch_size)
+            if not events:
+                break
+
+            session_ids = {event.session_id for event in events if event.session_id}
+            sessions: Dict[str, UserSession] = {}
+            if session_ids:
+                result = await db.execute(select(UserSession).where(UserSession.session_id.in_(session_ids)))
+                sessions = {session.session_id: session for session in result.scalars()}
+
+            for event in events:
+                if not event.session_id:
+                    continue
+                session = sessions.get(event.session_id)
+                if session is None:
+                    session = UserSession(
+                        session_id=event.session_id,
+                        started_at=event.timestamp,
+                        ended_at=event.timestamp,
+                        event_count=0,
+                        page_path=[],
+                        has_search=False,
+                        has_booking=False,
+                    )
+                    db.add(session)
+                    sessions[event.session_id] = session
+                _apply_event(session, event)
+
+            checkpoint.last_event_id = events[-1].id
+            await db.commit()
+            consumed += len(events)
+
+    return consumed
+
+
+def session_summary(session: UserSession) -> Dict[str, Any]:
+    return {
+        "session_id": session.session_id,
+        "user_id": session.user_id,
+        "started_at": session.started_at.isoformat(),
+        "ended_at": session.ended_at.isoformat(),
+        "duration_seconds": session.duration_seconds,
+        "event_count": session.event_count,
+        "page_path": session.page_path or [],
+        "entry_page": session.entry_page,
+        "exit_page": session.exit_page,
+        "has_search": session.has_search,
+        "has_booking": session.has_booking,
+    }
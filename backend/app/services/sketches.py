@@ -0,0 +1,255 @@
+import hashlib
+import json
+import math
+import struct
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects.sqlite import insert
+
+from app.core.config import settings
+from app.database.database import AsyncSessionLocal
+from app.models.models import AnalyticsSketch
+
+
+def _hash64(value: str, seed: int = 0) -> int:
+    """Stable 64-bit hash, identical across processes so sketches can be merged."""
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8, salt=seed.to_bytes(8, "little")).digest()
+    return int.from_bytes(digest, "little")
+
+
+class CountMinSketch:
+    """Approximate frequency counts; estimates never undercount."""
+
+    def __init__(self, width: int, depth: int, counts: Optional[array] = None):
+        self.width = width
+        self.depth = depth
+        self.counts = counts if counts is not None else array("q", [0]) * (width * depth)
+
+    def _cells(self, item: str):
+        for row in range(self.depth):
+            yield row * self.width + _hash64(item, row) % self.width
+
+    def add(self, item: str, count: int = 1):
+        for cell in self._cells(item):
+            self.counts[cell] += count
+
+    def estimate(self, item: str) -> int:
+        return min(self.counts[cell] for cell in self._cells(item))
+
+    def merge(self, other: "CountMinSketch"):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Cannot merge Count-Min sketches of different dimensions")
+        for i, value in enumerate(other.counts):
+            self.counts[i] += value
+
+    def to_bytes(self) -> bytes:
+        return struct.pack("<II", self.width, self.depth) + self.counts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CountMinSketch":
+        width, depth = struct.unpack_from("<II", data)
+        counts = array("q")
+        counts.frombytes(data[8:])
+        return cls(width, depth, counts)
+
+
+class TopK:
+    """
+    Heavy hitters: a Count-Min sketch for counts plus a bounded candidate set
+    of the items with the highest estimates seen so far.
+    """
+
+    def __init__(self, width: int, depth: int, capacity: int, cms: Optional[CountMinSketch] = None):
+        self.capacity = capacity
+        self.cms = cms or CountMinSketch(width, depth)
+        self.candidates: Dict[str, int] = {}
+
+    def add(self, item: str, count: int = 1):
+        self.cms.add(item, count)
+        estimate = self.cms.estimate(item)
+        if item in self.candidates or len(self.candidates) < self.capacity:
+            self.candidates[item] = estimate
+            return
+        weakest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[weakest]:
+            del self.candidates[weakest]
+            self.candidates[item] = estimate
+
+    def merge(self, other: "TopK"):
+        self.cms.merge(other.cms)
+        items = set(self.candidates) | set(other.candidates)
+        ranked = sorted(((self.cms.estimate(item), item) for item in items), reverse=True)
+        self.candidates = {item: estimate for estimate, item in ranked[:self.capacity]}
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        return sorted(self.candidates.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+
+    def to_bytes(self) -> bytes:
+        cms = self.cms.to_bytes()
+        candidates = json.dumps(self.candidates).encode("utf-8")
+        return struct.pack("<II", self.capacity, len(cms)) + cms + candidates
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TopK":
+        capacity, cms_len = struct.unpack_from("<II", data)
+        cms = CountMinSketch.from_bytes(data[8:8 + cms_len])
+        topk = cls(cms.width, cms.depth, capacity, cms)
+        topk.candidates = json.loads(data[8 + cms_len:].decode("utf-8"))
+        return topk
+
+
+class HyperLogLog:
+    """Approximate distinct counts in 2**precision bytes."""
+
+    def __init__(self, precision: int, registers: Optional[bytearray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+
+    def add(self, item: str):
+        h = _hash64(item)
+        index = h >> (64 - self.precision)
+        rest = (h << self.precision) & ((1 << 64) - 1)
+        rank = 64 - self.precision + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def merge(self, other: "HyperLogLog"):
+        if self.precision != other.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(data[0], bytearray(data[1:]))
+
+
+# Sketch name -> function extracting the tracked value from an EventLog row
+TOP_K_DIMENSIONS = {
+    "destinations": lambda row: row.get("destination"),
+    "pages": lambda row: row.get("page_url"),
+    "elements": lambda row: (row.get("event_metadata") or {}).get("element_identifier"),
+}
+UNIQUE_METRICS = {
+    "sessions": lambda row: row.get("session_id"),
+    "users": lambda row: row.get("user_id"),
+}
+
+
+def _new_sketch(name: str):
+    if name in TOP_K_DIMENSIONS:
+        return TopK(settings.sketch_cms_width, settings.sketch_cms_depth, settings.sketch_top_k_capacity)
+    return HyperLogLog(settings.sketch_hll_precision)
+
+
+def _load_sketch(name: str, data: bytes):
+    return TopK.from_bytes(data) if name in TOP_K_DIMENSIONS else HyperLogLog.from_bytes(data)
+
+
+class AnalyticsSketches:
+    """
+    Per-day streaming sketches fed from the ingest path.
+
+    Each worker only keeps the deltas since its last flush; ``flush`` merges
+    them into the persisted per-day sketches, and queries merge the persisted
+    days in range with any unflushed deltas. Cost depends on the number of
+    days, not the number of events.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[str, date], Any] = {}
+
+    def record(self, row: Dict[str, Any]):
+        day = row["timestamp"].date()
+        for name, extract in TOP_K_DIMENSIONS.items():
+            value = extract(row)
+            if value:
+                self._sketch(name, day).add(str(value))
+        for name, extract in UNIQUE_METRICS.items():
+            value = extract(row)
+            if value:
+                self._sketch(name, day).add(str(value))
+
+    def _sketch(self, name: str, day: date):
+        key = (name, day)
+        sketch = self._pending.get(key)
+        if sketch is None:
+            sketch = self._pending[key] = _new_sketch(name)
+        return sketch
+
+    async def flush(self) -> int:
+        """Merge pending deltas into ``analytics_sketches``. Returns sketches written."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        committed = False
+        try:
+            async with AsyncSessionLocal() as db:
+                # Take the write lock before reading, so another worker's flush
+                # can't merge into the same rows between our read and write
+                await db.execute(text("BEGIN IMMEDIATE"))
+                for (name, day), delta in pending.items():
+                    stored = await db.execute(
+                        select(AnalyticsSketch.data).where(AnalyticsSketch.name == name, AnalyticsSketch.day == day)
+                    )
+                    data = stored.scalar_one_or_none()
+                    if data is not None:
+                        merged = _load_sketch(name, data)
+                        merged.merge(delta)
+                        delta = merged
+                    stmt = insert(AnalyticsSketch).values(name=name, day=day, data=delta.to_bytes())
+                    await db.execute(stmt.on_conflict_do_update(
+                        index_elements=["name", "day"], set_={"data": stmt.excluded.data, "updated_at": func.now()}
+                    ))
+                await db.commit()
+                committed = True
+        finally:
+            if not committed:
+                # Failed or cancelled (e.g. by stop_jobs at shutdown): put the
+                # deltas back so the next flush, or the final one, retries them
+                for key, delta in pending.items():
+                    current = self._pending.get(key)
+                    if current is not None:
+                        delta.merge(current)
+                    self._pending[key] = delta
+        return len(pending)
+
+    async def merged(self, db, name: str, start_day: date, end_day: date):
+        """One sketch covering [start_day, end_day], persisted days plus unflushed deltas."""
+        result = _new_sketch(name)
+        stored = await db.execute(
+            select(AnalyticsSketch.data).where(
+                AnalyticsSketch.name == name,
+                AnalyticsSketch.day >= start_day,
+                AnalyticsSketch.day <= end_day
+            )
+        )
+        for data in stored.scalars():
+            result.merge(_load_sketch(name, data))
+        for (pending_name, day), delta in list(self._pending.items()):
+            if pending_name == name and start_day <= day <= end_day:
+                result.merge(delta)
+        return result
+
+
+def default_range(start_day: Optional[date], end_day: Optional[date]) -> Tuple[date, date]:
+    end_day = end_day or datetime.utcnow().date()
+    return start_day or end_day - timedelta(days=6), end_day
+
+
+analytics_sketches = AnalyticsSketches()
@@ -0,0 +1,226 @@
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.models.models import Hotel, Flight, Destination
+from app.services import change_tracking
+
+SUGGESTION_TYPES = ("destination", "city", "hotel", "airport")
+# Bound the work for very short prefixes that match a large part of the catalog
+_MAX_PREFIX_SCAN = 1000
+
+# Columns each source table contributes to the index
+_SOURCE_COLUMNS = {
+    Destination: ("id", "name", "country", "popularity_score", "is_active"),
+    Hotel: ("id", "name", "location", "star_rating", "is_active"),
+    Flight: ("id", "departure_airport", "arrival_airport", "departure_city", "arrival_city", "is_active"),
+}
+
+EntryKey = Tuple[str, Any]  # (type, id for hotels/destinations or normalized name for cities/airports)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^\w]+", " ", text.lower()).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Entry:
+    __slots__ = ("type", "label", "name", "value", "id", "weight", "refs", "terms", "grams")
+
+    def __init__(self, type: str, label: str, value: str, id: Optional[int], weight: float):
+        self.type = type
+        self.label = label
+        self.name = normalize(label)
+        self.value = value
+        self.id = id
+        self.weight = weight
+        self.refs = 0
+        self.terms: List[str] = []
+        self.grams: Set[str] = set()
+
+
+class SuggestIndex:
+    """
+    In-memory autocomplete over destinations, hotels, cities and airports.
+
+    Every entry is reachable by prefix through a sorted term list (the whole
+    normalized label plus each word in it), searched with bisect, and by
+    fuzzy match through a trigram inverted index. Cities and airports are
+    derived from many hotel/flight rows, so entries are reference counted
+    per source row and updated incrementally from committed ORM changes.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self._entries: Dict[EntryKey, _Entry] = {}
+        self._terms: List[Tuple[str, EntryKey]] = []
+        self._grams: Dict[str, Set[EntryKey]] = defaultdict(set)
+        self._sources: Dict[Tuple[type, int], Dict[str, Any]] = {}
+        self._contributions: Dict[Tuple[type, int], List[EntryKey]] = {}
+        self._bulk = False
+
+    async def rebuild(self, db):
+        """Reload the whole index from the database."""
+        self._clear()
+        # Append terms unsorted and sort once at the end instead of insort per term
+        self._bulk = True
+        try:
+            for model, columns in _SOURCE_COLUMNS.items():
+                result = await db.execute(
+                    select(*[getattr(model, column) for column in columns]).where(model.is_active == True)
+                )
+                for row in result:
+                    self.upsert(model, dict(row._mapping))
+        finally:
+            self._bulk = False
+            self._terms.sort()
+
+    def apply_change(self, model: type, op: str, row: Dict[str, Any]):
+        """change_tracking callback."""
+        if op == "delete":
+            self.remove(model, row["id"])
+        else:
+            self.upsert(model, row)
+
+    def upsert(self, model: type, row: Dict[str, Any]):
+        source = (model, row["id"])
+        # Partial snapshots (unloaded columns) fall back to the last known values
+        merged = dict(self._sources.get(source, {}))
+        merged.update({k: v for k, v in row.items() if k in _SOURCE_COLUMNS[model]})
+        self.remove(model, row["id"])
+        if merged.get("is_active") is False:
+            return
+        self._sources[source] = merged
+        self._contributions[source] = [self._acquire(*spec) for spec in self._entries_for(model, merged)]
+
+    def remove(self, model: type, id: int):
+        source = (model, id)
+        self._sources.pop(source, None)
+        for key in self._contributions.pop(source, []):
+            self._release(key)
+
+    def _entries_for(self, model: type, row: Dict[str, Any]):
+        """(key, label, value, id, weight) for each entry a source row contributes."""
+        if model is Destination:
+            label = f"{row['name']}, {row['country']}" if row.get("country") else row["name"]
+            yield ("destination", row["id"]), label, row["name"], row["id"], row.get("popularity_score") or 0.0
+        elif model is Hotel:
+            yield ("hotel", row["id"]), row["name"], row["name"], row["id"], float(row.get("star_rating") or 0)
+            if row.get("location"):
+                yield self._city(row["location"])
+        elif model is Flight:
+            for side in ("departure", "arrival"):
+                city, airport = row.get(f"{side}_city"), row.get(f"{side}_airport")
+                if city:
+                    yield self._city(city)
+                if airport:
+                    code = airport.upper()
+                    label = f"{code} ({city})" if city else code
+                    yield ("airport", code), label, code, None, 0.0
+
+    @staticmethod
+    def _city(name: str):
+        return ("city", normalize(name)), name, name, None, 0.0
+
+    def _acquire(self, key: EntryKey, label: str, value: str, id: Optional[int], weight: float) -> EntryKey:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(key[0], label, value, id, weight)
+            entry.terms = sorted({entry.name, *entry.name.split(), normalize(value)})
+            for term in entry.terms:
+                if self._bulk:
+                    self._terms.append((term, key))
+                else:
+                    insort(self._terms, (term, key))
+            entry.grams = trigrams(entry.name)
+            for gram in entry.grams:
+                self._grams[gram].add(key)
+        entry.refs += 1
+        return key
+
+    def _release(self, key: EntryKey):
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.refs -= 1
+        if entry.refs > 0:
+            return
+        del self._entries[key]
+        for term in entry.terms:
+            i = bisect_left(self._terms, (term, key))
+            if i < len(self._terms) and self._terms[i] == (term, key):
+                del self._terms[i]
+        for gram in entry.grams:
+            keys = self._grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+
+    def _score(self, entry: _Entry) -> float:
+        # Shared cities/airports rank by how many hotels and flights reference them
+        return entry.weight if entry.type in ("destination", "hotel") else float(entry.refs)
+
+    def suggest(self, query: str, limit: int = 10, types: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Prefix matches first, topped up with fuzzy trigram matches."""
+        q = normalize(query)
+        if not q:
+            return []
+
+        matches: Dict[EntryKey, Tuple[int, float]] = {}
+        i = bisect_left(self._terms, (q,))
+        end = min(len(self._terms), i + _MAX_PREFIX_SCAN)
+        while i < end and self._terms[i][0].startswith(q):
+            term, key = self._terms[i]
+            entry = self._entries[key]
+            if types is None or entry.type in types:
+                # Rank: label starts with the query (0) before a later word does (1)
+                rank = 0 if entry.name.startswith(q) else 1
+                if key not in matches or matches[key][0] > rank:
+                    matches[key] = (rank, self._score(entry))
+            i += 1
+
+        if len(matches) < limit and len(q) >= 3:
+            query_grams = trigrams(q)
+            overlap: Dict[EntryKey, int] = defaultdict(int)
+            for gram in query_grams:
+                for key in self._grams.get(gram, ()):
+                    overlap[key] += 1
+            for key, shared in overlap.items():
+                if key in matches:
+                    continue
+                entry = self._entries[key]
+                if types is not None and entry.type not in types:
+                    continue
+                similarity = 2.0 * shared / (len(query_grams) + len(entry.grams))  # Dice coefficient
+                if similarity >= 0.4:
+                    matches[key] = (2, similarity)
+
+        ranked = sorted(matches.items(), key=lambda item: (item[1][0], -item[1][1], self._entries[item[0]].label))
+        return [
+            {
+                "type": self._entries[key].type,
+                "label": self._entries[key].label,
+                "value": self._entries[key].value,
+                "id": self._entries[key].id,
+                "fuzzy": rank == 2,
+            }
+            for key, (rank, _) in ranked[:limit]
+        ]
+
+
+suggest_index = SuggestIndex()
+change_tracking.subscribe(_SOURCE_COLUMNS, suggest_index.apply_change)
@@ -0,0 +1,49 @@
+import heapq
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+# (cost, item), sorted by cost within each leg
+LegOptions = Sequence[Tuple[float, Any]]
+
+
+def cheapest_combinations(
+    legs: Sequence[LegOptions],
+    limit: int,
+    budget: Optional[float] = None,
+    valid: Optional[Callable[[List[Any]], bool]] = None,
+    max_steps: int = 10000
+) -> List[Tuple[float, List[Any]]]:
+    """
+    The ``limit`` cheapest ways to pick one option per leg, cheapest first.
+
+    Best-first search over index tuples: starting from every leg's cheapest
+    option, each popped combination pushes its neighbours that move one leg
+    on to that leg's next more expensive option. Only about ``limit * len(legs)``
+    combinations are ever materialized instead of the full cross product,
+    and the search stops at the first total over ``budget``. Combinations
+    rejected by ``valid`` (e.g. a return flight before the outbound lands)
+    are skipped; ``max_steps`` bounds the work when most are invalid.
+    """
+    if not legs or any(not options for options in legs):
+        return []
+
+    start = (0,) * len(legs)
+    heap = [(sum(options[0][0] for options in legs), start)]
+    seen = {start}
+    results = []
+    steps = 0
+    while heap and len(results) < limit and steps < max_steps:
+        total, picks = heapq.heappop(heap)
+        if budget is not None and total > budget:
+            break
+        steps += 1
+        combination = [legs[leg][pick][1] for leg, pick in enumerate(picks)]
+        if valid is None or valid(combination):
+            results.append((total, combination))
+        for leg, pick in enumerate(picks):
+            if pick + 1 < len(legs[leg]):
+                following = picks[:leg] + (pick + 1,) + picks[leg + 1:]
+                if following not in seen:
+                    seen.add(following)
+                    step_cost = legs[leg][pick + 1][0] - legs[leg][pick][0]
+                    heapq.heappush(heap, (total + step_cost, following))
+    return results
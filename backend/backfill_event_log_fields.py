@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Backfill the promoted event_logs columns (page_url, custom_action, destination)
+from event_metadata for rows written before those columns existed.
+
+Usage:
+    python backfill_event_log_fields.py [chunk_size]
+"""
+
+import asyncio
+import sys
+from app.database.database import engine, AsyncSessionLocal, Base
+from app.database.migrations import ensure_schema
+from app.services.event_fields import backfill_promoted_fields
+
+async def main():
+    """Add the columns if needed, then backfill them in chunks."""
+    chunk_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print("🚀 Backfilling promoted event_logs columns...")
+    
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(ensure_schema, Base.metadata)
+        print("✅ Columns and indexes verified")
+        
+        async with AsyncSessionLocal() as session:
+            updated = await backfill_promoted_fields(session, chunk_size=chunk_size)
+        print(f"✅ Updated {updated} events")
+        
+    except Exception as e:
+        print(f"❌ Backfill failed: {e}")
+        sys.exit(1)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -13,6 +13,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy import create_engine, text
 from app.core.config import settings
+from app.services.event_fields import extract_promoted_fields
+import json
 import logging
 
 # Set up logging
@@ -38,18 +40,21 @@ def create_event_logs_table():
         timestamp DATETIME NOT NULL,
         metadata JSON,
         source VARCHAR(20) NOT NULL DEFAULT 'frontend',
+        page_url VARCHAR,
+        custom_action VARCHAR,
+        destination VARCHAR,
         created_at DATETIME DEFAULT CURRENT_TIMESTAMP
     );
     """
     
     # SQL to create indexes
     create_indexes_sql = [
-        "CREATE INDEX IF NOT EXISTS idx_event_logs_event_type ON event_logs(event_type);",
-        "CREATE INDEX IF NOT EXISTS idx_event_logs_user_id ON event_logs(user_id);", 
-        "CREATE INDEX IF NOT EXISTS idx_event_logs_session_id ON event_logs(session_id);",
-        "CREATE INDEX IF NOT EXISTS idx_event_logs_timestamp ON event_logs(timestamp);",
-        "CREATE INDEX IF NOT EXISTS idx_event_logs_source ON event_logs(source);",
-        "CREATE INDEX IF NOT EXISTS idx_event_logs_created_at ON event_logs(created_at);"
+        "CREATE INDEX IF NOT EXISTS ix_event_logs_timestamp_id ON event_logs(timestamp, id);",
+        "CREATE INDEX IF NOT EXISTS ix_event_logs_user_timestamp_id ON event_logs(user_id, timestamp, id);",
+        "CREATE INDEX IF NOT EXISTS ix_event_logs_session_timestamp_id ON event_logs(session_id, timestamp, id);",
+        "CREATE INDEX IF NOT EXISTS ix_event_logs_type_timestamp_id ON event_logs(event_type, timestamp, id);",
+        "CREATE INDEX IF NOT EXISTS ix_event_logs_page_url_type ON event_logs(page_url, event_type);",
+        "CREATE INDEX IF NOT EXISTS ix_event_logs_action_destination ON event_logs(custom_action, destination);"
     ]
     
     try:
@@ -128,15 +133,18 @@ def insert_sample_events():
     ]
     
     insert_sql = """
-    INSERT INTO event_logs (event_type, description, user_id, session_id, timestamp, metadata, source)
-    VALUES (:event_type, :description, :user_id, :session_id, :timestamp, :metadata, :source)
+    INSERT INTO event_logs (event_type, description, user_id, session_id, timestamp, metadata, source,
+                            page_url, custom_action, destination)
+    VALUES (:event_type, :description, :user_id, :session_id, :timestamp, :metadata, :source,
+            :page_url, :custom_action, :destination)
     """
     
     try:
         with engine.connect() as connection:
             logger.info("Inserting sample events...")
             for event in sample_events:
-                connection.execute(text(insert_sql), event)
+                metadata = json.loads(event["metadata"])
+                connection.execute(text(insert_sql), {**event, **extract_promoted_fields(metadata)})
             connection.commit()
             logger.info(f"✅ Inserted {len(sample_events)} sample events")
             
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Export event logs for offline analysis as an Arrow IPC stream or Parquet file.
+
+Events are streamed in constant memory from sealed archive segments and the
+hot event_logs table, oldest first.
+
+Usage:
+    python export_event_logs.py events.parquet --format parquet --start 2024-03-01 --end 2024-04-01
+    python export_event_logs.py events.arrows --event-type CLICK
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from app.database.database import engine
+from app.services.event_export import EXPORT_FORMATS, stream_event_export
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export event logs as Arrow IPC or Parquet")
+    parser.add_argument("output", help="Output file path")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Only events at or after this time (UTC)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Only events before this time (UTC)")
+    parser.add_argument("--user-id")
+    parser.add_argument("--session-id")
+    parser.add_argument("--event-type")
+    return parser.parse_args()
+
+async def main():
+    """Stream the export to the output file."""
+    args = parse_args()
+    print(f"🚀 Exporting event logs to {args.output} ({args.format})...")
+    
+    written = 0
+    try:
+        with open(args.output, "wb") as f:
+            async for chunk in stream_event_export(
+                args.format,
+                start=args.start,
+                end=args.end,
+                user_id=args.user_id,
+                session_id=args.session_id,
+                event_type=args.event_type
+            ):
+                f.write(chunk)
+                written += len(chunk)
+        print(f"✅ Wrote {written} bytes")
+        
+    except Exception as e:
+        print(f"❌ Export failed: {e}")
+        sys.exit(1)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for booking creation.
+Fires many simultaneous bookings at one flight and one hotel and checks that
+seats and rooms are never oversold. Runs against a throwaway SQLite database.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = "./stress_test_bookings.db"
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+
+import httpx
+from sqlalchemy import func, select
+from app.main import app, startup_event, shutdown_event
+from app.database.database import engine, AsyncSessionLocal
+from app.core.security import create_access_token
+from app.models.models import User, Flight, Hotel, Booking, RoomInventory
+
+FLIGHT_SEATS = 50
+HOTEL_ROOMS = 5
+
+
+async def seed():
+    """Create one user, one flight and one hotel. Returns (token, flight_id, hotel_id)."""
+    async with AsyncSessionLocal() as db:
+        # Authenticated by token only, so the password hash is never checked
+        user = User(email="stress@example.com", hashed_password="!", first_name="Stress", last_name="Test")
+        departure = datetime.utcnow() + timedelta(days=30)
+        flight = Flight(
+            airline="Stress Air", flight_number="ST100",
+            departure_airport="JFK", arrival_airport="LHR", departure_city="New York", arrival_city="London",
+            departure_time=departure, arrival_time=departure + timedelta(hours=7), duration_minutes=420,
+            cabin_class="economy", price=400, seats_available=FLIGHT_SEATS
+        )
+        hotel = Hotel(
+            name="Stress Hotel", location="London, UK", address="1 Test St", star_rating=4, price_per_night=200,
+            room_types=[{"type": "Standard", "price": 200, "rooms": HOTEL_ROOMS}]
+        )
+        db.add_all([user, flight, hotel])
+        await db.commit()
+        return create_access_token({"sub": user.email}), flight.id, hotel.id
+
+
+async def fire(client, token, payloads, concurrency):
+    """POST every payload with at most ``concurrency`` in flight. Returns status code counts."""
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {}
+
+    async def book(payload):
+        async with semaphore:
+            response = await client.post(
+                "/api/v1/bookings/", json=payload, headers={"Authorization": f"Bearer {token}"}
+            )
+            counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*[book(payload) for payload in payloads])
+    return counts
+
+
+async def run(requests, concurrency, seats_per_booking):
+    """Run the stress test and verify inventory. Returns True when nothing was oversold."""
+    engine.echo = False
+    await startup_event()
+    ok = True
+    try:
+        token, flight_id, hotel_id = await seed()
+        check_in = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=30)
+        flight_payload = {
+            "booking_type": "flight", "flight_id": flight_id, "total_price": 400 * seats_per_booking,
+            "guest_details": {"adults": seats_per_booking},
+        }
+        hotel_payload = {
+            "booking_type": "hotel", "hotel_id": hotel_id, "total_price": 600,
+            "check_in_date": check_in.isoformat(), "check_out_date": (check_in + timedelta(days=3)).isoformat(),
+            "guest_details": {"adults": 2, "rooms": 1},
+        }
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+            print(f"🔍 Firing {requests} flight bookings ({seats_per_booking} seats each, {concurrency} concurrent)...")
+            started = time.perf_counter()
+            flight_counts = await fire(client, token, [flight_payload] * requests, concurrency)
+            elapsed = time.perf_counter() - started
+            print(f"   Responses: {flight_counts} in {elapsed:.2f}s ({requests / elapsed:.0f} req/s)")
+
+            print(f"\n🔍 Firing {requests} hotel bookings (1 room x 3 nights, {concurrency} concurrent)...")
+            started = time.perf_counter()
+            hotel_counts = await fire(client, token, [hotel_payload] * requests, concurrency)
+            elapsed = time.perf_counter() - started
+            print(f"   Responses: {hotel_counts} in {elapsed:.2f}s ({requests / elapsed:.0f} req/s)")
+
+        async with AsyncSessionLocal() as db:
+            seats_left = (await db.execute(select(Flight.seats_available).where(Flight.id == flight_id))).scalar_one()
+            flight_bookings = (await db.execute(
+                select(func.count()).select_from(Booking).where(Booking.flight_id == flight_id)
+            )).scalar_one()
+            hotel_bookings = (await db.execute(
+                select(func.count()).select_from(Booking).where(Booking.hotel_id == hotel_id)
+            )).scalar_one()
+            nights = (await db.execute(
+                select(RoomInventory.night, RoomInventory.total_rooms, RoomInventory.booked_rooms)
+                .where(RoomInventory.hotel_id == hotel_id)
+                .order_by(RoomInventory.night)
+            )).all()
+
+        print("\n🔍 Verifying inventory...")
+        expected_flight = min(requests, FLIGHT_SEATS // seats_per_booking)
+        checks = [
+            ("seats never negative", seats_left >= 0),
+            ("seats taken match bookings", FLIGHT_SEATS - seats_left == flight_bookings * seats_per_booking),
+            (f"{expected_flight} flight bookings succeeded", flight_bookings == expected_flight == flight_counts.get(201, 0)),
+            ("rooms never overbooked", all(booked <= total for _, total, booked in nights)),
+            ("rooms taken match bookings", len(nights) == 3 and all(booked == hotel_bookings for _, _, booked in nights)),
+            (f"{min(requests, HOTEL_ROOMS)} hotel bookings succeeded",
+             hotel_bookings == min(requests, HOTEL_ROOMS) == hotel_counts.get(201, 0)),
+        ]
+        for name, passed in checks:
+            print(f"   {'✅' if passed else '❌'} {name}")
+            ok = ok and passed
+        print(f"   Seats left: {seats_left}/{FLIGHT_SEATS}, rooms booked per night: {[booked for _, _, booked in nights]}")
+        return ok
+    finally:
+        await shutdown_event()
+        await engine.dispose()
+
+
+async def main():
+    """Main test function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200, help="Bookings to attempt per resource")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once")
+    parser.add_argument("--seats", type=int, default=2, help="Seats per flight booking")
+    args = parser.parse_args()
+
+    print("🚀 Starting booking concurrency stress test...\n")
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    try:
+        success = await run(args.requests, args.concurrency, args.seats)
+    finally:
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    if success:
+        print("\n🎉 No overselling under concurrent load!")
+        sys.exit(0)
+    else:
+        print("\n💥 Stress test failed!")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,3 +1,5 @@
+import { logger } from './logger';
+
 const API_BASE = 'http://localhost:8000/api/v1';
 
 // Get auth token from localStorage or Redux
@@ -13,6 +15,7 @@ async function apiCall<T>(endpoint: string, options: RequestInit = {}): Promise<
   const config: RequestInit = {
     headers: {
       'Content-Type': 'application/json',
+      'X-Session-Id': logger.getSessionId(),
       ...(token && { Authorization: `Bearer ${token}` }),
       ...options.headers,
     },
@@ -55,6 +55,9 @@ interface CustomEvent extends BaseEvent {
 
 type LogEvent = ClickEvent | ScrollEvent | HoverEvent | KeyPressEvent | NavigationEvent | StorageEvent | CustomEvent;
 
+// Largest batch POST /logs/events/batch accepts (LOG_BATCH_MAX_EVENTS on the backend)
+const BATCH_MAX_EVENTS = 1000;
+
 class EventLogger {
   private apiEndpoint = '/api/v1/logs/events';
   private userId?: string;
@@ -69,6 +72,11 @@ class EventLogger {
     return `session_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
   }
 
+  // Sent as X-Session-Id on API calls so backend DB_UPDATE events join the session
+  getSessionId(): string {
+    return this.sessionId;
+  }
+
   private initializeUserId(): void {
     // Try to get user ID from Redux store or localStorage
     try {
@@ -82,21 +90,23 @@ class EventLogger {
     }
   }
 
+  private withMetadata(event: LogEvent): LogEvent {
+    return {
+      ...event,
+      timestamp: event.timestamp || new Date().toISOString(),
+      user_id: event.user_id ?? this.userId,
+      session_id: event.session_id ?? this.sessionId,
+    };
+  }
+
   private async sendEvent(event: LogEvent): Promise<void> {
     try {
-      const eventWithMetadata = {
-        ...event,
-        timestamp: new Date().toISOString(),
-        user_id: this.userId,
-        session_id: this.sessionId,
-      };
-
       await fetch(this.apiEndpoint, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify(eventWithMetadata),
+        body: JSON.stringify(this.withMetadata(event)),
       });
     } catch (error) {
       console.error('Failed to send log event:', error);
@@ -108,7 +118,8 @@ class EventLogger {
   private storeFailedEvent(event: LogEvent): void {
     try {
       const failedEvents = JSON.parse(localStorage.getItem('failed_log_events') || '[]');
-      failedEvents.push(event);
+      // Keep the original timestamp and session so a later retry is accurate
+      failedEvents.push(this.withMetadata(event));
       localStorage.setItem('failed_log_events', JSON.stringify(failedEvents));
     } catch (error) {
       console.error('Failed to store failed event:', error);
@@ -205,14 +216,31 @@ class EventLogger {
 
   async retryFailedEvents(): Promise<void> {
     try {
-      const failedEvents = JSON.parse(localStorage.getItem('failed_log_events') || '[]');
-      if (failedEvents.length === 0) return;
+      let failedEvents = JSON.parse(localStorage.getItem('failed_log_events') || '[]');
 
-      const retryPromises = failedEvents.map((event: LogEvent) => this.sendEvent(event));
-      await Promise.all(retryPromises);
-      
-      // Clear failed events on successful retry
-      localStorage.removeItem('failed_log_events');
+      // Flush the backlog in chunks the batch endpoint accepts
+      while (failedEvents.length > 0) {
+        const chunk = failedEvents.slice(0, BATCH_MAX_EVENTS);
+        const response = await fetch(`${this.apiEndpoint}/batch`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify(chunk.map((event: LogEvent) => this.withMetadata(event))),
+        });
+        if (!response.ok) {
+          throw new Error(`Batch upload failed: ${response.status}`);
+        }
+
+        // Drop the sent chunk; rejected items are malformed and won't succeed later.
+        // Re-read first so events stored while the request was in flight are kept.
+        failedEvents = JSON.parse(localStorage.getItem('failed_log_events') || '[]').slice(chunk.length);
+        if (failedEvents.length > 0) {
+          localStorage.setItem('failed_log_events', JSON.stringify(failedEvents));
+        } else {
+          localStorage.removeItem('failed_log_events');
+        }
+      }
     } catch (error) {
       console.error('Failed to retry events:', error);
     }